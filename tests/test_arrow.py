@@ -0,0 +1,69 @@
+import json
+import os
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from text_data_augmentation import KeyBoardNoise, OCRNoise
+from text_data_augmentation.cli import main
+from text_data_augmentation.sharding import merge_manifests
+
+
+def test_record_batches():
+    data = json.load(open(os.path.join("tests", "test_data.json")))[:20]
+    aug = KeyBoardNoise(alpha=0.1, n_aug=3, seed=1, show_progress=False)
+    batches = list(aug.iter_record_batches(data, batch_rows=25))
+    assert [batch.num_rows for batch in batches] == [25, 25, 10]
+    table = pa.Table.from_batches(batches)
+    assert table.column("text").to_pylist() == aug(data)[len(data) :]
+    assert table.column("source_index").to_pylist() == [
+        i for i in range(20) for _ in range(3)
+    ]
+    assert table.column("aug_index").to_pylist() == [0, 1, 2] * 20
+    assert set(table.column("augmenter").to_pylist()) == {"KeyBoardNoise"}
+
+
+def test_write_arrow(tmp_path):
+    data = json.load(open(os.path.join("tests", "test_data.json")))[:20]
+    aug = KeyBoardNoise(alpha=0.1, n_aug=2, seed=1, show_progress=False)
+    expected = aug(data)[len(data) :]
+    assert aug.write_arrow(data, str(tmp_path / "aug.parquet"), batch_rows=16) == 40
+    table = pq.read_table(tmp_path / "aug.parquet")
+    assert table.column("text").to_pylist() == expected
+
+    aug.write_arrow(data, str(tmp_path / "aug.arrow"), compression=None)
+    with pa.memory_map(str(tmp_path / "aug.arrow")) as source:
+        table = pa.ipc.open_file(source).read_all()
+    assert table.column("text").to_pylist() == expected
+
+
+def test_write_arrow_shards(tmp_path):
+    data = json.load(open(os.path.join("tests", "test_data.json")))[:20]
+    aug = KeyBoardNoise(alpha=0.1, n_aug=2, seed=1, show_progress=False)
+    rows = []
+    for shard_id in range(3):
+        path = str(tmp_path / f"aug-{shard_id}.arrow")
+        kwargs = {"shard_id": shard_id, "num_shards": 3, "manifest": f"{path}.json"}
+        aug.write_arrow(data, path, **kwargs)
+        with pa.memory_map(path) as source:
+            rows.extend(pa.ipc.open_file(source).read_all().to_pylist())
+    merged = merge_manifests([str(tmp_path / f"aug-{i}.arrow.json") for i in range(3)])
+    assert merged.n_augmentations == len(rows) == 40
+    rows.sort(key=lambda row: (row["source_index"], row["aug_index"]))
+    assert [row["text"] for row in rows] == aug(data)[len(data) :]
+
+
+def test_cli_output_format(tmp_path):
+    data = json.load(open(os.path.join("tests", "test_data.json")))[:10]
+    input_path = tmp_path / "input.jsonl"
+    with open(input_path, "w") as f:
+        f.writelines(json.dumps({"text": t}) + "\n" for t in data)
+    args = [str(input_path), str(tmp_path / "out.data"), "--augmenter", "OCRNoise"]
+    args += ["--param", "n_aug=2", "--seed", "3", "--quiet", "--format", "parquet"]
+    assert main(args) == 0
+    table = pq.read_table(tmp_path / "out.data")
+    aug = OCRNoise(n_aug=2, seed=3, show_progress=False)
+    assert table.column("text").to_pylist() == aug(data)[len(data) :]
+    args[1] = str(tmp_path / "out.arrow")
+    assert main(args[:-2] + ["--shard-id", "0", "--num-shards", "2"]) == 0
+    assert os.path.exists(tmp_path / "out.arrow.manifest.json")
@@ -0,0 +1,51 @@
+import json
+import os
+
+from text_data_augmentation import KeyBoardNoise
+
+
+def test_iter_augment():
+    data = json.load(open(os.path.join("tests", "test_data.json")))
+    aug = KeyBoardNoise(n_aug=2, seed=42, show_progress=False)
+    streamed = list(aug.iter_augment(iter(data)))
+    assert [index for index, _ in streamed] == [
+        i for i in range(len(data)) for _ in range(2)
+    ]
+    assert aug(data) == data + [text for _, text in streamed]
+
+
+def test_iter_augment_lazy_input():
+    def lines():
+        yield "A quick brown fox jumps over the lazy dog"
+        raise AssertionError("input consumed beyond the first batch")
+
+    aug = KeyBoardNoise(n_aug=1, show_progress=False)
+    aug.batch_size = 1
+    assert next(aug.iter_augment(lines()))[0] == 0
+
+
+def test_counter_based_random_state():
+    data = json.load(open(os.path.join("tests", "test_data.json")))[:20]
+    aug = KeyBoardNoise(alpha=0.1, n_aug=2, seed=7, show_progress=False)
+    expected = list(aug.iter_augment(data))
+    recomputed = []
+    for index in reversed(range(len(data))):
+        recomputed = list(aug.iter_augment([data[index]], start=index)) + recomputed
+    assert recomputed == expected
+    assert KeyBoardNoise(alpha=0.1, n_aug=2, seed=7, show_progress=False)(data) == aug(
+        data
+    )
+
+
+def test_interleaved_augmenters_do_not_interfere():
+    data = json.load(open(os.path.join("tests", "test_data.json")))[:20]
+    aug_a = KeyBoardNoise(alpha=0.1, seed=1, show_progress=False)
+    aug_b = KeyBoardNoise(alpha=0.1, seed=2, show_progress=False)
+    expected = aug_a(data)
+    aug_a.batch_size = aug_b.batch_size = 1
+    stream_a, stream_b = aug_a.iter_augment(data), aug_b.iter_augment(data)
+    interleaved = []
+    for pair_a, _ in zip(stream_a, stream_b):
+        interleaved.append(pair_a[1])
+    interleaved.extend(text for _, text in stream_a)
+    assert data + interleaved == expected
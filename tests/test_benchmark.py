@@ -0,0 +1,58 @@
+import os
+
+import numpy as np
+import pytest
+
+from text_data_augmentation.benchmark import (
+    MODEL_BACKED,
+    compare,
+    run_benchmarks,
+    save_baseline,
+    synthetic_corpus,
+)
+
+
+def test_synthetic_corpus():
+    texts = synthetic_corpus(200, median_words=20, sigma=0.5, seed=1)
+    assert texts == synthetic_corpus(200, median_words=20, sigma=0.5, seed=1)
+    lengths = [len(text.split()) for text in texts]
+    assert 15 <= np.median(lengths) <= 25
+    assert {len(text.split()) for text in synthetic_corpus(20, 8, 0)} == {8}
+
+
+def test_run_benchmarks(tmp_path):
+    texts = synthetic_corpus(20)
+    results = run_benchmarks(
+        texts,
+        ["CharacterNoise", "KeyBoardNoise"],
+        alphas=[0.1],
+        n_augs=[2],
+        batch_sizes=[1, 8],
+        isolate=False,
+    )
+    assert len(results) == 4
+    for result in results:
+        assert result["n_outputs"] == 2 * len(texts)
+        assert result["latency_p50_ms"] <= result["latency_p99_ms"]
+    path = os.path.join(tmp_path, "baseline.json")
+    save_baseline(results, path)
+    assert compare(results, path) == []
+    slower = [dict(r, records_per_second=r["records_per_second"] / 2) for r in results]
+    assert len(compare(slower, path)) == 4
+
+
+def test_run_benchmarks_tiny_models(tmp_path):
+    for module in ["torch", "transformers", "spacy"]:
+        pytest.importorskip(module)
+    texts = synthetic_corpus(8, median_words=12)
+    results = run_benchmarks(
+        texts,
+        sorted(MODEL_BACKED),
+        n_augs=[2],
+        batch_sizes=[4],
+        directory=str(tmp_path),
+        isolate=False,
+    )
+    assert [result["augmenter"] for result in results] == sorted(MODEL_BACKED)
+    for result in results:
+        assert result["n_outputs"] >= len(texts)
@@ -0,0 +1,87 @@
+import os
+import pickle
+
+from text_data_augmentation import Augmenter, ResultCache
+
+
+class UpperCase(Augmenter):
+    def __init__(self, cache):
+        self.cache = cache
+        self.disable_progress = True
+        self.augmented = []
+
+    def _augment_record(self, index, text):
+        self.augmented.append(text)
+        return [text.upper(), text.lower()]
+
+    def _cache_config(self):
+        return {"model": "upper"}
+
+
+class Shuffle(Augmenter):
+    def __init__(self, cache, seed=0):
+        self.cache = cache
+        self.seed = seed
+        self.disable_progress = True
+
+    def _augment_record(self, index, text):
+        chars = list(text)
+        self._random_state(index).shuffle(chars)
+        return ["".join(chars)]
+
+    def _cache_config(self):
+        return {"model": "shuffle", "seed": self.seed}
+
+
+def test_result_cache_tiers(tmp_path):
+    path = os.path.join(tmp_path, "cache.sqlite")
+    cache = ResultCache(path, max_size=1)
+    cache.put_many([("a", ["x"]), ("b", ["y", "z"])])
+    assert list(cache.memory) == ["b"]
+    assert cache.get("a") == ["x"]
+    assert cache.get("c") is None
+    assert (cache.hits, cache.misses) == (1, 1)
+
+    restored = pickle.loads(pickle.dumps(cache))
+    assert not restored.memory and restored.hits == 0
+    assert restored.get("b") == ["y", "z"]
+    assert ResultCache.key({"n": 1}, "text") != ResultCache.key({"n": 2}, "text")
+
+
+def test_cached_augmenter_skips_seen_texts(tmp_path):
+    path = os.path.join(tmp_path, "cache.sqlite")
+    aug = UpperCase(ResultCache(path))
+    assert aug(["Ab", "Cd", "Ab"]) == [
+        "Ab",
+        "Cd",
+        "Ab",
+        "AB",
+        "ab",
+        "CD",
+        "cd",
+        "AB",
+        "ab",
+    ]
+    assert aug.augmented == ["Ab", "Cd"]
+
+    aug = UpperCase(ResultCache(path))
+    assert aug(["Cd", "Ef"]) == ["Cd", "Ef", "CD", "cd", "EF", "ef"]
+    assert aug.augmented == ["Ef"]
+    assert (aug.cache.hits, aug.cache.misses) == (1, 1)
+
+
+def test_seeded_cached_augmentations_do_not_depend_on_the_cache(tmp_path):
+    path = os.path.join(tmp_path, "cache.sqlite")
+    texts = ["abcdefgh", "ijklmnop", "abcdefgh"]
+    cold = dict(Shuffle(ResultCache(path)).iter_augment(texts))
+    assert cold[0] == cold[2]
+
+    warm = Shuffle(ResultCache(path))
+    assert dict(warm.iter_augment(texts[::-1], start=5)) == {
+        5: cold[2],
+        6: cold[1],
+        7: cold[0],
+    }
+    assert warm.cache.misses == 0
+    fresh = Shuffle(ResultCache(os.path.join(tmp_path, "fresh.sqlite")))
+    assert dict(fresh.iter_augment(texts[1:])) == {0: cold[1], 1: cold[0]}
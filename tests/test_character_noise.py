@@ -8,3 +8,22 @@ def test_character_noise():
     data = json.load(open(os.path.join("tests", "test_data.json")))
     aug = CharacterNoise()
     aug(data)
+
+
+def test_character_noise_edge_cases():
+    data = ["", "  ", "a", "ab  cd", "x y"]
+    aug = CharacterNoise(alpha=0.5, n_aug=6, seed=0, show_progress=False)
+    augmented = aug(data)
+    assert len(augmented) == len(data) * 7
+    assert augmented == aug(data)
+    assert augmented[5:11] == [""] * 6
+
+
+def test_character_noise_operation_counts():
+    # Texts of one word get no insertion at alpha=0.1 but still count them.
+    aug = CharacterNoise(alpha=0.1, n_aug=8, seed=0, show_progress=False)
+    stats = aug.enable_stats()
+    aug(["word", "another"])
+    operations = [n for k, n in stats.counters.items() if k.startswith("operations.")]
+    assert sum(operations) == 16
+    assert stats.counters["operations.insertion"] > 0
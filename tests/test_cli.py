@@ -0,0 +1,120 @@
+import csv
+import json
+import os
+
+import pytest
+
+from text_data_augmentation import Augmenter, KeyBoardNoise
+from text_data_augmentation import cli
+from text_data_augmentation.cli import augment_file, main
+from text_data_augmentation.tfidf import TfidfModel
+
+
+class BatchIndex(Augmenter):
+    """Tags every text with the first index of its batch."""
+
+    batch_size = 4
+
+    def __init__(self, n_jobs=1):
+        self.seed = 0
+        self.n_jobs = n_jobs
+
+    def _augment_batch(self, batch):
+        return [(index, f"{batch[0][0]}: {text}") for index, text in batch]
+
+
+def test_jsonl_resume(tmp_path):
+    data = json.load(open(os.path.join("tests", "test_data.json")))[:20]
+    input_path, output_path = tmp_path / "input.jsonl", tmp_path / "output.jsonl"
+    args = [str(input_path), str(output_path), "--augmenter", "KeyBoardNoise"]
+    args += ["--param", "alpha=0.1", "--param", "n_aug=2", "--seed", "1", "--quiet"]
+    with open(input_path, "w") as f:
+        f.writelines(
+            json.dumps({"id": i, "text": t}) + "\n" for i, t in enumerate(data)
+        )
+    assert main(args + ["--checkpoint-every", "5"]) == 0
+    expected = open(output_path).read()
+
+    # A job killed after the first checkpoint, halfway through writing the next.
+    os.remove(f"{output_path}.checkpoint")
+    with open(input_path, "w") as f:
+        f.writelines(
+            json.dumps({"id": i, "text": t}) + "\n" for i, t in enumerate(data[:5])
+        )
+    assert main(args + ["--checkpoint-every", "5"]) == 0
+    with open(input_path, "a") as f:
+        f.writelines(
+            json.dumps({"id": i, "text": t}) + "\n"
+            for i, t in enumerate(data)
+            if i >= 5
+        )
+    with open(output_path, "a") as f:
+        f.write('{"id": 5, "te')
+    assert main(args + ["--checkpoint-every", "7", "--resume"]) == 0
+    assert open(output_path).read() == expected
+
+    outputs = [json.loads(line) for line in expected.splitlines()]
+    augmenter = KeyBoardNoise(alpha=0.1, n_aug=2, seed=1, show_progress=False)
+    assert [o["text"] for o in outputs] == augmenter(data)[len(data) :]
+    assert [o["id"] for o in outputs] == [o["source_index"] for o in outputs]
+
+
+def test_csv(tmp_path):
+    data = json.load(open(os.path.join("tests", "test_data.json")))[:10]
+    input_path, output_path = tmp_path / "input.csv", tmp_path / "output.csv"
+    with open(input_path, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["label", "review"])
+        writer.writerows([i % 2, t] for i, t in enumerate(data))
+    args = [str(input_path), str(output_path), "--augmenter", "OCRNoise"]
+    args += ["--text-field", "review", "--seed", "2", "--quiet"]
+    assert main(args + ["--param", "n_aug=1"]) == 0
+    with open(output_path, newline="") as f:
+        rows = list(csv.DictReader(f))
+    assert len(rows) == len(data)
+    assert rows[3]["label"] == "1" and rows[3]["source_index"] == "3"
+
+
+def test_resume_keeps_batches(tmp_path, monkeypatch):
+    input_path, output_path = tmp_path / "input.jsonl", tmp_path / "output.jsonl"
+    with open(input_path, "w") as f:
+        f.writelines(json.dumps({"text": str(i)}) + "\n" for i in range(30))
+    augment_file(input_path, output_path, BatchIndex(), checkpoint_every=5)
+    expected = open(output_path).read()
+    assert '"0: 7"' not in expected and '"4: 7"' in expected
+    os.remove(f"{output_path}.checkpoint")
+
+    save_checkpoint = cli.save_checkpoint
+
+    def save_once(path, checkpoint):
+        save_checkpoint(path, checkpoint)
+        raise KeyboardInterrupt
+
+    monkeypatch.setattr(cli, "save_checkpoint", save_once)
+    with pytest.raises(KeyboardInterrupt):
+        augment_file(input_path, output_path, BatchIndex(), checkpoint_every=6)
+    monkeypatch.setattr(cli, "save_checkpoint", save_checkpoint)
+    kwargs = {"checkpoint_every": 7, "resume": True}
+    assert augment_file(input_path, output_path, BatchIndex(n_jobs=2), **kwargs) == 30
+    assert open(output_path).read() == expected
+
+
+def test_tfidf_option(tmp_path):
+    data = json.load(open(os.path.join("tests", "test_data.json")))[:10]
+    input_path, output_path = tmp_path / "input.jsonl", tmp_path / "output.jsonl"
+    with open(input_path, "w") as f:
+        f.writelines(json.dumps(t) + "\n" for t in data)
+    TfidfModel().fit(data).save(tmp_path / "tfidf.npz")
+    args = [str(input_path), str(output_path), "--seed", "1", "--quiet"]
+    with pytest.raises(SystemExit):
+        main(
+            args
+            + ["--augmenter", "KeyBoardNoise", "--tfidf", str(tmp_path / "tfidf.npz")]
+        )
+    with pytest.raises(SystemExit):
+        main(args + ["--augmenter", "SynonymReplacement"])
+    main(
+        args
+        + ["--augmenter", "SynonymReplacement", "--tfidf", str(tmp_path / "tfidf.npz")]
+    )
+    assert len(open(output_path).readlines()) == len(data) * 4
@@ -0,0 +1,40 @@
+import json
+import os
+
+from text_data_augmentation import (
+    CharacterNoise,
+    KeyBoardNoise,
+    OCRNoise,
+    OneOf,
+    Sequential,
+    SomeOf,
+)
+
+
+def test_sequential():
+    data = json.load(open(os.path.join("tests", "test_data.json")))[:20]
+    keyboard = KeyBoardNoise(alpha=0.1, n_aug=2, seed=1, show_progress=False)
+    ocr = OCRNoise(alpha=0.1, n_aug=3, seed=2, show_progress=False)
+    assert Sequential([keyboard], show_progress=False)(data) == keyboard(data)
+    augmented = Sequential([keyboard, ocr], show_progress=False)(data)
+    assert len(augmented) == len(data) * (1 + 2 * 3)
+    assert augmented[: len(data)] == data
+
+
+def test_one_of_and_some_of():
+    data = json.load(open(os.path.join("tests", "test_data.json")))[:20]
+    keyboard = KeyBoardNoise(alpha=0.1, n_aug=2, seed=1, show_progress=False)
+    characters = CharacterNoise(alpha=0.1, n_aug=1, seed=2, show_progress=False)
+    one_of = OneOf([keyboard, characters], weights=[1, 3], seed=3, show_progress=False)
+    augmented = one_of(data)
+    assert augmented == one_of(data)
+    assert len(data) * 2 < len(augmented) < len(data) * 3
+
+    some_of = SomeOf([keyboard, Sequential([characters])], p=[1, 0], seed=4)
+    some_of.disable_progress = True
+    assert some_of(data) == keyboard(data)
+    nested = Sequential([some_of, one_of], seed=5, show_progress=False)
+    nested.batch_size = 7
+    assert [text for text in nested.iter_augment(data)] == list(
+        Sequential([some_of, one_of], seed=5, show_progress=False).iter_augment(data)
+    )
@@ -1,10 +1,72 @@
 import json
 import os
 
-from text_data_augmentation import ContextualWordReplacement
+import pytest
+
+from text_data_augmentation import ContextualWordReplacement, ResultCache
+from text_data_augmentation import contextual_word_replacement
+
+
+class StubTokenizer:
+    mask_token = "[MASK]"
+    model_max_length = 512
+    pieces = {1: "##ing", 2: "cat", 3: "dog"}
+
+    def __call__(self, texts):
+        return {"input_ids": [text.split() for text in texts]}
+
+    def tokenize(self, text):
+        return text.split()
+
+    def convert_ids_to_tokens(self, token):
+        return self.pieces[token]
+
+    def decode(self, tokens, clean_up_tokenization_spaces=True):
+        return " ".join(self.pieces[token] for token in tokens)
+
+
+class StubModel:
+    name_or_path = "stub"
+
+
+class StubPipeline:
+    """Fill-mask pipeline whose most likely candidate is a WordPiece suffix."""
+
+    model = StubModel()
+    tokenizer = StubTokenizer()
+
+    def __call__(self, texts, top_k=5, batch_size=1):
+        candidates = [
+            {"token": token, "token_str": piece}
+            for token, piece in StubTokenizer.pieces.items()
+        ]
+        outputs = [list(candidates) for _ in texts]
+        return outputs[0] if len(texts) == 1 else outputs
 
 
 def test_contextual_word_replacement():
     data = json.load(open(os.path.join("tests", "test_data.json")))[:10]
     aug = ContextualWordReplacement()
     aug(data)
+
+
+def test_subword_candidates_are_skipped(monkeypatch):
+    monkeypatch.setattr(
+        contextual_word_replacement, "pipeline", lambda *args, **kwargs: StubPipeline()
+    )
+    aug = ContextualWordReplacement(
+        n_aug=4, use_tfidf=False, samples_per_mask=2, seed=0, show_progress=False
+    )
+    augmented = aug(["the bird sat", "a fish swam"])[2:]
+    assert len(augmented) == 8
+    assert all("#" not in text and "ing" not in text for text in augmented)
+    assert all("cat" in text or "dog" in text for text in augmented)
+
+
+def test_cache_needs_a_fitted_tfidf_model(monkeypatch):
+    monkeypatch.setattr(
+        contextual_word_replacement, "pipeline", lambda *args, **kwargs: StubPipeline()
+    )
+    aug = ContextualWordReplacement(n_aug=2, seed=0, cache=ResultCache())
+    with pytest.raises(ValueError, match="TF-IDF model"):
+        list(aug.iter_augment(["the bird sat"]))
@@ -0,0 +1,51 @@
+import json
+import os
+
+from text_data_augmentation import Augmenter, Deduplicate, KeyBoardNoise
+
+
+class Suffix(Augmenter):
+    def __init__(self, n_aug, choices):
+        self.n_aug = n_aug
+        self.choices = choices
+        self.seed = 0
+        self.disable_progress = True
+
+    def _augment_record(self, index, text):
+        rng = self._random_state(index)
+        return [text + rng.choice(self.choices) for _ in range(self.n_aug)]
+
+
+def test_record_scope():
+    data = ["a text", "another text"]
+    augmented = Deduplicate(Suffix(3, ["", " x", " y", " z"]), show_progress=False)(
+        data
+    )
+    for text in data:
+        outputs = [a for a in augmented[len(data) :] if a.startswith(text + " ")]
+        assert len(outputs) == len(set(outputs)) <= 3
+        assert text not in outputs
+
+    short = Deduplicate(Suffix(3, ["", " x"]), max_retries=2, show_progress=False)
+    short.enable_stats()
+    assert len(short(data)) == len(data) * 2
+    assert short.stats.counters["short"] == len(data) * 2
+
+
+def test_near_duplicates_and_corpus_scope():
+    data = json.load(open(os.path.join("tests", "test_data.json")))[:20]
+    keyboard = KeyBoardNoise(alpha=0.01, n_aug=3, seed=1, show_progress=False)
+    near = Deduplicate(keyboard, threshold=0.8, max_retries=0, show_progress=False)
+    near.enable_stats()
+    exact = Deduplicate(keyboard, max_retries=0, show_progress=False)
+    assert len(data) <= len(near(data)) < len(exact(data))
+    assert near.stats.counters["dropped.near"] > 0
+
+    corpus = Deduplicate(
+        Suffix(1, [" x", " y"]), scope="corpus", max_retries=0, show_progress=False
+    )
+    assert len(corpus(["same"] * 5)) == 5 + 2
+    bounded = Deduplicate(
+        Suffix(1, [" x"]), scope="corpus", max_corpus_items=1, show_progress=False
+    )
+    assert bounded(["a", "b", "a"]) == ["a", "b", "a", "a x", "b x", "a x"]
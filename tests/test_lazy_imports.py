@@ -0,0 +1,44 @@
+import json
+import subprocess
+import sys
+
+import pytest
+
+HEAVY_MODULES = [
+    "torch",
+    "transformers",
+    "spacy",
+    "sklearn",
+    "tensorflow",
+    "nltk",
+    "pyarrow",
+]
+
+IMPORT_SCRIPT = """
+import json
+import sys
+
+from text_data_augmentation import KeyBoardNoise, OCRNoise, WordSplit
+
+KeyBoardNoise(), OCRNoise(), WordSplit()
+print(json.dumps({"modules": sorted(sys.modules)}))
+"""
+
+
+def _run_import_script():
+    output = subprocess.check_output([sys.executable, "-c", IMPORT_SCRIPT])
+    return json.loads(output)
+
+
+def test_light_augmenters_do_not_import_heavy_dependencies():
+    modules = set(_run_import_script()["modules"])
+    assert not modules.intersection(HEAVY_MODULES)
+
+
+def test_lazy_attributes():
+    import text_data_augmentation
+
+    assert "KeyBoardNoise" in dir(text_data_augmentation)
+    assert text_data_augmentation.KeyBoardNoise.__name__ == "KeyBoardNoise"
+    with pytest.raises(AttributeError):
+        text_data_augmentation.DoesNotExist
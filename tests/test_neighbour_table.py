@@ -0,0 +1,42 @@
+import numpy as np
+
+from text_data_augmentation.neighbour_table import NeighbourTable
+
+
+def _most_similar(data, rows, n):
+    vectors = data[rows] / np.linalg.norm(data[rows], axis=1, keepdims=True)
+    return rows[np.argsort(-(vectors @ vectors.T), axis=1)[:, :n]]
+
+
+def test_neighbour_table():
+    data = np.random.default_rng(0).normal(size=(500, 20)).astype(np.float32)
+    rows = np.arange(0, 500, 2)
+    expected = _most_similar(data, rows, 10)
+    for quantize, min_overlap in [(False, 1.0), (True, 0.95)]:
+        table = NeighbourTable.build(
+            data, n_neighbours=10, rows=rows, block_size=64, quantize=quantize
+        )
+        assert table.neighbours.dtype == np.int32
+        assert (table.neighbours[1::2] == -1).all()
+        actual = table.neighbours[rows]
+        assert (actual[:, 0] == rows).all()
+        overlap = np.mean([len(set(a) & set(e)) / 10 for a, e in zip(actual, expected)])
+        assert overlap >= min_overlap
+
+
+def test_neighbour_table_save_load(tmp_path):
+    data = np.random.default_rng(0).normal(size=(100, 8))
+    table = NeighbourTable.build(data, n_neighbours=5)
+    table.save(tmp_path / "neighbours.npy")
+    loaded = NeighbourTable.load(tmp_path / "neighbours.npy")
+    assert isinstance(loaded.neighbours, np.memmap)
+    assert np.array_equal(loaded.neighbours, table.neighbours)
+
+
+def test_neighbour_table_queries():
+    data = np.random.default_rng(0).normal(size=(200, 8))
+    table = NeighbourTable.build(data, n_neighbours=5, queries=[3, 7])
+    assert np.array_equal(
+        table.neighbours[[3, 7]], _most_similar(data, np.arange(200), 5)[[3, 7]]
+    )
+    assert (np.delete(table.neighbours, [3, 7], axis=0) == -1).all()
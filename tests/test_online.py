@@ -0,0 +1,35 @@
+import asyncio
+import json
+import os
+
+from text_data_augmentation import KeyBoardNoise, MicroBatcher
+
+
+def test_augment_async():
+    data = json.load(open(os.path.join("tests", "test_data.json")))[:50]
+    aug = KeyBoardNoise(alpha=0.1, n_aug=2, seed=1, show_progress=False)
+    aug.batch_size = 8
+    stats = aug.enable_stats()
+
+    async def augment():
+        return await asyncio.gather(*(aug.augment_async(text) for text in data))
+
+    augmented = asyncio.run(augment())
+    assert [text for output in augmented for text in output] == aug(data)[len(data) :]
+    assert stats.counters["batched_requests"] == len(data)
+    assert stats.counters["flush.full"] == len(data) // 8
+    assert stats.histograms["queue_depth"]
+
+
+def test_backpressure_and_close():
+    data = json.load(open(os.path.join("tests", "test_data.json")))[:20]
+    aug = KeyBoardNoise(alpha=0.1, n_aug=1, seed=1, show_progress=False)
+
+    async def augment():
+        async with MicroBatcher(aug, max_batch_size=4, max_pending=2) as batcher:
+            tasks = [asyncio.ensure_future(batcher.augment(text)) for text in data]
+            await asyncio.sleep(0)
+            assert batcher.queue_depth <= 2
+            return await asyncio.gather(*tasks)
+
+    assert all(len(output) == 1 for output in asyncio.run(augment()))
@@ -0,0 +1,53 @@
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from text_data_augmentation import Augmenter, CharacterNoise, KeyBoardNoise, OCRNoise
+from text_data_augmentation.parallel import AugmenterPool
+
+
+class BatchIndex(Augmenter):
+    """Tags every text with the first index of its batch."""
+
+    batch_size = 5
+    disable_progress = True
+
+    def __init__(self, seed=None, n_jobs=1):
+        self.seed = seed
+        self.n_jobs = n_jobs
+
+    def _augment_batch(self, batch):
+        return [(index, f"{batch[0][0]}: {text}") for index, text in batch]
+
+
+def test_parallel_matches_serial():
+    data = json.load(open(os.path.join("tests", "test_data.json")))
+    for augmenter in [CharacterNoise, KeyBoardNoise, OCRNoise]:
+        serial = augmenter(alpha=0.1, seed=3, show_progress=False)
+        parallel = augmenter(alpha=0.1, seed=3, show_progress=False, n_jobs=2)
+        parallel.chunk_size = 7
+        assert parallel(data) == serial(data)
+
+
+def test_parallel_executor():
+    data = json.load(open(os.path.join("tests", "test_data.json")))
+    aug = KeyBoardNoise(alpha=0.1, show_progress=False)
+    with ProcessPoolExecutor(max_workers=2) as executor:
+        streamed = list(aug.iter_augment(data, executor=executor))
+    assert streamed == list(aug.iter_augment(data))
+
+    # An AugmenterPool holds the augmenter, which is not sent with the chunks.
+    with AugmenterPool(aug, 2) as pool:
+        aug.unpicklable = lambda: None
+        for start in range(0, len(data), 10):
+            assert list(aug.iter_augment(data[start : start + 10], start, pool)) == [
+                record for record in streamed if start <= record[0] < start + 10
+            ]
+
+
+def test_parallel_keeps_batches():
+    data = json.load(open(os.path.join("tests", "test_data.json")))
+    serial = BatchIndex(seed=0)
+    parallel = BatchIndex(seed=0, n_jobs=2)
+    parallel.chunk_size = 7
+    assert parallel(data) == serial(data)
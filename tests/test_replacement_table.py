@@ -0,0 +1,23 @@
+import numpy as np
+
+from text_data_augmentation.replacement_table import ReplacementTable
+
+
+def _bits(sentences, n_aug, seed=0):
+    size = n_aug * len("".join(sentences))
+    return np.random.default_rng(seed).integers(2**32, size=size, dtype=np.uint32)
+
+
+def test_replacement_table():
+    table = ReplacementTable({"a": ["", "xyz"], "b": ["q"]})
+    sentences = ["ab", "", "aab", "c"]
+    augmented = table.replace(sentences, 1.0, 3, _bits(sentences, 3))
+    assert len(augmented) == 12
+    assert augmented[3:6] == ["", "", ""]
+    assert augmented[9:] == ["c", "c", "c"]
+    for text in augmented[:3]:
+        assert text in ["q", "xyzq"]
+    assert augmented == table.replace(sentences, 1.0, 3, _bits(sentences, 3))
+    assert table.replace(sentences, 0.0, 2, _bits(sentences, 2)) == [
+        s for s in sentences for _ in range(2)
+    ]
@@ -0,0 +1,77 @@
+import json
+import os
+
+import pytest
+
+from text_data_augmentation import Deduplicate, KeyBoardNoise, OCRNoise, Sequential
+from text_data_augmentation.cli import main
+from text_data_augmentation.sharding import iter_shard, merge_manifests, shard_of
+
+
+def test_shards_match_single_run(tmp_path):
+    data = json.load(open(os.path.join("tests", "test_data.json")))
+    aug = KeyBoardNoise(alpha=0.1, n_aug=2, seed=1, show_progress=False)
+    single = list(iter_shard(aug, data, 0, 1, manifest=str(tmp_path / "all.json")))
+    assert [text for _, text in single] == aug(data)[len(data) :]
+
+    shards = []
+    for shard_id in range(4):
+        manifest = str(tmp_path / f"{shard_id}.json")
+        shards.extend(iter_shard(aug, data, shard_id, 4, manifest=manifest))
+        assert all(shard_of(i, 4) == shard_id for i, _ in shards[-5:])
+    assert sorted(shards) == sorted(single)
+
+    merged = merge_manifests([str(tmp_path / f"{i}.json") for i in range(4)])
+    assert (
+        merged.output_digest
+        == merge_manifests([str(tmp_path / "all.json")]).output_digest
+    )
+    assert merged.n_augmentations == len(single)
+    with pytest.raises(ValueError):
+        merge_manifests([str(tmp_path / f"{i}.json") for i in range(3)])
+    with pytest.raises(ValueError):
+        list(
+            KeyBoardNoise(show_progress=False).iter_augment(
+                data, shard_id=0, num_shards=2
+            )
+        )
+
+
+def test_cli_shards(tmp_path):
+    data = json.load(open(os.path.join("tests", "test_data.json")))[:30]
+    input_path = tmp_path / "input.jsonl"
+    with open(input_path, "w") as f:
+        f.writelines(json.dumps(text) + "\n" for text in data)
+    args = ["--augmenter", "OCRNoise", "--seed", "3", "--quiet"]
+    for shard_id in range(3):
+        output = str(tmp_path / f"output-{shard_id}.jsonl")
+        assert (
+            main(
+                [str(input_path), output]
+                + args
+                + ["--shard-id", str(shard_id), "--num-shards", "3"]
+            )
+            == 0
+        )
+    merged = merge_manifests(
+        [str(tmp_path / f"output-{i}.jsonl.manifest.json") for i in range(3)]
+    )
+    assert merged.n_records == len(data)
+
+
+def test_unshardable_configurations():
+    data = ["a text", "another text"]
+    seeded = KeyBoardNoise(seed=1, show_progress=False)
+    for shard_id, num_shards in [(2, 2), (-1, 2), (0, None), (None, 2)]:
+        with pytest.raises(ValueError):
+            list(seeded.iter_augment(data, shard_id=shard_id, num_shards=num_shards))
+    unseeded = OCRNoise(show_progress=False)
+    for augmenter in [
+        Sequential([seeded, unseeded], seed=1, show_progress=False),
+        Deduplicate(seeded, scope="corpus", seed=1, show_progress=False),
+        Deduplicate(unseeded, seed=1, show_progress=False),
+    ]:
+        with pytest.raises(ValueError):
+            list(augmenter.iter_augment(data, shard_id=0, num_shards=2))
+    sharded = Deduplicate(seeded, seed=1, show_progress=False)
+    assert len(list(sharded.iter_augment(data, shard_id=0, num_shards=1))) > 0
@@ -1,10 +1,26 @@
 import json
 import os
 
-from text_data_augmentation import SimilarWordReplacement
+import numpy as np
+import spacy
+
+from text_data_augmentation import NeighbourTable, SimilarWordReplacement
 
 
 def test_similar_word_replacement():
     data = json.load(open(os.path.join("tests", "test_data.json")))[:10]
     aug = SimilarWordReplacement("en_core_web_lg")
     aug(data)
+
+
+def test_neighbour_table_matches_most_similar():
+    vectors = spacy.load("en_core_web_lg").vocab.vectors
+    keys = list(vectors.key2row)[:: len(vectors.key2row) // 50][:50]
+    queries = np.asarray([vectors[key] for key in keys])
+    _, expected, _ = vectors.most_similar(queries, n=15)
+    for quantize, min_overlap in [(False, 0.99), (True, 0.95)]:
+        rows = [vectors.key2row[key] for key in keys]
+        table = NeighbourTable.from_vectors(vectors, queries=rows, quantize=quantize)
+        actual = table.neighbours[rows]
+        overlap = np.mean([len(set(a) & set(e)) / 15 for a, e in zip(actual, expected)])
+        assert overlap >= min_overlap
@@ -0,0 +1,82 @@
+import json
+import os
+
+import numpy as np
+
+from text_data_augmentation import CharacterNoise, KeyBoardNoise
+from text_data_augmentation.stats import Stats, peak_rss_mb, reset_peak_rss
+
+
+def test_augmenter_stats():
+    data = json.load(open(os.path.join("tests", "test_data.json")))
+    aug = CharacterNoise(alpha=0.1, n_aug=3, seed=1, show_progress=False)
+    assert aug.stats is None
+    stats = aug.enable_stats()
+    aug(data)
+    recorded = stats.as_dict()
+    operations = {
+        name: count
+        for name, count in recorded["counters"].items()
+        if name.startswith("operations.")
+    }
+    assert sum(operations.values()) == 3 * len(data)
+    assert recorded["timers"]["augment"]["calls"] == -(-len(data) // aug.batch_size)
+    assert (
+        recorded["histograms"]["batch_size"]["count"]
+        == recorded["timers"]["augment"]["calls"]
+    )
+    assert recorded["histograms"]["batch_size"]["sum"] == len(data)
+
+    parallel = CharacterNoise(alpha=0.1, n_aug=3, seed=1, show_progress=False, n_jobs=2)
+    parallel.chunk_size = 50
+    parallel.enable_stats()
+    parallel(data)
+    assert parallel.stats.counters == stats.counters
+
+
+def test_stats_export():
+    stats = Stats("KeyBoardNoise")
+    with stats.timer("augment"):
+        stats.count("cache_hits", 2)
+        stats.observe("batch_size", 3)
+        stats.observe("batch_size", 32)
+    text = stats.to_prometheus()
+    assert (
+        'text_data_augmentation_events_total{augmenter="KeyBoardNoise",event="cache_hits"} 2'
+        in text
+    )
+    assert (
+        'text_data_augmentation_batch_size_bucket{augmenter="KeyBoardNoise",le="4"} 1'
+        in text
+    )
+    assert (
+        'text_data_augmentation_batch_size_bucket{augmenter="KeyBoardNoise",le="+Inf"} 2'
+        in text
+    )
+    line = stats.to_json()
+    assert "\n" not in line
+    assert json.loads(line)["timers"]["augment"]["calls"] == 1
+
+    merged = Stats("KeyBoardNoise")
+    merged.merge(stats)
+    merged.merge(stats.as_dict())
+    assert merged.as_dict()["histograms"]["batch_size"]["buckets"]["32"] == 4
+    assert merged.counters["cache_hits"] == 4
+
+
+def test_stats_disabled():
+    aug = KeyBoardNoise(show_progress=False)
+    aug(["A quick brown fox jumps over the lazy dog"])
+    assert aug.stats is None
+
+
+def test_peak_rss():
+    if not reset_peak_rss():
+        return
+    before = peak_rss_mb()
+    block = np.ones(64 * 2**20 // 8)
+    during = peak_rss_mb()
+    del block
+    assert during >= before + 32
+    reset_peak_rss()
+    assert peak_rss_mb() < during
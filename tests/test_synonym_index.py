@@ -0,0 +1,33 @@
+import pickle
+
+from text_data_augmentation.synonym_index import SynonymIndex
+
+SYNONYMS = {
+    "car": ["car", "auto", "automobile"],
+    "big": ["big", "large"],
+    "café": ["café", "coffeehouse"],
+}
+
+
+def test_synonym_index():
+    index = SynonymIndex.from_synonyms(SYNONYMS)
+    assert len(index) == 3
+    assert "Car" in index and "truck" not in index
+    assert index.synonyms("CAR") == ("auto", "automobile", "car")
+    assert index.synonyms("café") == ("café", "coffeehouse")
+
+
+def test_synonym_index_cache():
+    index = SynonymIndex.from_synonyms(SYNONYMS, cache_size=2)
+    for word in ["car", "big", "car", "café"]:
+        index.synonyms(word)
+    assert list(index.cache) == ["car", "café"]
+
+
+def test_synonym_index_save_load(tmp_path):
+    SynonymIndex.from_synonyms(SYNONYMS).save(tmp_path / "synonyms.idx")
+    index = SynonymIndex.load(tmp_path / "synonyms.idx")
+    assert index.synonyms("big") == ("big", "large")
+    index = pickle.loads(pickle.dumps(index))
+    assert index.path == tmp_path / "synonyms.idx"
+    assert index.synonyms("car") == ("auto", "automobile", "car")
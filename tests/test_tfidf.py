@@ -0,0 +1,89 @@
+import json
+import os
+import random
+
+import numpy as np
+import pytest
+from sklearn.feature_extraction.text import TfidfVectorizer
+
+from text_data_augmentation import Augmenter
+from text_data_augmentation.tfidf import TfidfModel, TfidfWeighting
+
+
+class UpperCaseWord(TfidfWeighting, Augmenter):
+    def __init__(self, tfidf=None, seed=None, n_jobs=1):
+        self.use_tfidf = True
+        self.tfidf = tfidf
+        self.seed = seed
+        self.n_jobs = n_jobs
+        self.disable_progress = True
+
+    def _augment_batch(self, batch):
+        weights = self._tfidf_weights([text for _, text in batch])
+        augmented = []
+        for row, (index, text) in enumerate(batch):
+            word = weights.sample(row, self._random_state(index))
+            augmented.append((index, text.replace(word or "", (word or "").upper())))
+        return augmented
+
+
+def test_tfidf_weights():
+    data = json.load(open(os.path.join("tests", "test_data.json")))
+    tvec = TfidfVectorizer().fit(data)
+    feature_names = tvec.get_feature_names_out()
+    weights = TfidfModel().fit(data).weights(data[:10])
+    for row, sentence in enumerate(data[:10]):
+        v = np.ravel(tvec.transform([sentence]).todense())
+        c = np.max(v)
+        z = np.sum(c - v) / np.mean(v)
+        dense = np.where(v != 0, np.minimum(0.7 * (c - v) / z, 1), 0)
+        start, end = weights.indptr[row], weights.indptr[row + 1]
+        expected = {feature_names[i]: dense[i] for i in np.flatnonzero(v)}
+        actual = dict(zip(weights.words[start:end], weights.weights[start:end]))
+        assert actual.keys() == expected.keys()
+        assert np.allclose([actual[w] for w in expected], list(expected.values()))
+
+
+def test_tfidf_sample():
+    model = TfidfModel().fit(["the cat sat", "the dog ran", "a bird"])
+    weights = model.weights(["the cat sat on the mat", "", "bird"])
+    rng = random.Random(0)
+    assert {weights.sample(0, rng) for _ in range(50)} <= {"the", "cat", "sat"}
+    assert weights.sample(1, rng) is None
+    assert weights.sample(2, rng) == "bird"
+    for _ in range(20):
+        sampled = weights.sample_distinct(0, rng, 2)
+        assert len(set(sampled)) == 2 and set(sampled) <= {"the", "cat", "sat"}
+    assert sorted(weights.sample_distinct(0, rng, 5)) == ["cat", "sat", "the"]
+    assert weights.sample_distinct(1, rng, 2) == []
+
+
+def test_tfidf_save_load(tmp_path):
+    data = json.load(open(os.path.join("tests", "test_data.json")))
+    for model in [TfidfModel(), TfidfModel(n_features=2**16)]:
+        for start in range(0, len(data), 10):
+            model.partial_fit(data[start : start + 10])
+        model.save(tmp_path / "tfidf.npz")
+        loaded = TfidfModel.load(tmp_path / "tfidf.npz")
+        assert loaded.n_documents == model.n_documents == len(data)
+        expected, actual = model.weights(data), loaded.weights(data)
+        assert actual.words == expected.words
+        assert np.array_equal(actual.weights, expected.weights)
+        assert loaded.fingerprint() == model.fingerprint()
+        assert model.partial_fit(["new"]).fingerprint() != loaded.fingerprint()
+
+
+def test_tfidf_weighting():
+    data = json.load(open(os.path.join("tests", "test_data.json")))
+    aug = UpperCaseWord(seed=1)
+    augmented = aug(data)
+    assert aug.tfidf is None
+    with pytest.raises(ValueError):
+        list(aug.iter_augment(data))
+
+    aug.fit(data)
+    aug.batch_size = 3
+    assert [text for _, text in aug.iter_augment(data)] == augmented[len(data) :]
+    parallel = UpperCaseWord(aug.tfidf, seed=1, n_jobs=2)
+    parallel.chunk_size = 7
+    assert parallel(data) == augmented
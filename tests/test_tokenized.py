@@ -0,0 +1,41 @@
+import json
+import os
+import pickle
+
+import nltk
+
+from text_data_augmentation import EasyDataAugmentation, TokenizedDocument, WordSplit
+from text_data_augmentation.tokenized import chunk_sentences
+
+
+def test_tokenized_document():
+    data = json.load(open(os.path.join("tests", "test_data.json")))[:10]
+    for text in data:
+        doc = TokenizedDocument(text)
+        assert doc == text
+        assert list(doc.words) == nltk.word_tokenize(text)
+        assert list(doc.sentences) == nltk.sent_tokenize(text)
+        assert len(doc.spans) == len(doc.words)
+        assert doc.sentence_starts[-1] == len(doc.words)
+        restored = pickle.loads(pickle.dumps(doc))
+        assert restored.words == doc.words and restored.spans == doc.spans
+
+
+def test_augmenters_reuse_tokens():
+    data = json.load(open(os.path.join("tests", "test_data.json")))[:10]
+    docs = [TokenizedDocument(text) for text in data]
+    for augmenter in [EasyDataAugmentation, WordSplit]:
+        aug = augmenter(seed=5, show_progress=False)
+        assert aug(docs) == aug(data)
+
+
+def test_chunk_sentences():
+    def tokenizer(texts):
+        return {"input_ids": [text.split() for text in texts]}
+
+    docs = ["One two. Three four five. Six.", "A very long sentence here.", ""]
+    assert chunk_sentences(docs, tokenizer, 4) == [
+        ["One two.", "Three four five. Six."],
+        ["A very long sentence here."],
+        [],
+    ]
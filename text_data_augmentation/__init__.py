@@ -1,13 +1,47 @@
 __version__ = "2.0.0"
 
-from .abstractive_summarization import *
-from .back_translation import *
-from .character_noise import *
-from .contextual_word_replacement import *
-from .easy_data_augmentation import *
-from .keyboard_noise import *
-from .ocr_noise import *
-from .paraphrasing import *
-from .similar_word_replacement import *
-from .synonym_replacement import *
-from .word_split import *
+import importlib
+
+# Augmenters are resolved lazily on first attribute access so that importing the
+# package (or a light augmenter such as KeyBoardNoise) does not pull in torch,
+# transformers, spaCy or scikit-learn.
+_LAZY_ATTRIBUTES = {
+    "AbstractiveSummarization": "abstractive_summarization",
+    "Augmenter": "base",
+    "BackTranslation": "back_translation",
+    "CharacterNoise": "character_noise",
+    "ContextualWordReplacement": "contextual_word_replacement",
+    "Deduplicate": "dedup",
+    "EasyDataAugmentation": "easy_data_augmentation",
+    "KeyBoardNoise": "keyboard_noise",
+    "MicroBatcher": "online",
+    "NeighbourTable": "neighbour_table",
+    "OCRNoise": "ocr_noise",
+    "OneOf": "compose",
+    "Paraphrase": "paraphrasing",
+    "ResultCache": "cache",
+    "Sequential": "compose",
+    "ShardManifest": "sharding",
+    "SimilarWordReplacement": "similar_word_replacement",
+    "SomeOf": "compose",
+    "SynonymIndex": "synonym_index",
+    "SynonymReplacement": "synonym_replacement",
+    "TfidfModel": "tfidf",
+    "TokenizedDocument": "tokenized",
+    "WordSplit": "word_split",
+}
+
+__all__ = sorted(_LAZY_ATTRIBUTES)
+
+
+def __getattr__(name):
+    if name not in _LAZY_ATTRIBUTES:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    module = importlib.import_module(f".{_LAZY_ATTRIBUTES[name]}", __name__)
+    value = getattr(module, name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
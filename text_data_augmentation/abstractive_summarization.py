@@ -1,24 +1,136 @@
-import random
+import time
+from collections import deque
 
-from tqdm.auto import tqdm
+import torch
 from transformers import pipeline
 
+from .base import Augmenter
+from .stats import peak_rss_mb, reset_peak_rss
+from .tokenized import chunk_sentences
 
-class AbstractiveSummarization:
+
+class AbstractiveSummarization(Augmenter):
     """AbstractiveSummarization Augmentation summarizes the model using transformer models.
 
     Args:
         model (string, optional): Transformer model. Defaults to sshleifer/distilbart-cnn-12-6
         show_progress (bool, optional): Set True to display progress bar.
             Defaults to True.
+        model_batch_size (int, optional): Number of texts summarized per forward
+            pass. Defaults to 8.
+        map_reduce (bool, optional): Whether to split the texts longer than
+            max_tokens into chunks of sentences, summarize the chunks and then the
+            concatenation of their summaries. Otherwise long texts are truncated.
+            Defaults to False.
+        max_tokens (int, optional): Token budget of the chunks. Defaults to None,
+            the maximum input length of the model.
+        cache (ResultCache, optional): Cache of the augmentations of the texts seen
+            before, which skip inference. Defaults to None.
+        max_bucket_stats (int, optional): Number of buckets whose stats are kept in
+            bucket_stats, the oldest being dropped first. Measuring the peak memory
+            of a bucket resets the peak counters of the whole process, those of
+            torch.cuda on a GPU and the peak RSS on the CPU. Defaults to 0, which
+            records no bucket stats and leaves the counters alone.
     """
 
-    def __init__(self, model=None, show_progress=True):
+    def __init__(
+        self,
+        model=None,
+        show_progress=True,
+        model_batch_size=8,
+        map_reduce=False,
+        max_tokens=None,
+        cache=None,
+        max_bucket_stats=0,
+    ):
         self.model = pipeline("summarization", model=model)
         self.disable_progress = not show_progress
+        self.model_batch_size = model_batch_size
+        self.map_reduce = map_reduce
+        self.max_tokens = max_tokens or self.model.tokenizer.model_max_length
+        self.bucket_stats = deque(maxlen=max_bucket_stats)
+        self.cache = cache
+
+    def __summarize(self, texts):
+        """Returns the summary of every text.
+
+        The texts are sorted by length and summarized in buckets of
+        model_batch_size, the throughput and peak memory of every bucket being
+        appended to bucket_stats if it keeps any, and its duration recorded by the
+        "bucket" timer of the stats.
+        """
+        if not texts:
+            return []
+        lengths = [len(ids) for ids in self.model.tokenizer(texts)["input_ids"]]
+        order = sorted(range(len(texts)), key=lengths.__getitem__)
+        summaries = [None] * len(texts)
+        measure = bool(self.bucket_stats.maxlen)
+        on_gpu = self.model.device.type == "cuda"
+        for start in range(0, len(order), self.model_batch_size):
+            bucket = order[start : start + self.model_batch_size]
+            if measure and on_gpu:
+                torch.cuda.reset_peak_memory_stats(self.model.device)
+            elif measure:
+                peak_known = reset_peak_rss()
+            started = time.perf_counter()
+            with self._timer("bucket"):
+                outputs = self.model(
+                    [texts[i] for i in bucket],
+                    batch_size=self.model_batch_size,
+                    truncation=True,
+                )
+            seconds = time.perf_counter() - started
+            for i, output in zip(bucket, outputs):
+                summaries[i] = output["summary_text"]
+            if not measure:
+                continue
+            if on_gpu:
+                peak = torch.cuda.max_memory_allocated(self.model.device) / 2**20
+            else:
+                # Without a way to reset it, the peak would be that of the process.
+                peak = peak_rss_mb() if peak_known else None
+            self.bucket_stats.append(
+                {
+                    "n_texts": len(bucket),
+                    "max_length": lengths[bucket[-1]],
+                    "seconds": seconds,
+                    "texts_per_second": len(bucket) / seconds if seconds else None,
+                    "peak_memory_mb": peak,
+                }
+            )
+        return summaries
+
+    def __map_reduce(self, docs):
+        # Map: the chunks of all the documents are summarized together. Reduce: the
+        # joined summaries of the documents of several chunks are summarized again.
+        with self._timer("chunk"):
+            chunks = chunk_sentences(docs, self.model.tokenizer, self.max_tokens)
+        with self._timer("map"):
+            summaries = self.__summarize([chunk for c in chunks for chunk in c])
+        joined, start = [], 0
+        for doc, doc_chunks in zip(docs, chunks):
+            joined.append(" ".join(summaries[start : start + len(doc_chunks)]) or doc)
+            start += len(doc_chunks)
+        reduce = [i for i, doc_chunks in enumerate(chunks) if len(doc_chunks) > 1]
+        self._count("reduced", len(reduce))
+        with self._timer("reduce"):
+            reduced = self.__summarize([joined[i] for i in reduce])
+        for i, summary in zip(reduce, reduced):
+            joined[i] = summary
+        return joined
+
+    def _augment_batch(self, batch):
+        docs = [doc for _, doc in batch]
+        if self.map_reduce:
+            summaries = self.__map_reduce(docs)
+        else:
+            with self._timer("summarize"):
+                summaries = self.__summarize(docs)
+        return [(index, summary) for (index, _), summary in zip(batch, summaries)]
 
-    def __call__(self, x):
-        augmented = []
-        for sentence in tqdm(x, disable=self.disable_progress):
-            augmented.append(self.model(sentence)[0]["summary_text"])
-        return list(x) + augmented
+    def _cache_config(self):
+        return {
+            "model": self.model.model.name_or_path,
+            "map_reduce": self.map_reduce,
+            "max_tokens": self.max_tokens,
+        }
@@ -0,0 +1,179 @@
+import os
+
+from .sharding import iter_shard
+
+FORMATS = ("parquet", "arrow")
+
+
+def _pyarrow():
+    try:
+        import pyarrow
+    except ImportError as e:
+        raise ImportError(
+            "Arrow output requires pyarrow, install text-data-augmentation[arrow]."
+        ) from e
+    return pyarrow
+
+
+def schema():
+    """Returns the schema of the augmentations as Arrow tables.
+
+    Returns:
+        pyarrow.Schema: source_index, the index of the text augmented, aug_index,
+            the position of the augmentation among those of the text, augmenter,
+            the dictionary encoded name of the augmenter, and text.
+    """
+    pa = _pyarrow()
+    return pa.schema(
+        [
+            pa.field("source_index", pa.int64(), nullable=False),
+            pa.field("aug_index", pa.int32(), nullable=False),
+            pa.field("augmenter", pa.dictionary(pa.int32(), pa.string())),
+            pa.field("text", pa.string()),
+        ]
+    )
+
+
+def iter_record_batches(
+    augmenter,
+    x,
+    start=0,
+    batch_rows=65536,
+    executor=None,
+    shard_id=None,
+    num_shards=None,
+    manifest=None,
+):
+    """Augments texts lazily into Arrow record batches.
+
+    The augmentations are gathered straight into the columns of the batches,
+    whose text column holds them in a contiguous buffer with their offsets. The
+    texts augmented are not repeated, source_index maps every row back to them.
+    With num_shards, only the texts of shard shard_id are augmented, through
+    sharding.iter_shard.
+
+    Args:
+        augmenter (Augmenter): Augmenter to apply.
+        x (iterable): Texts to augment.
+        start (int, optional): Index of the first text. Defaults to 0.
+        batch_rows (int, optional): Number of rows of a batch. Defaults to 65536.
+        executor (concurrent.futures.Executor, optional): Executor passed on to
+            iter_augment. Defaults to None.
+        shard_id (int, optional): Shard to augment. Defaults to None.
+        num_shards (int, optional): Number of shards. Defaults to None,
+            augmenting every text.
+        manifest (str, optional): Path to save the manifest of the shard to once
+            it is done. Defaults to None.
+
+    Yields:
+        pyarrow.RecordBatch: Batches of at most batch_rows augmentations, with the
+            columns of schema().
+    """
+    pa = _pyarrow()
+    batch_schema = schema()
+    name = pa.array([type(augmenter).__name__])
+    sources, aug_indices, texts = [], [], []
+    previous, aug_index = None, 0
+
+    def flush():
+        n_rows = len(texts)
+        batch = pa.RecordBatch.from_arrays(
+            [
+                pa.array(sources, pa.int64()),
+                pa.array(aug_indices, pa.int32()),
+                pa.DictionaryArray.from_arrays(
+                    pa.array([0] * n_rows, pa.int32()), name
+                ),
+                pa.array(texts, pa.string()),
+            ],
+            schema=batch_schema,
+        )
+        del sources[:], aug_indices[:], texts[:]
+        return batch
+
+    if num_shards is None:
+        augmentations = augmenter.iter_augment(x, start=start, executor=executor)
+    else:
+        augmentations = iter_shard(
+            augmenter, x, shard_id, num_shards, manifest, start, executor=executor
+        )
+    for source, text in augmentations:
+        # iter_augment yields the augmentations of a text one after the other.
+        aug_index = aug_index + 1 if source == previous else 0
+        previous = source
+        sources.append(source)
+        aug_indices.append(aug_index)
+        texts.append(text)
+        if len(texts) == batch_rows:
+            yield flush()
+    if texts:
+        yield flush()
+
+
+def write_arrow(
+    augmenter,
+    x,
+    path,
+    fmt=None,
+    start=0,
+    batch_rows=65536,
+    compression="zstd",
+    executor=None,
+    shard_id=None,
+    num_shards=None,
+    manifest=None,
+):
+    """Augments texts into a Parquet file or an Arrow IPC file, one record batch at
+    a time.
+
+    Arrow IPC files can be memory mapped and read without copying, e.g. with
+    pyarrow.ipc.open_file(pyarrow.memory_map(path)).read_all().
+
+    Args:
+        augmenter (Augmenter): Augmenter to apply.
+        x (iterable): Texts to augment.
+        path (str): File to write.
+        fmt (str, optional): "parquet" or "arrow". Defaults to None, using
+            "parquet" for paths ending in .parquet and "arrow" otherwise.
+        start (int, optional): Index of the first text. Defaults to 0.
+        batch_rows (int, optional): Number of rows of a record batch, and of a
+            Parquet row group. Defaults to 65536.
+        compression (str, optional): Compression codec of the file, None for
+            none. Defaults to "zstd".
+        executor (concurrent.futures.Executor, optional): Executor passed on to
+            iter_augment. Defaults to None.
+        shard_id (int, optional): Shard to augment. Defaults to None.
+        num_shards (int, optional): Number of shards. Defaults to None,
+            augmenting every text.
+        manifest (str, optional): Path to save the manifest of the shard to once
+            it is done. Defaults to None.
+
+    Returns:
+        int: Number of augmentations written.
+    """
+    pa = _pyarrow()
+    if fmt is None:
+        is_parquet = os.path.splitext(path)[1].lower() == ".parquet"
+        fmt = "parquet" if is_parquet else "arrow"
+    if fmt not in FORMATS:
+        raise ValueError(f"Invalid format {fmt}, valid formats are: parquet, arrow.")
+    batches = iter_record_batches(
+        augmenter, x, start, batch_rows, executor, shard_id, num_shards, manifest
+    )
+    if fmt == "parquet":
+        import pyarrow.parquet as pq
+
+        writer = pq.ParquetWriter(path, schema(), compression=compression or "none")
+    else:
+        options = pa.ipc.IpcWriteOptions(compression=compression)
+        writer = pa.ipc.new_file(path, schema(), options=options)
+    n_rows = 0
+    with writer:
+        for batch in batches:
+            if fmt == "parquet":
+                # Every record batch becomes a row group.
+                writer.write_table(pa.Table.from_batches([batch]))
+            else:
+                writer.write_batch(batch)
+            n_rows += batch.num_rows
+    return n_rows
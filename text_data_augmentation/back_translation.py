@@ -1,9 +1,12 @@
-from tqdm.auto import tqdm
-from transformers import AutoModelForSeq2SeqLM, MarianTokenizer
-from transformers.pipelines import base
+import torch
+from transformers import AutoModelForSeq2SeqLM, AutoTokenizer
 
+from .base import Augmenter
+from .sampling import sampling_kwargs
+from .tokenized import chunk_sentences
 
-class BackTranslation:
+
+class BackTranslation(Augmenter):
     """Back translation augmentation relies on translating text data to
     another language and then translating it back to the original language.
     This technique allows generating textual data of distinct wording to
@@ -15,39 +18,157 @@ class BackTranslation:
             Defaults to "fr".
         show_progress (bool, optional): Set True to display progress bar.
             Defaults to True.
+        n_aug (int, optional): Number of augmentations to be created for one sentence.
+            Defaults to 1.
+        n_interim (int, optional): Number of translations to the interim language
+            per text, each translated back to ceil(n_aug / n_interim) texts.
+            Defaults to 1.
+        do_sample (bool, optional): Whether to sample the translations instead of
+            keeping the best beams. Defaults to False.
+        model_batch_size (int, optional): Number of texts translated per forward
+            pass. Defaults to 16.
+        seed (int, optional): Random State for reproducibility when sampling. Every
+            translation is sampled with its own generator, seeded by the record
+            and the chunk translated, so sampled outputs do not depend on the
+            batching. Defaults to None.
+        max_tokens (int, optional): Token budget of the chunks of sentences that
+            longer texts are split into and translated separately. Defaults to
+            None, the maximum input length of the model.
+        cache (ResultCache, optional): Cache of the augmentations of the texts seen
+            before, which skip inference. Defaults to None.
+        model_a (str, optional): Name or local path of the model translating to the
+            interim language. Defaults to None,
+            Helsinki-NLP/opus-mt-{base_language}-{interim_language}.
+        model_b (str, optional): Name or local path of the model translating back.
+            Defaults to None,
+            Helsinki-NLP/opus-mt-{interim_language}-{base_language}.
     """
 
-    def __init__(self, base_language="en", interim_language="fr", show_progress=True):
+    def __init__(
+        self,
+        base_language="en",
+        interim_language="fr",
+        show_progress=True,
+        n_aug=1,
+        n_interim=1,
+        do_sample=False,
+        model_batch_size=16,
+        seed=None,
+        max_tokens=None,
+        cache=None,
+        model_a=None,
+        model_b=None,
+    ):
         self.disable_progress = not show_progress
-        self.tokenizer_a = MarianTokenizer.from_pretrained(
-            f"Helsinki-NLP/opus-mt-{base_language}-{interim_language}"
-        )
-        self.model_a = AutoModelForSeq2SeqLM.from_pretrained(
-            f"Helsinki-NLP/opus-mt-{base_language}-{interim_language}"
-        )
-        self.tokenizer_b = MarianTokenizer.from_pretrained(
-            f"Helsinki-NLP/opus-mt-{interim_language}-{base_language}"
-        )
-        self.model_b = AutoModelForSeq2SeqLM.from_pretrained(
-            f"Helsinki-NLP/opus-mt-{interim_language}-{base_language}"
-        )
-
-    def __call__(self, x):
-        augmented = []
-        for doc in tqdm(x, disable=self.disable_progress):
-            try:
-                input_ids_a = self.tokenizer_a.encode(doc, return_tensors="pt")
-                outputs_a = self.model_a.generate(input_ids_a)
-                decoded_a = self.tokenizer_a.decode(
-                    outputs_a[0], skip_special_tokens=True
+        model_a = model_a or f"Helsinki-NLP/opus-mt-{base_language}-{interim_language}"
+        model_b = model_b or f"Helsinki-NLP/opus-mt-{interim_language}-{base_language}"
+        self.tokenizer_a = AutoTokenizer.from_pretrained(model_a)
+        self.model_a = AutoModelForSeq2SeqLM.from_pretrained(model_a)
+        self.tokenizer_b = AutoTokenizer.from_pretrained(model_b)
+        self.model_b = AutoModelForSeq2SeqLM.from_pretrained(model_b)
+        self.n_aug = n_aug
+        self.n_interim = min(n_interim, n_aug)
+        self.do_sample = do_sample
+        self.model_batch_size = model_batch_size
+        self.seed = seed
+        self.max_tokens = max_tokens or self.tokenizer_a.model_max_length
+        self.cache = cache
+
+    def __translate(self, texts, tokenizer, model, n_outputs, keys, leg):
+        """Returns n_outputs translations of every text.
+
+        The texts are sorted by length and translated in padded batches of
+        model_batch_size, every text fanning out to n_outputs beams or samples,
+        the samples of a text seeded by its key in keys.
+        """
+        lengths = [len(ids) for ids in tokenizer(texts)["input_ids"]]
+        order = sorted(range(len(texts)), key=lengths.__getitem__)
+        if not self.do_sample:
+            num_beams = max(n_outputs, model.config.num_beams or 1)
+            kwargs = {"do_sample": False, "num_beams": num_beams}
+        translations = [None] * len(texts)
+        for start in range(0, len(order), self.model_batch_size):
+            batch = order[start : start + self.model_batch_size]
+            if self.do_sample:
+                kwargs = sampling_kwargs(
+                    [
+                        self._record_seed(keys[i], f"{leg}:{j}") % 2**64
+                        for i in batch
+                        for j in range(n_outputs)
+                    ]
+                )
+            encoding = tokenizer(
+                [texts[i] for i in batch],
+                padding=True,
+                truncation=True,
+                return_tensors="pt",
+            )
+            with torch.no_grad():
+                outputs = model.generate(
+                    **encoding, num_return_sequences=n_outputs, **kwargs
+                )
+            decoded = tokenizer.batch_decode(outputs, skip_special_tokens=True)
+            for position, i in enumerate(batch):
+                translations[i] = decoded[
+                    position * n_outputs : (position + 1) * n_outputs
+                ]
+        return translations
+
+    def _augment_batch(self, batch):
+        # The chunks of all the documents of the batch are translated together and
+        # the translations of the chunks of a document are joined back in order.
+        # Texts without any sentence are kept as they are.
+        with self._timer("chunk"):
+            chunks = chunk_sentences(
+                [doc for _, doc in batch], self.tokenizer_a, self.max_tokens
+            )
+        flat = [chunk for doc_chunks in chunks for chunk in doc_chunks]
+        self._count("chunks", len(flat))
+        back = []
+        if flat:
+            # Every chunk is keyed by its record and position, every interim
+            # translation by its chunk and position.
+            keys = [
+                (index, position)
+                for (index, _), doc_chunks in zip(batch, chunks)
+                for position in range(len(doc_chunks))
+            ]
+            n_back = -(-self.n_aug // self.n_interim)
+            with self._timer("translate_interim"):
+                interim = self.__translate(
+                    flat, self.tokenizer_a, self.model_a, self.n_interim, keys, "a"
                 )
-                input_ids_b = self.tokenizer_b.encode(decoded_a, return_tensors="pt")
-                outputs_b = self.model_b.generate(input_ids_b)
-                decoded_b = self.tokenizer_b.decode(
-                    outputs_b[0], skip_special_tokens=True
+            interim = [text for texts in interim for text in texts]
+            keys = [key + (k,) for key in keys for k in range(self.n_interim)]
+            with self._timer("translate_back"):
+                back = self.__translate(
+                    interim, self.tokenizer_b, self.model_b, n_back, keys, "b"
                 )
-                augmented.append(decoded_b)
-            except IndexError:
-                augmented.append(doc)
+            back = [
+                [text for texts in back[i : i + self.n_interim] for text in texts]
+                for i in range(0, len(back), self.n_interim)
+            ]
+        augmented, start = [], 0
+        for (index, doc), doc_chunks in zip(batch, chunks):
+            translations = back[start : start + len(doc_chunks)]
+            start += len(doc_chunks)
+            if not translations:
+                self._count("fallback.no_sentence")
+                augmented.extend((index, doc) for _ in range(self.n_aug))
+                continue
+            augmented.extend(
+                (index, " ".join(texts))
+                for texts in list(zip(*translations))[: self.n_aug]
+            )
+        return augmented
 
-        return list(x) + augmented
+    def _cache_config(self):
+        return {
+            "models": [self.model_a.name_or_path, self.model_b.name_or_path],
+            "n_aug": self.n_aug,
+            "n_interim": self.n_interim,
+            "do_sample": self.do_sample,
+            # Beam search does not depend on the seed.
+            "seed": self.seed if self.do_sample else None,
+            "max_tokens": self.max_tokens,
+        }
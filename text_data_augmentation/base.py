@@ -0,0 +1,331 @@
+import hashlib
+import random
+import secrets
+import threading
+from itertools import islice
+
+import numpy as np
+from tqdm.auto import tqdm
+
+from .parallel import parallel_augment, resolve_n_jobs
+from .sharding import check_shard, shard_of
+from .stats import NULL_TIMER, Stats
+
+_numpy_state = threading.local()
+_PCG64_INCREMENT = 0xDA3E39CB94B95BDB
+_GOLDEN = np.uint64(0x9E3779B97F4A7C15)
+_MASK64 = (1 << 64) - 1
+
+
+class Augmenter:
+    """Base class of the augmenters.
+
+    Subclasses implement ``_augment_record``, or ``_augment_batch`` when the
+    records of a batch are better processed together, and get the streaming
+    ``iter_augment`` API and the list based ``__call__`` from it.
+
+    Randomness is drawn from per record generators derived from
+    ``(seed, record_index, aug_index)`` rather than from the global ``random``
+    module, so any subset of the records can be recomputed independently, in any
+    order, in any thread or process, with identical output. Augmenters with
+    ``n_jobs`` other than 1 send chunks of ``chunk_size`` records to a process
+    pool and produce the same output as the serial path.
+
+    Augmenters given a ``cache`` look every text up in it before augmenting, and
+    only augment the texts whose results it does not hold. ``enable_stats``
+    makes an augmenter record the time of its stages, the events such as
+    operations and fallbacks, and its batch sizes. ``augment_async`` augments
+    single texts from coroutines in micro-batches.
+    """
+
+    batch_size = 32
+    chunk_size = 256
+    n_jobs = 1
+    seed = None
+    disable_progress = False
+    cache = None
+    stats = None
+    micro_batcher = None
+
+    def _seed_value(self):
+        """Returns the seed, drawing a fixed one per instance when seed is None."""
+        if self.seed is not None:
+            return self.seed
+        if "_entropy" not in self.__dict__:
+            self._entropy = secrets.randbits(64)
+        return self._entropy
+
+    def _record_seed(self, index, aug_index=0):
+        """Returns the integer seed of one augmentation of one record."""
+        key = f"{self._seed_value()}:{index}:{aug_index}".encode()
+        return int.from_bytes(hashlib.blake2b(key, digest_size=16).digest(), "little")
+
+    def _random_state(self, index, aug_index=0):
+        """Returns the random generator of one augmentation of one record."""
+        return random.Random(self._record_seed(index, aug_index))
+
+    def _numpy_random_state(self, index):
+        """Returns the NumPy generator of one record, for engines drawing the
+        randomness of all its augmentations at once.
+
+        Creating a Generator costs more than augmenting a short sentence, so a
+        generator per thread is reseeded and returned instead: it is only valid
+        until the next call in the same thread.
+        """
+        generator = getattr(_numpy_state, "generator", None)
+        if generator is None:
+            generator = _numpy_state.generator = np.random.Generator(np.random.PCG64())
+        generator.bit_generator.state = {
+            "bit_generator": "PCG64",
+            "state": {"state": self._record_seed(index), "inc": _PCG64_INCREMENT},
+            "has_uint32": 0,
+            "uinteger": 0,
+        }
+        return generator
+
+    def _numpy_random_bits(self, indices, sizes):
+        """Returns random 32 bit words, sizes[i] of them for the record indices[i],
+        concatenated, for engines drawing the randomness of a whole batch at once.
+
+        The words are a counter based hash of the seed, the record index and their
+        position, two per hash, so the batch is drawn in a few array passes without
+        a generator per record, and the words of a record depend on nothing else.
+        """
+        sizes = np.asarray(sizes, dtype=np.int64)
+        pairs = (sizes + 1) // 2
+        starts = (np.cumsum(pairs) - pairs).astype(np.uint64)
+        # The n-th hash of a record mixes its key + n * golden ratio.
+        counters = np.repeat(self.__record_keys(indices) - starts * _GOLDEN, pairs)
+        counters += np.arange(len(counters), dtype=np.uint64) * _GOLDEN
+        words = _splitmix64(counters).view(np.uint32)
+        odd = sizes % 2 == 1
+        if odd.any():
+            # Records with an odd number of words drop the last word of their
+            # last hash.
+            words = np.delete(
+                words, 2 * (starts[odd].astype(np.int64) + pairs[odd]) - 1
+            )
+        return words
+
+    def __record_keys(self, indices):
+        """Returns a 64 bit key for every record index, as an array."""
+        if all(type(index) is int for index in indices):
+            keys = np.array(indices, dtype=np.int64).view(np.uint64)
+            keys ^= np.uint64(self._record_seed("keys") & _MASK64)
+            return _splitmix64(_splitmix64(keys))
+        # Composite keys, e.g. of the stages of a composition, are hashed one by
+        # one.
+        return np.array(
+            [self._record_seed(index) & _MASK64 for index in indices], dtype=np.uint64
+        )
+
+    def _shard_error(self):
+        """Returns why the shards of the augmenter could differ from a single run,
+        None if they cannot."""
+        if self.seed is None:
+            return f"Sharded {type(self).__name__} needs a seed."
+        return None
+
+    def _check_shards(self, shard_id, num_shards):
+        """Checks that a shard is valid and that the augmenter can be sharded, i.e.
+        that the augmentations of a record depend only on the seed, the record
+        and its index.
+
+        Raises:
+            ValueError: If the shard is invalid, or if the augmenter cannot be
+                sharded.
+        """
+        check_shard(shard_id, num_shards)
+        if num_shards is not None:
+            reason = self._shard_error()
+            if reason is not None:
+                raise ValueError(reason)
+
+    def _augment_record(self, index, text):
+        raise NotImplementedError
+
+    def _augment_batch(self, batch):
+        augmented = []
+        for index, text in batch:
+            augmented.extend((index, aug) for aug in self._augment_record(index, text))
+        return augmented
+
+    def enable_stats(self):
+        """Starts recording stats, which are disabled by default.
+
+        Returns:
+            Stats: The stats of the augmenter, also its stats attribute. The stats
+                of worker processes are added to them.
+        """
+        self.stats = Stats(type(self).__name__)
+        return self.stats
+
+    def _timer(self, stage):
+        """Returns a context manager timing a stage when stats are enabled."""
+        if self.stats is None:
+            return NULL_TIMER
+        return self.stats.timer(stage)
+
+    def _count(self, event, n=1):
+        """Counts an event when stats are enabled."""
+        if self.stats is not None:
+            self.stats.count(event, n)
+
+    def _cache_config(self):
+        """Returns the model names and parameters the augmentations depend on
+        besides the text, as a JSON serializable dict."""
+        raise NotImplementedError
+
+    def _augment_cached(self, batch):
+        """Augments a batch, reusing the results of the cache when there is one.
+
+        With a cache, the augmentations of a text are seeded by the text instead of
+        its index, so duplicate texts share their augmentations.
+        """
+        if self.stats is not None:
+            self.stats.observe("batch_size", len(batch))
+        if self.cache is None:
+            with self._timer("augment"):
+                return self._augment_batch(batch)
+        config = dict(self._cache_config(), augmenter=type(self).__name__)
+        keys = [self.cache.key(config, text) for _, text in batch]
+        results, misses = {}, {}
+        for record, key in zip(batch, keys):
+            if key in results or key in misses:
+                continue
+            values = self.cache.get(key)
+            if values is None:
+                misses[key] = record[1]
+            else:
+                results[key] = values
+        self._count("cache_hits", len(batch) - len(misses))
+        self._count("cache_misses", len(misses))
+        if misses:
+            computed = {key: [] for key in misses}
+            # The misses are seeded by their key rather than their index, so that
+            # the cached augmentations of a text do not depend on the record that
+            # happened to compute them.
+            with self._timer("augment"):
+                augmented = self._augment_batch(list(misses.items()))
+            for key, text in augmented:
+                computed[key].append(text)
+            self.cache.put_many(computed.items())
+            results.update(computed)
+        return [
+            (index, aug) for (index, _), key in zip(batch, keys) for aug in results[key]
+        ]
+
+    def iter_augment(self, x, start=0, executor=None, shard_id=None, num_shards=None):
+        """Lazily augments the texts, holding at most one batch in memory.
+
+        Args:
+            x (iterable): Texts to augment, e.g. a list or a lazily read file.
+            start (int, optional): Index of the first text, used to resume a
+                corpus partway through. Defaults to 0.
+            executor (concurrent.futures.Executor, optional): Executor to run the
+                chunks on instead of a process pool of n_jobs workers.
+                Defaults to None.
+            shard_id (int, optional): Shard to augment, the other texts being
+                skipped. Defaults to None, augmenting every text.
+            num_shards (int, optional): Number of shards the texts are split in
+                by a stable hash of their index. Defaults to None.
+
+        Yields:
+            tuple: (source_index, augmented_text) pairs in input order.
+
+        Raises:
+            ValueError: If the shard is invalid, or if the augmenter cannot be
+                sharded, see _check_shards.
+        """
+        self._check_shards(shard_id, num_shards)
+        records = enumerate(tqdm(x, disable=self.disable_progress), start)
+        if num_shards is not None:
+            records = (
+                (index, text)
+                for index, text in records
+                if shard_of(index, num_shards) == shard_id
+            )
+        n_jobs = resolve_n_jobs(self.n_jobs)
+        if executor is not None or n_jobs > 1:
+            yield from parallel_augment(
+                self, records, n_jobs, self.chunk_size, executor=executor
+            )
+            return
+        for batch in iter(lambda: list(islice(records, self.batch_size)), []):
+            yield from self._augment_cached(batch)
+
+    def iter_record_batches(self, x, start=0, batch_rows=65536, **kwargs):
+        """Lazily augments the texts into Arrow record batches of source_index,
+        aug_index, augmenter and text columns. Requires pyarrow.
+
+        Args:
+            x (iterable): Texts to augment.
+            start (int, optional): Index of the first text. Defaults to 0.
+            batch_rows (int, optional): Number of rows of a batch.
+                Defaults to 65536.
+            **kwargs: executor, shard_id, num_shards and manifest, passed on to
+                text_data_augmentation.arrow.iter_record_batches.
+
+        Yields:
+            pyarrow.RecordBatch: Batches of at most batch_rows augmentations.
+        """
+        from .arrow import iter_record_batches
+
+        return iter_record_batches(self, x, start, batch_rows, **kwargs)
+
+    def write_arrow(self, x, path, fmt=None, start=0, batch_rows=65536, **kwargs):
+        """Augments the texts into a Parquet file or a memory mappable Arrow IPC
+        file, without building a list of them. Requires pyarrow.
+
+        Args:
+            x (iterable): Texts to augment.
+            path (str): File to write.
+            fmt (str, optional): "parquet" or "arrow". Defaults to None, using
+                "parquet" for paths ending in .parquet and "arrow" otherwise.
+            start (int, optional): Index of the first text. Defaults to 0.
+            batch_rows (int, optional): Number of rows of a record batch.
+                Defaults to 65536.
+            **kwargs: compression, executor, shard_id, num_shards and manifest,
+                passed on to text_data_augmentation.arrow.write_arrow.
+
+        Returns:
+            int: Number of augmentations written.
+        """
+        from .arrow import write_arrow
+
+        return write_arrow(self, x, path, fmt, start, batch_rows, **kwargs)
+
+    async def augment_async(self, text):
+        """Augments one text from a coroutine, in a batch with the texts of the
+        concurrent calls, without blocking the event loop.
+
+        The batches are gathered by the micro_batcher attribute, a MicroBatcher
+        with default limits created on first use, which can be replaced to tune
+        them.
+
+        Args:
+            text (str): Text to augment.
+
+        Returns:
+            list: The augmentations of the text.
+        """
+        if self.micro_batcher is None:
+            from .online import MicroBatcher
+
+            self.micro_batcher = MicroBatcher(self)
+        return await self.micro_batcher.augment(text)
+
+    def __call__(self, x):
+        x = list(x)
+        return x + [text for _, text in self.iter_augment(x)]
+
+
+def _splitmix64(x):
+    """Applies the SplitMix64 mixing function to an array of uint64 in place."""
+    x += _GOLDEN
+    x ^= x >> np.uint64(30)
+    x *= np.uint64(0xBF58476D1CE4E5B9)
+    x ^= x >> np.uint64(27)
+    x *= np.uint64(0x94D049BB133111EB)
+    x ^= x >> np.uint64(31)
+    return x
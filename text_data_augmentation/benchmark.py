@@ -0,0 +1,443 @@
+import argparse
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from itertools import product
+from multiprocessing import get_context
+
+import numpy as np
+
+from .stats import peak_rss_mb
+
+AUGMENTERS = [
+    "AbstractiveSummarization",
+    "BackTranslation",
+    "CharacterNoise",
+    "ContextualWordReplacement",
+    "EasyDataAugmentation",
+    "KeyBoardNoise",
+    "OCRNoise",
+    "Paraphrase",
+    "SimilarWordReplacement",
+    "SynonymReplacement",
+    "WordSplit",
+]
+MODEL_BACKED = {
+    "AbstractiveSummarization",
+    "BackTranslation",
+    "ContextualWordReplacement",
+    "Paraphrase",
+    "SimilarWordReplacement",
+}
+WITH_ALPHA = {
+    "CharacterNoise",
+    "EasyDataAugmentation",
+    "KeyBoardNoise",
+    "OCRNoise",
+    "SimilarWordReplacement",
+    "SynonymReplacement",
+    "WordSplit",
+}
+WITHOUT_N_AUG = {"AbstractiveSummarization"}
+
+# Common English words, most frequent first, so that the synthetic texts have
+# WordNet synonyms, stopwords and TF-IDF weights like real ones.
+WORDS = (
+    "the of and to in is was he for it with as his on be at by had are but from "
+    "or have an they which one you were her all she there would their we him been "
+    "has when who will more no if out so said what up its about into than them can "
+    "only other new some could time these two may then do first any my now such "
+    "like our over man me even most made after also did many before must through "
+    "back years where much your way well down should because each just those people "
+    "how too little state good very make world still own see men work long get here "
+    "between both life being under never day same another know while last might us "
+    "great old year off come since against go came right used take three house "
+    "quick brown fox jumps lazy dog river city market water light small large "
+    "happy slow bright dark early late strong simple clear green"
+).split()
+SPECIAL_TOKENS = ["[PAD]", "[UNK]", "[CLS]", "[SEP]", "[MASK]"]
+
+
+def synthetic_corpus(
+    n_texts=1000, median_words=30, sigma=0.6, sentence_words=12, seed=0
+):
+    """Generates texts of Zipf distributed words with log-normal lengths.
+
+    Args:
+        n_texts (int, optional): Number of texts. Defaults to 1000.
+        median_words (int, optional): Median number of words of a text.
+            Defaults to 30.
+        sigma (float, optional): Standard deviation of the logarithm of the number
+            of words, 0 giving texts of the same length. Defaults to 0.6.
+        sentence_words (int, optional): Number of words of the sentences.
+            Defaults to 12.
+        seed (int, optional): Random State for reproducibility. Defaults to 0.
+
+    Returns:
+        list: The texts.
+    """
+    rng = np.random.default_rng(seed)
+    frequencies = 1 / np.arange(1, len(WORDS) + 1)
+    frequencies /= frequencies.sum()
+    lengths = rng.lognormal(np.log(median_words), sigma, n_texts).round()
+    texts = []
+    for length in np.maximum(lengths, 1).astype(np.int64).tolist():
+        words = [WORDS[w] for w in rng.choice(len(WORDS), length, p=frequencies)]
+        sentences = [
+            " ".join(words[start : start + sentence_words]).capitalize() + "."
+            for start in range(0, length, sentence_words)
+        ]
+        texts.append(" ".join(sentences))
+    return texts
+
+
+def build_tiny_models(directory):
+    """Saves tiny randomly initialized models for the model-backed augmenters, so
+    that they can be benchmarked without downloading anything.
+
+    Args:
+        directory (str): Directory to save the models to, one subdirectory each.
+    """
+    import spacy
+    import torch
+    from transformers import (
+        BartConfig,
+        BartForConditionalGeneration,
+        BertConfig,
+        BertForMaskedLM,
+        BertTokenizer,
+        MarianConfig,
+        MarianMTModel,
+        T5Config,
+        T5ForConditionalGeneration,
+    )
+
+    os.makedirs(directory, exist_ok=True)
+    vocab_file = os.path.join(directory, "vocab.txt")
+    with open(vocab_file, "w") as f:
+        f.write("\n".join(SPECIAL_TOKENS + sorted(set(WORDS)) + [".", ","]))
+    tokenizer = BertTokenizer(vocab_file, model_max_length=128)
+
+    torch.manual_seed(0)
+    tokens = {"vocab_size": len(tokenizer), "pad_token_id": 0, "eos_token_id": 3}
+    seq2seq = dict(
+        tokens,
+        bos_token_id=2,
+        decoder_start_token_id=2,
+        d_model=32,
+        encoder_layers=1,
+        decoder_layers=1,
+        encoder_attention_heads=2,
+        decoder_attention_heads=2,
+        encoder_ffn_dim=64,
+        decoder_ffn_dim=64,
+        max_position_embeddings=128,
+        max_length=24,
+        num_beams=1,
+    )
+    models = {
+        "fill-mask": BertForMaskedLM(
+            BertConfig(
+                vocab_size=len(tokenizer),
+                hidden_size=32,
+                num_hidden_layers=1,
+                num_attention_heads=2,
+                intermediate_size=64,
+                max_position_embeddings=128,
+            )
+        ),
+        "summarization": BartForConditionalGeneration(
+            BartConfig(forced_bos_token_id=None, forced_eos_token_id=3, **seq2seq)
+        ),
+        "translation-a": MarianMTModel(MarianConfig(**seq2seq)),
+        "translation-b": MarianMTModel(MarianConfig(**seq2seq)),
+        "paraphrase": T5ForConditionalGeneration(
+            T5Config(
+                d_model=32,
+                d_kv=16,
+                d_ff=64,
+                num_layers=1,
+                num_heads=2,
+                decoder_start_token_id=0,
+                max_length=24,
+                **tokens,
+            )
+        ),
+    }
+    for name, model in models.items():
+        model.save_pretrained(os.path.join(directory, name))
+        tokenizer.save_pretrained(os.path.join(directory, name))
+
+    nlp = spacy.blank("en")
+    nlp.vocab.reset_vectors(width=32)
+    vectors = np.random.default_rng(0).standard_normal((len(WORDS), 32))
+    for word, vector in zip(WORDS, vectors.astype(np.float32)):
+        nlp.vocab.set_vector(word, vector)
+    nlp.to_disk(os.path.join(directory, "spacy"))
+
+
+def build_augmenter(name, directory=None, alpha=None, n_aug=None):
+    """Returns an augmenter, the model-backed ones using the tiny models saved by
+    build_tiny_models.
+
+    Args:
+        name (str): Class name of the augmenter.
+        directory (str, optional): Directory of the tiny models. Defaults to None.
+        alpha (float, optional): alpha of the augmenters that have one.
+            Defaults to None, their default.
+        n_aug (int, optional): n_aug of the augmenters that have one.
+            Defaults to None, their default.
+
+    Returns:
+        Augmenter: The augmenter.
+    """
+    import text_data_augmentation
+
+    cls = getattr(text_data_augmentation, name)
+    kwargs = {"show_progress": False}
+    if alpha is not None and name in WITH_ALPHA:
+        kwargs["alpha"] = alpha
+    if n_aug is not None and name not in WITHOUT_N_AUG:
+        kwargs["n_aug"] = n_aug
+    if name == "AbstractiveSummarization":
+        return cls(model=os.path.join(directory, "summarization"), **kwargs)
+    if name == "ContextualWordReplacement":
+        return cls(model=os.path.join(directory, "fill-mask"), **kwargs)
+    if name == "SimilarWordReplacement":
+        return cls(os.path.join(directory, "spacy"), **kwargs)
+    if name == "BackTranslation":
+        return cls(
+            model_a=os.path.join(directory, "translation-a"),
+            model_b=os.path.join(directory, "translation-b"),
+            **kwargs,
+        )
+    if name == "Paraphrase":
+        return cls(os.path.join(directory, "paraphrase"), max_new_tokens=16, **kwargs)
+    return cls(**kwargs)
+
+
+def benchmark(name, texts, alpha=None, n_aug=None, batch_size=32, directory=None):
+    """Measures the throughput, latency and memory of one augmenter.
+
+    The texts are augmented by iter_augment in batches of batch_size, which is
+    also the forward pass size of the model-backed augmenters, after one warm-up
+    batch, the augmenters weighting words by TF-IDF being fitted on the texts
+    first. The latency of a record is the time from iter_augment reading it to
+    yielding its last augmentation.
+
+    Args:
+        name (str): Class name of the augmenter.
+        texts (list): Texts to augment.
+        alpha (float, optional): alpha of the augmenter. Defaults to None.
+        n_aug (int, optional): n_aug of the augmenter. Defaults to None.
+        batch_size (int, optional): Number of texts per batch. Defaults to 32.
+        directory (str, optional): Directory of the tiny models. Defaults to None.
+
+    Returns:
+        dict: The measurements.
+    """
+    augmenter = build_augmenter(name, directory, alpha, n_aug)
+    if getattr(augmenter, "use_tfidf", False):
+        augmenter.fit(texts)
+    augmenter.batch_size = batch_size
+    if hasattr(augmenter, "model_batch_size"):
+        augmenter.model_batch_size = batch_size
+    for _ in augmenter.iter_augment(texts[:batch_size]):
+        pass
+
+    read, done = [], {}
+
+    def timed():
+        for text in texts:
+            read.append(time.perf_counter())
+            yield text
+
+    n_outputs = 0
+    started = time.perf_counter()
+    for index, _ in augmenter.iter_augment(timed()):
+        done[index] = time.perf_counter()
+        n_outputs += 1
+    seconds = time.perf_counter() - started
+    latencies = [done[index] - read[index] for index in done] or [0.0]
+    return {
+        "augmenter": name,
+        "alpha": alpha if name in WITH_ALPHA else None,
+        "n_aug": n_aug if name not in WITHOUT_N_AUG else None,
+        "batch_size": batch_size,
+        "n_records": len(texts),
+        "n_outputs": n_outputs,
+        "seconds": seconds,
+        "records_per_second": len(texts) / seconds if seconds else None,
+        "latency_p50_ms": float(np.percentile(latencies, 50)) * 1000,
+        "latency_p99_ms": float(np.percentile(latencies, 99)) * 1000,
+        "peak_rss_mb": peak_rss_mb(),
+    }
+
+
+def run_benchmarks(
+    texts,
+    augmenters=None,
+    alphas=(0.1,),
+    n_augs=(1, 4),
+    batch_sizes=(1, 32),
+    directory=None,
+    isolate=True,
+):
+    """Benchmarks augmenters over a sweep of alpha, n_aug and batch size.
+
+    Args:
+        texts (list): Texts to augment, e.g. from synthetic_corpus.
+        augmenters (list, optional): Class names of the augmenters. Defaults to
+            None, all of them.
+        alphas (tuple, optional): Values of alpha. Defaults to (0.1,).
+        n_augs (tuple, optional): Values of n_aug. Defaults to (1, 4).
+        batch_sizes (tuple, optional): Batch sizes. Defaults to (1, 32).
+        directory (str, optional): Directory of the tiny models, built there if
+            missing when model-backed augmenters are benchmarked. Defaults to None,
+            a temporary directory.
+        isolate (bool, optional): Whether to run every configuration in a fresh
+            process, so that peak memory is its own. Defaults to True.
+
+    Returns:
+        list: The measurements of every configuration.
+    """
+    augmenters = list(augmenters or AUGMENTERS)
+    with tempfile.TemporaryDirectory() as temporary:
+        if MODEL_BACKED.intersection(augmenters):
+            directory = directory or temporary
+            if not os.path.isdir(os.path.join(directory, "spacy")):
+                build_tiny_models(directory)
+        configurations = []
+        for name in augmenters:
+            name_alphas = alphas if name in WITH_ALPHA else [None]
+            name_n_augs = n_augs if name not in WITHOUT_N_AUG else [None]
+            for alpha, n_aug, batch_size in product(
+                name_alphas, name_n_augs, batch_sizes
+            ):
+                configurations.append((name, texts, alpha, n_aug, batch_size))
+        results = []
+        for configuration in configurations:
+            if not isolate:
+                results.append(benchmark(*configuration, directory=directory))
+                continue
+            with ProcessPoolExecutor(1, mp_context=get_context("spawn")) as pool:
+                future = pool.submit(benchmark, *configuration, directory=directory)
+                results.append(future.result())
+    return results
+
+
+def _key(result):
+    return result["augmenter"], result["alpha"], result["n_aug"], result["batch_size"]
+
+
+def save_baseline(results, path):
+    """Saves measurements to a JSON baseline.
+
+    Args:
+        results (list): Measurements, as returned by run_benchmarks.
+        path (str): Path of the JSON file.
+    """
+    baseline = {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "processor": platform.processor(),
+        "results": results,
+    }
+    with open(path, "w") as f:
+        json.dump(baseline, f, indent=2)
+
+
+def compare(results, baseline, tolerance=0.2):
+    """Compares measurements to a baseline.
+
+    Args:
+        results (list): Measurements, as returned by run_benchmarks.
+        baseline (str or dict): Path of a baseline saved by save_baseline, or the
+            loaded baseline.
+        tolerance (float, optional): Relative throughput decrease or p99 latency
+            increase tolerated. Defaults to 0.2.
+
+    Returns:
+        list: Description of every regression.
+    """
+    if isinstance(baseline, str):
+        with open(baseline) as f:
+            baseline = json.load(f)
+    previous = {_key(result): result for result in baseline["results"]}
+    regressions = []
+    for result in results:
+        old = previous.get(_key(result))
+        if old is None:
+            continue
+        name = "{} alpha={} n_aug={} batch_size={}".format(*_key(result))
+        if result["records_per_second"] < old["records_per_second"] * (1 - tolerance):
+            regressions.append(
+                f"{name}: {result['records_per_second']:.1f} records/s, "
+                f"was {old['records_per_second']:.1f}"
+            )
+        if result["latency_p99_ms"] > old["latency_p99_ms"] * (1 + tolerance):
+            regressions.append(
+                f"{name}: p99 latency {result['latency_p99_ms']:.2f} ms, "
+                f"was {old['latency_p99_ms']:.2f}"
+            )
+    return regressions
+
+
+def _format(results):
+    header = "augmenter                   alpha n_aug batch  records/s  p50 ms  p99 ms  peak MiB"
+    rows = [header]
+    for r in results:
+        rows.append(
+            f"{r['augmenter']:<27} {r['alpha'] if r['alpha'] is not None else '-':>5} "
+            f"{r['n_aug'] if r['n_aug'] is not None else '-':>5} {r['batch_size']:>5} "
+            f"{r['records_per_second']:>10.1f} {r['latency_p50_ms']:>7.2f} "
+            f"{r['latency_p99_ms']:>7.2f} {r['peak_rss_mb'] or 0:>9.1f}"
+        )
+    return "\n".join(rows)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Benchmarks the throughput, latency and memory of the augmenters."
+    )
+    parser.add_argument("--augmenters", nargs="+", choices=AUGMENTERS)
+    parser.add_argument("--n-texts", type=int, default=200)
+    parser.add_argument("--median-words", type=int, default=30)
+    parser.add_argument("--sigma", type=float, default=0.6)
+    parser.add_argument("--alpha", type=float, nargs="+", default=[0.1])
+    parser.add_argument("--n-aug", type=int, nargs="+", default=[1, 4])
+    parser.add_argument("--batch-size", type=int, nargs="+", default=[1, 32])
+    parser.add_argument("--models-dir", help="directory of the tiny models")
+    parser.add_argument("--no-isolate", action="store_true")
+    parser.add_argument("--output", help="path to save the results as a baseline")
+    parser.add_argument("--baseline", help="baseline to compare the results to")
+    parser.add_argument("--tolerance", type=float, default=0.2)
+    args = parser.parse_args(argv)
+
+    texts = synthetic_corpus(args.n_texts, args.median_words, args.sigma)
+    results = run_benchmarks(
+        texts,
+        args.augmenters,
+        args.alpha,
+        args.n_aug,
+        args.batch_size,
+        args.models_dir,
+        isolate=not args.no_isolate,
+    )
+    print(_format(results))
+    if args.output:
+        save_baseline(results, args.output)
+    if args.baseline:
+        regressions = compare(results, args.baseline, args.tolerance)
+        for regression in regressions:
+            print(f"REGRESSION {regression}")
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
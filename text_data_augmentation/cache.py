@@ -0,0 +1,129 @@
+import hashlib
+import json
+import sqlite3
+import threading
+from collections import OrderedDict
+
+
+class ResultCache:
+    """Augmentations of texts, keyed by a hash of the augmenter, its model and
+    generation parameters and the text, so texts seen before skip inference.
+
+    Recent results are kept in a bounded in-memory LRU tier. With a path, every
+    result is also stored in a SQLite database that persists across runs and is
+    shared by the worker processes of an augmenter. Hit and miss counts are
+    those of the lookups made in the current process.
+
+    Args:
+        path (str, optional): Path of the SQLite database, created if missing.
+            None keeps the results in memory only. Defaults to None.
+        max_size (int, optional): Number of texts whose results are kept in
+            memory. Defaults to 65536.
+    """
+
+    def __init__(self, path=None, max_size=65536):
+        self.path = path
+        self.max_size = max_size
+        self.memory = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.__lock = threading.Lock()
+        self.__connection = None
+
+    @staticmethod
+    def key(config, text):
+        """Returns the key of the results of a text.
+
+        Args:
+            config (dict): JSON serializable description of the augmenter, its
+                model and generation parameters.
+            text (str): Augmented text.
+
+        Returns:
+            str: Hex digest of the SHA-256 of the config and text.
+        """
+        payload = json.dumps([config, text], sort_keys=True, ensure_ascii=False)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def __database(self):
+        if self.__connection is None:
+            self.__connection = sqlite3.connect(
+                self.path, timeout=60, check_same_thread=False
+            )
+            # Write-ahead logging lets worker processes read while one writes.
+            self.__connection.execute("PRAGMA journal_mode=WAL")
+            self.__connection.execute(
+                "CREATE TABLE IF NOT EXISTS results"
+                " (key TEXT PRIMARY KEY, value TEXT NOT NULL)"
+            )
+        return self.__connection
+
+    def __remember(self, key, values):
+        self.memory[key] = values
+        self.memory.move_to_end(key)
+        if len(self.memory) > self.max_size:
+            self.memory.popitem(last=False)
+
+    def get(self, key):
+        """Returns the results stored under a key.
+
+        Args:
+            key (str): Key of the results, as returned by key.
+
+        Returns:
+            list: The augmented texts, None if the key is missing.
+        """
+        with self.__lock:
+            values = self.memory.get(key)
+            if values is not None:
+                self.memory.move_to_end(key)
+            elif self.path is not None:
+                row = (
+                    self.__database()
+                    .execute("SELECT value FROM results WHERE key = ?", (key,))
+                    .fetchone()
+                )
+                if row is not None:
+                    values = json.loads(row[0])
+                    self.__remember(key, values)
+            if values is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+            return values
+
+    def put_many(self, items):
+        """Stores the results of several keys.
+
+        Args:
+            items (iterable): (key, augmented texts) pairs.
+        """
+        items = list(items)
+        with self.__lock:
+            for key, values in items:
+                self.__remember(key, list(values))
+            if self.path is not None and items:
+                with self.__database() as connection:
+                    connection.executemany(
+                        "INSERT OR REPLACE INTO results VALUES (?, ?)",
+                        [
+                            (key, json.dumps(list(values), ensure_ascii=False))
+                            for key, values in items
+                        ],
+                    )
+
+    def put(self, key, values):
+        """Stores the results of a key.
+
+        Args:
+            key (str): Key of the results, as returned by key.
+            values (list): The augmented texts.
+        """
+        self.put_many([(key, values)])
+
+    def __getstate__(self):
+        # Worker processes open their own connection to the database.
+        return {"path": self.path, "max_size": self.max_size}
+
+    def __setstate__(self, state):
+        self.__init__(**state)
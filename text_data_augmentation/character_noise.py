@@ -1,9 +1,10 @@
-import random
+import numpy as np
 
-from tqdm.auto import tqdm
+from .base import Augmenter
+from .replacement_table import decode, encode
 
 
-class CharacterNoise:
+class CharacterNoise(Augmenter):
     """Character Noise Augmentation adds character level noise by randomly inserting,
     deleting, swaping or replacing some charaters in the input text.
 
@@ -15,77 +16,168 @@ class CharacterNoise:
         seed (int, optional): Random State for reproducibility. Defaults to None.
         show_progress (bool, optional): Set True to display progress bar.
             Defaults to True.
+        n_jobs (int, optional): Number of processes to augment with, -1 to use all
+            the CPUs. Defaults to 1.
     """
 
-    def __init__(self, alpha=0.01, n_aug=4, seed=None, show_progress=True):
+    def __init__(self, alpha=0.01, n_aug=4, seed=None, show_progress=True, n_jobs=1):
         self.alpha = alpha
         self.operations = ["insertion", "deletion", "swap", "replace"]
         self.n_aug = n_aug
         self.seed = seed
         self.disable_progress = not show_progress
+        self.n_jobs = n_jobs
         self.replacement_chars = list(
             "qwertyuiopasdfghjklzxcvbnm QWERTYUIOPASDFGHJKLZXCVBNM 1234567890"
         )
+        self.replacement_codes = encode("".join(self.replacement_chars))
 
-    def __insert(self, words):
-        r_idx_w = random.randint(0, len(words) - 1)
-        word = list(words[r_idx_w])
-        r_idx_i = random.randint(0, len(word) - 1)
-        word.insert(r_idx_i, random.choice(self.replacement_chars))
-        word = "".join(word)
-        words[r_idx_w] = word
-        return words
-
-    def __insertion(self, sentence):
-        words = sentence.split()
-        for _ in range(int(self.alpha * len(words))):
-            words = self.__insert(words)
-        return " ".join(words)
-
-    def __deletion(self, sentence):
-        chars = list(sentence)
-        new_chars = [char for char in chars if random.random() > self.alpha]
-        return "".join(new_chars)
-
-    def __swap_chars(self, chars):
-        r_idx_1 = random.randint(0, len(chars) - 1)
-        r_idx_2 = random.randint(0, len(chars) - 1)
-        chars[r_idx_1], chars[r_idx_2] = chars[r_idx_2], chars[r_idx_1]
-        return chars
-
-    def __swap(self, sentence):
-        chars = list(sentence)
-        for _ in range(int(self.alpha * len(chars))):
-            chars = self.__swap_chars(chars)
-        return "".join(chars)
-
-    def __replace(self, sentence):
-        chars = list(sentence)
-        new_chars = [
-            char
-            if random.random() > self.alpha
-            else random.choice(self.replacement_chars)
-            for char in chars
+    def __draw_insertion(self, words, n_rows, n_inserts, rng):
+        n_words, n_chars = len(words), len(self.replacement_codes)
+        picks, chars = (
+            rng.random((2, n_rows * n_inserts)) * [[n_words], [n_chars]]
+        ).astype(np.int64)
+        picks += n_words * (np.arange(n_rows * n_inserts) // n_inserts)
+        counts = np.bincount(picks, minlength=n_rows * n_words)
+        lengths = np.tile(np.fromiter(map(len, words), np.int64, n_words), n_rows)
+        # Inserting a character before a uniform position of a word (never after
+        # its last character) c times leaves the last character in place and puts
+        # the c new ones at a uniform c-subset of the other len(word) - 1 + c
+        # positions, the ones with the c smallest random keys.
+        slots = np.where(counts > 0, lengths - 1 + counts, 0)
+        keys = rng.random(int(slots.sum()))
+        return " ".join(words), n_rows, lengths, counts, slots, keys, chars
+
+    def __insertion(self, items):
+        """Inserts random characters into random words.
+
+        Every item holds the draws of __draw_insertion for the augmentations of one
+        sentence, with one entry per word of every augmentation. The characters of
+        all the augmentations are scattered into one preallocated buffer.
+        """
+        sentences, n_rows, lengths, counts, slots, keys, chars = zip(*items)
+        codes = [encode(s) for s, n in zip(sentences, n_rows) for _ in range(n)]
+        row_lengths = [
+            len(s) + len(c) // n
+            for s, n, c in zip(sentences, n_rows, chars)
+            for _ in range(n)
         ]
-        return "".join(new_chars)
-
-    def __call__(self, x):
-        random.seed(self.seed)
-        augmented = []
-        for sentence in tqdm(x, disable=self.disable_progress):
-            for _ in range(self.n_aug):
-                operation = random.choice(self.operations)
-                if operation == "insertion":
-                    augmented.append(self.__insertion(sentence))
-                elif operation == "deletion":
-                    augmented.append(self.__deletion(sentence))
-                elif operation == "swap":
-                    augmented.append(self.__swap(sentence))
-                elif operation == "replace":
-                    augmented.append(self.__replace(sentence))
-                else:
-                    raise AttributeError(
-                        f"Invalid operation {operation}, valid operations are:"
-                        + "insertion, deletion, swap, replace."
-                    )
-        return list(x) + augmented
+        row_words = [len(l) // n for l, n in zip(lengths, n_rows) for _ in range(n)]
+        lengths, counts, slots, keys, chars = map(
+            np.concatenate, (lengths, counts, slots, keys, chars)
+        )
+
+        # A word starts after the previous words and their spaces, which are one
+        # fewer than the words in every row.
+        widths = lengths + counts + 1
+        rows = np.repeat(np.arange(len(row_words)), row_words)
+        starts = np.cumsum(widths) - widths - rows
+
+        words = np.repeat(np.arange(len(slots)), slots)
+        firsts = np.cumsum(slots) - slots
+        order = np.lexsort((keys, words))
+        inserted = np.arange(len(order)) - firsts[words] < counts[words]
+        positions = starts[words[inserted]] + (order - firsts[words])[inserted]
+
+        size = sum(row_lengths)
+        mask = np.zeros(size, dtype=bool)
+        mask[positions] = True
+        augmented = np.empty(size, dtype="<u4")
+        augmented[mask] = self.replacement_codes[chars]
+        augmented[~mask] = np.concatenate(codes)
+        return self.__split(decode(augmented), row_lengths)
+
+    def __deletion(self, sentences, draws):
+        keep = np.concatenate(draws) > self.alpha
+        kept = encode("".join(sentences))[keep]
+        ends = np.cumsum([len(sentence) for sentence in sentences])
+        kept_ends = np.concatenate([[0], np.cumsum(keep)])[ends]
+        return self.__split(decode(kept), np.diff(kept_ends, prepend=0).tolist())
+
+    def __swap(self, sentences, pairs):
+        lengths = [len(sentence) for sentence in sentences]
+        offsets = np.cumsum(lengths) - lengths
+        augmented = encode("".join(sentences)).copy()
+        # The swaps of a sentence are applied in order, the t-th swap of all the
+        # sentences at once.
+        steps = np.concatenate([np.arange(len(pair)) for pair in pairs])
+        pairs = np.concatenate([pair + offset for pair, offset in zip(pairs, offsets)])
+        pairs = pairs[np.argsort(steps, kind="stable")]
+        start = 0
+        for end in np.cumsum(np.bincount(steps)).tolist():
+            i, j = pairs[start:end].T
+            augmented[i], augmented[j] = augmented[j], augmented[i]
+            start = end
+        return self.__split(decode(augmented), lengths)
+
+    def __replace(self, sentences, draws):
+        augmented = encode("".join(sentences)).copy()
+        draws = np.concatenate(draws)
+        hits = np.flatnonzero(draws <= self.alpha)
+        if len(hits):
+            # Rescaled by alpha, the draw of a replaced character is uniform and
+            # picks its replacement.
+            n_chars = len(self.replacement_codes)
+            choices = (draws[hits] / self.alpha * n_chars).astype(np.int64)
+            augmented[hits] = self.replacement_codes[np.minimum(choices, n_chars - 1)]
+        return self.__split(decode(augmented), [len(s) for s in sentences])
+
+    @staticmethod
+    def __split(text, lengths):
+        ends = np.cumsum(lengths).tolist()
+        return [text[end - length : end] for end, length in zip(ends, lengths)]
+
+    def _augment_batch(self, batch):
+        # Every record draws all its randomness from its own generator, then the
+        # augmentations of the batch are grouped by operation and built together.
+        insertions, deletions, swaps, replaces, unchanged = [], [], [], [], []
+        n_insertions = 0
+        for position, (index, sentence) in enumerate(batch):
+            rng = self._numpy_random_state(index)
+            operations = rng.integers(len(self.operations), size=self.n_aug).tolist()
+            rows = [[] for _ in self.operations]
+            for aug_index, operation in enumerate(operations, position * self.n_aug):
+                rows[operation].append(aug_index)
+            n_insertions += len(rows[0])
+            draws = rng.random((len(rows[1]) + len(rows[3]), len(sentence)))
+            n_swaps = int(self.alpha * len(sentence))
+            pairs = rng.integers(len(sentence), size=(len(rows[2]), n_swaps, 2))
+            words = sentence.split() if rows[0] else []
+            n_inserts = int(self.alpha * len(words))
+            if n_inserts:
+                draw = self.__draw_insertion(words, len(rows[0]), n_inserts, rng)
+                insertions.append((rows[0], draw))
+            else:
+                unchanged.extend((i, " ".join(words)) for i in rows[0])
+            deletions.extend((i, sentence, draw) for i, draw in zip(rows[1], draws))
+            swaps.extend((i, sentence, pair) for i, pair in zip(rows[2], pairs))
+            draws = draws[len(rows[1]) :]
+            replaces.extend((i, sentence, draw) for i, draw in zip(rows[3], draws))
+
+        augmented = [None] * (len(batch) * self.n_aug)
+        for p, text in unchanged:
+            augmented[p] = text
+        # Insertions into texts too short to get any are counted too.
+        if n_insertions:
+            self._count("operations.insertion", n_insertions)
+        if insertions:
+            positions = [p for positions, _ in insertions for p in positions]
+            with self._timer("insertion"):
+                texts = self.__insertion([draw for _, draw in insertions])
+            for p, text in zip(positions, texts):
+                augmented[p] = text
+        for items, name, operation in [
+            (deletions, "deletion", self.__deletion),
+            (swaps, "swap", self.__swap),
+            (replaces, "replace", self.__replace),
+        ]:
+            if not items:
+                continue
+            self._count(f"operations.{name}", len(items))
+            positions, sentences, draws = zip(*items)
+            with self._timer(name):
+                texts = operation(sentences, draws)
+            for p, text in zip(positions, texts):
+                augmented[p] = text
+        indices = [index for index, _ in batch for _ in range(self.n_aug)]
+        return list(zip(indices, augmented))
@@ -0,0 +1,471 @@
+import argparse
+import csv
+import json
+import os
+import sys
+from itertools import islice
+
+from tqdm.auto import tqdm
+
+import text_data_augmentation
+
+from .arrow import FORMATS as ARROW_FORMATS
+from .arrow import write_arrow
+from .base import Augmenter
+from .parallel import AugmenterPool, resolve_n_jobs
+from .sharding import ShardManifest
+from .synonym_index import SynonymIndex
+from .tfidf import TfidfModel, TfidfWeighting
+
+FORMATS = ("jsonl", "csv")
+OUTPUT_FORMATS = FORMATS + ARROW_FORMATS
+
+
+def _parse_param(param):
+    """Parses a KEY=VALUE parameter, the value as JSON when it is valid JSON and as
+    a string otherwise."""
+    key, sep, value = param.partition("=")
+    if not sep:
+        raise argparse.ArgumentTypeError(f"expected KEY=VALUE, got {param!r}")
+    try:
+        return key, json.loads(value)
+    except ValueError:
+        return key, value
+
+
+def _infer_format(path, fmt):
+    if fmt is not None:
+        return fmt
+    return "csv" if os.path.splitext(path)[1].lower() == ".csv" else "jsonl"
+
+
+def _infer_output_format(path, fmt, input_format):
+    if fmt is not None:
+        return fmt
+    extension = os.path.splitext(path)[1].lower().lstrip(".")
+    return extension if extension in ARROW_FORMATS else input_format
+
+
+def _lines(f):
+    """Yields the lines of a binary file, decoded, with the offset of their end."""
+    for line in iter(f.readline, b""):
+        yield line.decode("utf-8"), f.tell()
+
+
+def read_records(f, fmt, text_field="text", fieldnames=None):
+    """Reads the records of a JSONL or CSV file lazily.
+
+    Args:
+        f (file): File opened in binary mode, at the first record to read.
+        fmt (str): "jsonl" or "csv".
+        text_field (str, optional): Field of the text, for JSONL lines holding a
+            bare string. Defaults to "text".
+        fieldnames (list, optional): Columns of the CSV file, when f is past its
+            header. Defaults to None, reading them from the header.
+
+    Yields:
+        tuple: (record, offset) pairs, the record as a dict and the offset as the
+            position of the file after it.
+    """
+    if fmt == "jsonl":
+        for line, offset in _lines(f):
+            if line.strip():
+                record = json.loads(line)
+                if not isinstance(record, dict):
+                    record = {text_field: record}
+                yield record, offset
+        return
+    # The CSV reader pulls one line at a time, so the position after the last
+    # line pulled is the end of the row it returns.
+    offset = f.tell()
+
+    def lines():
+        nonlocal offset
+        for line, offset in _lines(f):
+            yield line
+
+    for row in csv.DictReader(lines(), fieldnames=fieldnames):
+        yield row, offset
+
+
+def _csv_header(path):
+    with open(path, "rb") as f:
+        return next(csv.reader(line for line, _ in _lines(f))), f.tell()
+
+
+def load_checkpoint(path):
+    """Returns the checkpoint saved at path, None if there is none."""
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        return json.load(f)
+
+
+def save_checkpoint(path, checkpoint):
+    """Saves a checkpoint atomically, replacing the previous one."""
+    tmp = f"{path}.tmp"
+    with open(tmp, "w") as f:
+        json.dump(checkpoint, f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+
+def build_augmenter(name, params):
+    """Returns the augmenter class of the package called name built with params.
+
+    Raises:
+        ValueError: If there is no such augmenter.
+    """
+    cls = getattr(text_data_augmentation, name, None)
+    if not isinstance(cls, type) or not issubclass(cls, Augmenter):
+        raise ValueError(f"Unknown augmenter {name}.")
+    return cls(**params)
+
+
+def augment_file(
+    input_path,
+    output_path,
+    augmenter,
+    fmt="jsonl",
+    text_field="text",
+    checkpoint_path=None,
+    checkpoint_every=10000,
+    resume=False,
+    config=None,
+    show_progress=True,
+    shard_id=None,
+    num_shards=None,
+):
+    """Augments a JSONL or CSV file record by record into another file.
+
+    The augmentations of every record are written as copies of the record whose
+    text field holds the augmentation and whose source_index field holds the
+    index of the record. After every checkpoint_every records, rounded up to a
+    multiple of the batch size so that checkpoints fall between batches, the
+    output is flushed to disk and a checkpoint saves the offsets of the input
+    and output and the seed of the augmenter; resuming seeks back to them,
+    dropping what was written after the checkpoint, and gives the same output
+    as an uninterrupted run, even with another checkpoint_every.
+
+    With num_shards, only the records of shard shard_id are augmented, and a
+    manifest of the shard is saved next to the output once the file is done,
+    as the output path followed by ".manifest.json".
+
+    Args:
+        input_path (str): File to augment.
+        output_path (str): File to write the augmentations to.
+        augmenter (Augmenter): Augmenter to apply.
+        fmt (str, optional): "jsonl" or "csv". Defaults to "jsonl".
+        text_field (str, optional): Field of the text to augment.
+            Defaults to "text".
+        checkpoint_path (str, optional): File of the checkpoint.
+            Defaults to None, using the output path followed by ".checkpoint".
+        checkpoint_every (int, optional): Number of records between checkpoints.
+            Defaults to 10000.
+        resume (bool, optional): Set True to resume from the checkpoint.
+            Defaults to False.
+        config (dict, optional): Description of the augmenter saved with the
+            checkpoint, which resuming requires to match. Defaults to None.
+        show_progress (bool, optional): Set True to display progress bar.
+            Defaults to True.
+        shard_id (int, optional): Shard to augment. Defaults to None.
+        num_shards (int, optional): Number of shards. Defaults to None,
+            augmenting every record.
+
+    Returns:
+        int: Number of records augmented, including those before the checkpoint.
+
+    Raises:
+        ValueError: If there is a checkpoint and resume is False, if it was
+            saved with another configuration, if the shard is invalid, or if the
+            augmenter cannot be sharded.
+    """
+    augmenter._check_shards(shard_id, num_shards)
+    checkpoint_path = checkpoint_path or f"{output_path}.checkpoint"
+    checkpoint = load_checkpoint(checkpoint_path)
+    if checkpoint is not None and not resume:
+        raise ValueError(
+            f"{checkpoint_path} exists, resume from it or remove it to start over."
+        )
+    if checkpoint is not None and checkpoint["config"] != config:
+        raise ValueError(f"{checkpoint_path} was saved with another configuration.")
+    if checkpoint is None:
+        augmenter._seed_value()
+        checkpoint = {
+            "config": config,
+            "seed": augmenter.seed,
+            "entropy": augmenter.__dict__.get("_entropy"),
+            "index": 0,
+            "input_offset": 0,
+            "output_offset": 0,
+            "manifest": None,
+        }
+        if num_shards is not None:
+            checkpoint["manifest"] = ShardManifest(
+                shard_id, num_shards, type(augmenter).__name__, augmenter.seed
+            ).as_dict()
+    else:
+        # Records are seeded by the instance seed and their index only.
+        augmenter.seed = checkpoint["seed"]
+        augmenter._entropy = checkpoint["entropy"]
+        if os.path.exists(output_path):
+            os.truncate(output_path, checkpoint["output_offset"])
+
+    fieldnames = None
+    if fmt == "csv":
+        fieldnames, header_end = _csv_header(input_path)
+        checkpoint["input_offset"] = max(checkpoint["input_offset"], header_end)
+        output_fields = fieldnames + ["source_index"] * (
+            "source_index" not in fieldnames
+        )
+    augmenter.disable_progress = True
+    batch_size = augmenter.batch_size
+    checkpoint_every = -(-checkpoint_every // batch_size) * batch_size
+    n_jobs = resolve_n_jobs(augmenter.n_jobs)
+    # The workers receive the augmenter once for all the blocks.
+    executor = AugmenterPool(augmenter, n_jobs) if n_jobs > 1 else None
+    manifest = None
+    if checkpoint["manifest"] is not None:
+        manifest = ShardManifest.from_dict(checkpoint["manifest"])
+    index = checkpoint["index"]
+    mode = "a" if checkpoint["output_offset"] else "w"
+    with open(input_path, "rb") as f, open(
+        output_path, mode, encoding="utf-8", newline="", buffering=1 << 20
+    ) as out, tqdm(initial=index, disable=not show_progress) as progress:
+        if fmt == "csv":
+            writer = csv.DictWriter(out, output_fields)
+            if checkpoint["output_offset"] == 0:
+                writer.writeheader()
+        f.seek(checkpoint["input_offset"])
+        records = read_records(f, fmt, text_field, fieldnames)
+        try:
+            for block in iter(lambda: list(islice(records, checkpoint_every)), []):
+                texts = (record[text_field] for record, _ in block)
+                for source, text in augmenter.iter_augment(
+                    texts, index, executor, shard_id, num_shards
+                ):
+                    if manifest is not None:
+                        manifest.add_augmentation(source, text)
+                    output = dict(block[source - index][0])
+                    output[text_field] = text
+                    output["source_index"] = source
+                    if fmt == "csv":
+                        writer.writerow(output)
+                    else:
+                        out.write(json.dumps(output, ensure_ascii=False) + "\n")
+                for source in range(index, index + len(block)):
+                    if manifest is not None:
+                        manifest.add_record(source)
+                index += len(block)
+                progress.update(len(block))
+                out.flush()
+                os.fsync(out.fileno())
+                checkpoint["index"] = index
+                checkpoint["input_offset"] = block[-1][1]
+                checkpoint["output_offset"] = out.tell()
+                if manifest is not None:
+                    checkpoint["manifest"] = manifest.as_dict()
+                save_checkpoint(checkpoint_path, checkpoint)
+        finally:
+            if executor is not None:
+                executor.shutdown()
+    if manifest is not None:
+        manifest.save(f"{output_path}.manifest.json")
+    return index
+
+
+def augment_file_arrow(
+    input_path,
+    output_path,
+    augmenter,
+    fmt="jsonl",
+    output_format="parquet",
+    text_field="text",
+    show_progress=True,
+    shard_id=None,
+    num_shards=None,
+):
+    """Augments the texts of a JSONL or CSV file into a Parquet or Arrow IPC file,
+    one record batch at a time.
+
+    The rows hold the augmentations with the index of their record, the other
+    fields of the records being left out, as in write_arrow. Unlike
+    augment_file, the output cannot be resumed. With num_shards, only the
+    records of shard shard_id are augmented, and a manifest of the shard is
+    saved next to the output, as the output path followed by ".manifest.json".
+
+    Args:
+        input_path (str): File to augment.
+        output_path (str): File to write the augmentations to.
+        augmenter (Augmenter): Augmenter to apply.
+        fmt (str, optional): "jsonl" or "csv". Defaults to "jsonl".
+        output_format (str, optional): "parquet" or "arrow".
+            Defaults to "parquet".
+        text_field (str, optional): Field of the text to augment.
+            Defaults to "text".
+        show_progress (bool, optional): Set True to display progress bar.
+            Defaults to True.
+        shard_id (int, optional): Shard to augment. Defaults to None.
+        num_shards (int, optional): Number of shards. Defaults to None,
+            augmenting every record.
+
+    Returns:
+        int: Number of augmentations written.
+
+    Raises:
+        ValueError: If the shard is invalid, or if the augmenter cannot be sharded.
+    """
+    augmenter._check_shards(shard_id, num_shards)
+    augmenter.disable_progress = not show_progress
+    n_jobs = resolve_n_jobs(augmenter.n_jobs)
+    executor = AugmenterPool(augmenter, n_jobs) if n_jobs > 1 else None
+    manifest = None if num_shards is None else f"{output_path}.manifest.json"
+    try:
+        with open(input_path, "rb") as f:
+            texts = (
+                record[text_field] for record, _ in read_records(f, fmt, text_field)
+            )
+            return write_arrow(
+                augmenter,
+                texts,
+                output_path,
+                output_format,
+                executor=executor,
+                shard_id=shard_id,
+                num_shards=num_shards,
+                manifest=manifest,
+            )
+    finally:
+        if executor is not None:
+            executor.shutdown()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="text-data-augmentation",
+        description="Augments the texts of a JSONL or CSV file, resumably.",
+    )
+    parser.add_argument("input", help="JSONL or CSV file to augment")
+    parser.add_argument("output", help="file to append the augmentations to")
+    parser.add_argument("--augmenter", required=True, help="e.g. KeyBoardNoise")
+    parser.add_argument(
+        "--param",
+        type=_parse_param,
+        action="append",
+        default=[],
+        metavar="KEY=VALUE",
+        help="parameter of the augmenter, the value parsed as JSON if possible",
+    )
+    parser.add_argument(
+        "--input-format", choices=FORMATS, help="inferred from the input by default"
+    )
+    parser.add_argument(
+        "--format",
+        choices=OUTPUT_FORMATS,
+        help="format of the output, by default parquet or arrow for outputs named "
+        "so and the input format otherwise",
+    )
+    parser.add_argument("--text-field", default="text")
+    parser.add_argument(
+        "--tfidf", help="TF-IDF model fitted on the corpus, saved by TfidfModel.save"
+    )
+    parser.add_argument(
+        "--synonym-index", help="synonym index saved by SynonymIndex.save"
+    )
+    parser.add_argument("--seed", type=int)
+    parser.add_argument("--batch-size", type=int)
+    parser.add_argument("--n-jobs", type=int, default=1)
+    parser.add_argument("--checkpoint", help="defaults to OUTPUT.checkpoint")
+    parser.add_argument("--checkpoint-every", type=int, default=10000)
+    parser.add_argument("--resume", action="store_true")
+    parser.add_argument("--shard-id", type=int)
+    parser.add_argument("--num-shards", type=int)
+    parser.add_argument("--quiet", action="store_true")
+    args = parser.parse_args(argv)
+
+    if (args.shard_id is None) != (args.num_shards is None):
+        parser.error("--shard-id and --num-shards go together")
+    params = dict(args.param)
+    try:
+        augmenter = build_augmenter(args.augmenter, params)
+    except (TypeError, ValueError) as e:
+        parser.error(str(e))
+    if args.seed is not None:
+        augmenter.seed = args.seed
+    augmenter.n_jobs = args.n_jobs
+    if args.batch_size:
+        augmenter.batch_size = args.batch_size
+    tfidf = None
+    if args.tfidf is not None:
+        if not isinstance(augmenter, TfidfWeighting):
+            parser.error(f"{args.augmenter} does not weight words by TF-IDF")
+        augmenter.tfidf = tfidf = TfidfModel.load(args.tfidf)
+    elif isinstance(augmenter, TfidfWeighting) and augmenter.use_tfidf:
+        parser.error(
+            f"{args.augmenter} needs --tfidf, a model fitted on the corpus, "
+            "or --param use_tfidf=false"
+        )
+    if args.synonym_index is not None:
+        if not hasattr(augmenter, "synonym_index"):
+            parser.error(f"{args.augmenter} does not look synonyms up")
+        augmenter.synonym_index = SynonymIndex.load(args.synonym_index)
+    fmt = _infer_format(args.input, args.input_format)
+    output_format = _infer_output_format(args.output, args.format, fmt)
+    if output_format in ARROW_FORMATS:
+        if args.resume:
+            parser.error(f"{output_format} outputs cannot be resumed")
+        try:
+            n_rows = augment_file_arrow(
+                args.input,
+                args.output,
+                augmenter,
+                fmt=fmt,
+                output_format=output_format,
+                text_field=args.text_field,
+                show_progress=not args.quiet,
+                shard_id=args.shard_id,
+                num_shards=args.num_shards,
+            )
+        except (ImportError, ValueError) as e:
+            parser.error(str(e))
+        if not args.quiet:
+            print(f"Wrote {n_rows} augmentations to {args.output}", file=sys.stderr)
+        return 0
+    if output_format != fmt:
+        parser.error(f"{output_format} outputs need {output_format} inputs")
+    config = {
+        "augmenter": args.augmenter,
+        "params": params,
+        "format": fmt,
+        "text_field": args.text_field,
+        "batch_size": augmenter.batch_size,
+        "tfidf": tfidf.fingerprint() if tfidf is not None else None,
+        "synonym_index": args.synonym_index,
+        "shard_id": args.shard_id,
+        "num_shards": args.num_shards,
+    }
+    try:
+        n_records = augment_file(
+            args.input,
+            args.output,
+            augmenter,
+            fmt=fmt,
+            text_field=args.text_field,
+            checkpoint_path=args.checkpoint,
+            checkpoint_every=args.checkpoint_every,
+            resume=args.resume,
+            config=config,
+            show_progress=not args.quiet,
+            shard_id=args.shard_id,
+            num_shards=args.num_shards,
+        )
+    except ValueError as e:
+        parser.error(str(e))
+    if not args.quiet:
+        print(f"Augmented {n_records} records into {args.output}", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,150 @@
+from .base import Augmenter
+
+
+class _Compose(Augmenter):
+    """Base class of the augmenters chaining other augmenters record by record.
+
+    Only the outputs of the last stage are returned, the originals being added
+    once by __call__ as for any augmenter. The records of a batch flow through
+    all the stages before the next batch is read, and every stage augments them
+    in batches of its own batch_size, so model-backed augmenters keep their
+    batched inference.
+
+    Inside the chain a record is identified by its source index followed by the
+    position of every intermediate output it derives from. The key seeds the
+    random generators of the stages, so the outputs of one text draw independent
+    augmentations.
+    """
+
+    def __init__(self, augmenters, seed=None, show_progress=True, n_jobs=1):
+        self.augmenters = list(augmenters)
+        self.seed = seed
+        self.disable_progress = not show_progress
+        self.n_jobs = n_jobs
+
+    def _shard_error(self):
+        for augmenter in self.augmenters:
+            reason = augmenter._shard_error()
+            if reason is not None:
+                return reason
+        return super()._shard_error()
+
+    @staticmethod
+    def _run(augmenter, records):
+        """Augments (source, key, text) records with an augmenter, in its batches.
+
+        Returns:
+            list: The outputs of every record, (source, key, augmented_text)
+                triples whose key is the record key extended with the position
+                of the output.
+        """
+        outputs = [[] for _ in records]
+        for start in range(0, len(records), augmenter.batch_size):
+            batch = records[start : start + augmenter.batch_size]
+            positions = {key: start + i for i, (_, key, _) in enumerate(batch)}
+            for key, text in augmenter._augment_cached(
+                [(key, text) for _, key, text in batch]
+            ):
+                output = outputs[positions[key]]
+                child = (key if isinstance(key, tuple) else (key,)) + (len(output),)
+                output.append((records[positions[key]][0], child, text))
+        return outputs
+
+    def _stages(self, records):
+        raise NotImplementedError
+
+    def _augment_batch(self, batch):
+        records = [(index, index, text) for index, text in batch]
+        return [(source, text) for source, _, text in self._stages(records)]
+
+
+class Sequential(_Compose):
+    """Applies augmenters one after the other, every output of a stage being
+    augmented by the next stage.
+
+    Args:
+        augmenters (list): Augmenters to apply in order.
+        seed (int, optional): Random State for reproducibility. Defaults to None.
+        show_progress (bool, optional): Set True to display progress bar.
+            Defaults to True.
+        n_jobs (int, optional): Number of processes to augment with, -1 to use all
+            the CPUs. Defaults to 1.
+    """
+
+    def _stages(self, records):
+        for augmenter in self.augmenters:
+            records = [r for output in self._run(augmenter, records) for r in output]
+        return records
+
+
+class OneOf(_Compose):
+    """Applies one of the augmenters to every text, chosen at random.
+
+    Args:
+        augmenters (list): Augmenters to choose from.
+        weights (list, optional): Probability of choosing every augmenter, up to
+            normalization. Defaults to None, choosing uniformly.
+        seed (int, optional): Random State for reproducibility. Defaults to None.
+        show_progress (bool, optional): Set True to display progress bar.
+            Defaults to True.
+        n_jobs (int, optional): Number of processes to augment with, -1 to use all
+            the CPUs. Defaults to 1.
+    """
+
+    def __init__(
+        self, augmenters, weights=None, seed=None, show_progress=True, n_jobs=1
+    ):
+        super().__init__(augmenters, seed, show_progress, n_jobs)
+        self.weights = weights
+
+    def _stages(self, records):
+        choices = [
+            self._random_state(key).choices(
+                range(len(self.augmenters)), weights=self.weights
+            )[0]
+            for _, key, _ in records
+        ]
+        outputs = [None] * len(records)
+        for choice, augmenter in enumerate(self.augmenters):
+            chosen = [i for i, c in enumerate(choices) if c == choice]
+            augmented = self._run(augmenter, [records[i] for i in chosen])
+            for i, output in zip(chosen, augmented):
+                outputs[i] = output
+        return [r for output in outputs for r in output]
+
+
+class SomeOf(_Compose):
+    """Applies every augmenter with some probability, one after the other. The
+    texts an augmenter is not applied to go through to the next one unchanged.
+
+    Args:
+        augmenters (list): Augmenters to apply in order.
+        p (float or list, optional): Probability of applying the augmenters, or
+            of applying every augmenter. Defaults to 0.5.
+        seed (int, optional): Random State for reproducibility. Defaults to None.
+        show_progress (bool, optional): Set True to display progress bar.
+            Defaults to True.
+        n_jobs (int, optional): Number of processes to augment with, -1 to use all
+            the CPUs. Defaults to 1.
+    """
+
+    def __init__(self, augmenters, p=0.5, seed=None, show_progress=True, n_jobs=1):
+        super().__init__(augmenters, seed, show_progress, n_jobs)
+        self.p = p
+
+    def _stages(self, records):
+        p = self.p
+        if not isinstance(p, (list, tuple)):
+            p = [p] * len(self.augmenters)
+        for stage, (augmenter, probability) in enumerate(zip(self.augmenters, p)):
+            applied = [
+                i
+                for i, (_, key, _) in enumerate(records)
+                if self._random_state(key, stage).random() < probability
+            ]
+            outputs = [[record] for record in records]
+            augmented = self._run(augmenter, [records[i] for i in applied])
+            for i, output in zip(applied, augmented):
+                outputs[i] = output
+            records = [r for output in outputs for r in output]
+        return records
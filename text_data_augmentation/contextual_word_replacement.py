@@ -1,15 +1,18 @@
-import random
 import re
 
-import numpy as np
-from nltk import sent_tokenize
-from sklearn.feature_extraction.text import TfidfVectorizer
-from tqdm.auto import tqdm
 from transformers import pipeline
 from transformers.pipelines import PipelineException
 
+from .base import Augmenter
+from .tfidf import TfidfWeighting
+from .tokenized import split_sentences
 
-class ContextualWordReplacement:
+# Markers of the tokens starting a word in BPE ("Ġ") and SentencePiece ("▁")
+# vocabularies.
+_WORD_STARTS = ("\u0120", "\u2581")
+
+
+class ContextualWordReplacement(TfidfWeighting, Augmenter):
     """Contextual Word Replacement augmentation creates Augmented Samples by
     randomly replacing some words with a mask and then using a Masked Language
     Model to fill it.
@@ -23,57 +26,218 @@ class ContextualWordReplacement:
         seed (int, optional): Random State for reproducibility. Defaults to None.
         show_progress (bool, optional): Set True to display progress bar.
             Defaults to True.
+        tfidf (TfidfModel, optional): TF-IDF model weighting the words, as fitted by
+            fit or loaded with TfidfModel.load. When None, __call__ fits one on
+            the texts it is given, and the other ways of augmenting require fit
+            to be called first. Defaults to None.
+        samples_per_mask (int, optional): Number of augmentations drawn from the
+            candidates of one masked sentence, each with a different candidate.
+            1 masks every augmentation independently. Defaults to 5.
+        n_masks (int, optional): Number of words masked in a sentence and filled in
+            the same forward pass. Defaults to 1.
+        model_batch_size (int, optional): Number of masked sentences per forward
+            pass. Defaults to 32.
+        cache (ResultCache, optional): Cache of the augmentations of the texts seen
+            before, which skip inference. Defaults to None.
     """
 
     def __init__(
-        self, model=None, n_aug=10, use_tfidf=True, seed=None, show_progress=True
+        self,
+        model=None,
+        n_aug=10,
+        use_tfidf=True,
+        seed=None,
+        show_progress=True,
+        tfidf=None,
+        samples_per_mask=5,
+        n_masks=1,
+        model_batch_size=32,
+        cache=None,
     ):
         self.model = pipeline("fill-mask", model=model)
+        self.mask_token = self.model.tokenizer.mask_token
+        # BPE and SentencePiece vocabularies mark the tokens starting a word,
+        # WordPiece ones the tokens continuing a word.
+        self.__marks_word_starts = any(
+            token.startswith(_WORD_STARTS)
+            for token in self.model.tokenizer.tokenize("a b")
+        )
         self.n_aug = n_aug
         self.use_tfidf = use_tfidf
         self.seed = seed
         self.disable_progress = not show_progress
+        self.tfidf = tfidf
+        self.samples_per_mask = samples_per_mask
+        self.n_masks = n_masks
+        self.model_batch_size = model_batch_size
+        self.cache = cache
 
-    def __contextual_word_replacement(self, sentence):
+    def __mask(self, sentence, weights, row, rng):
+        """Returns the sentence with up to n_masks of its words masked, None if none
+        can be masked."""
+        if self.mask_token in sentence:
+            return None
         if self.use_tfidf:
-            v = self.tvec.transform([sentence])
-            v = np.ravel(v.todense())
-            c = np.max(v)
-            z = np.sum(c - v) / np.mean(v)
-            weights = np.where(
-                v != 0, np.minimum((0.7 * (c - v) / z), np.ones_like(v)), 0
-            )
-            indices = np.arange(len(v))
-            word_2_replace = self.tvec.get_feature_names()[
-                random.choices(indices, weights=weights)[0]
-            ]
-            masked_sentence = re.sub(
-                word_2_replace, "<mask>", sentence, 1, re.IGNORECASE
-            )
+            # Mask the first occurrence of distinct whole words, in a single pass
+            # so that the masks inserted are never matched.
+            remaining = set(weights.sample_distinct(row, rng, self.n_masks))
+            if not remaining:
+                return None
+            pattern = r"\b(?:{})\b".format("|".join(map(re.escape, sorted(remaining))))
+
+            def mask(match):
+                word = match.group(0).lower()
+                if word not in remaining:
+                    return match.group(0)
+                remaining.discard(word)
+                return self.mask_token
+
+            masked_sentence = re.sub(pattern, mask, sentence, flags=re.IGNORECASE)
         else:
             words = sentence.split()
-            r_idx = random.randint(0, len(words) - 1)
-            words[r_idx] = "<mask>"
+            for r_idx in rng.sample(range(len(words)), min(self.n_masks, len(words))):
+                words[r_idx] = self.mask_token
             masked_sentence = " ".join(words)
+        if self.mask_token not in masked_sentence:
+            return None
+        return masked_sentence
+
+    def __fill_masks(self, masked_sentences):
+        """Returns the candidate tokens of every mask of every masked sentence, None
+        for the sentences the model cannot fill.
+
+        The sentences are sorted by length and sent through the pipeline in padded
+        batches of model_batch_size.
+        """
+        tokenizer = self.model.tokenizer
+        lengths = [len(ids) for ids in tokenizer(masked_sentences)["input_ids"]]
+        order = sorted(
+            (
+                i
+                for i, length in enumerate(lengths)
+                if length <= tokenizer.model_max_length
+            ),
+            key=lengths.__getitem__,
+        )
+        self._count("fallback.too_long", len(masked_sentences) - len(order))
+        top_k = max(5, self.samples_per_mask)
+        texts = [masked_sentences[i] for i in order]
         try:
-            augmentations = [s["sequence"] for s in self.model(masked_sentence)]
-            return random.choice(augmentations)
+            outputs = self.model(texts, top_k=top_k, batch_size=self.model_batch_size)
+            if len(texts) == 1:
+                outputs = [outputs]
         except (RuntimeError, PipelineException):
-            return sentence
+            # Fill the sentences one by one to only skip the failing ones.
+            self._count("fallback.batch_pipeline_exception")
+            outputs = []
+            for text in texts:
+                try:
+                    outputs.append(self.model(text, top_k=top_k))
+                except (RuntimeError, PipelineException):
+                    self._count("fallback.pipeline_exception")
+                    outputs.append(None)
+        candidates = [None] * len(masked_sentences)
+        for i, output in zip(order, outputs):
+            if output and isinstance(output[0], dict):
+                output = [output]
+            if not output:
+                continue
+            words = [self.__whole_words(mask) for mask in output]
+            if all(words):
+                candidates[i] = words
+            else:
+                self._count("fallback.subword_candidates")
+        return candidates
 
-    def __call__(self, x):
-        random.seed(self.seed)
+    def __whole_words(self, mask):
+        """Returns the candidates of a mask that are whole words, decoded, dropping
+        the pieces continuing a word such as "##ing"."""
+        tokenizer = self.model.tokenizer
+        words = []
+        for candidate in mask:
+            piece = tokenizer.convert_ids_to_tokens(candidate["token"])
+            if piece.startswith("##") or (
+                self.__marks_word_starts and not piece.startswith(_WORD_STARTS)
+            ):
+                continue
+            word = tokenizer.decode(
+                [candidate["token"]], clean_up_tokenization_spaces=True
+            ).strip()
+            if word:
+                words.append(word)
+        return words
+
+    def __fill(self, masked_sentence, tokens):
+        for token in tokens:
+            masked_sentence = masked_sentence.replace(self.mask_token, token, 1)
+        return masked_sentence
+
+    def _augment_batch(self, batch):
+        with self._timer("tokenize"):
+            documents = [split_sentences(sentence) for _, sentence in batch]
+        sentences = [sent for sents in documents for sent in sents]
+        weights = None
         if self.use_tfidf:
-            self.tvec = TfidfVectorizer().fit(x)
+            weights = self._tfidf_weights(sentences)
+
+        # Every group of samples_per_mask augmentations of a document masks each of
+        # its sentences once, and all the masked sentences of the batch are filled
+        # together.
+        groups, masked_sentences = [], []
+        first_row = 0
+        for (index, _), sents in zip(batch, documents):
+            rows = range(first_row, first_row + len(sents))
+            first_row += len(sents)
+            for first in range(0, self.n_aug, self.samples_per_mask):
+                rng = self._random_state(index, first)
+                with self._timer("mask"):
+                    masked = [
+                        self.__mask(sent, weights, row, rng)
+                        for row, sent in zip(rows, sents)
+                    ]
+                n_samples = min(self.samples_per_mask, self.n_aug - first)
+                groups.append(
+                    (index, sents, masked, len(masked_sentences), n_samples, rng)
+                )
+                masked_sentences.extend(m for m in masked if m is not None)
+        if self.stats is not None:
+            self.stats.count("masked_sentences", len(masked_sentences))
+            self.stats.count(
+                "fallback.unmaskable",
+                sum(masked.count(None) for _, _, masked, _, _, _ in groups),
+            )
+        with self._timer("fill_mask"):
+            candidates = self.__fill_masks(masked_sentences) if masked_sentences else []
+
         augmented = []
-        for sentence in tqdm(x, disable=self.disable_progress):
-            for _ in range(self.n_aug):
-                augmented.append(
-                    " ".join(
-                        [
-                            self.__contextual_word_replacement(sent)
-                            for sent in sent_tokenize(sentence)
-                        ]
-                    )
+        for index, sents, masked, offset, n_samples, rng in groups:
+            filled = []
+            for sent, masked_sentence in zip(sents, masked):
+                mask_candidates = None
+                if masked_sentence is not None:
+                    mask_candidates = candidates[offset]
+                    offset += 1
+                if mask_candidates is None:
+                    filled.append([sent] * n_samples)
+                    continue
+                # Every augmentation of the group takes a different candidate.
+                choices = [rng.sample(c, len(c)) for c in mask_candidates]
+                filled.append(
+                    [
+                        self.__fill(masked_sentence, [c[i % len(c)] for c in choices])
+                        for i in range(n_samples)
+                    ]
                 )
-        return list(x) + augmented
+            augmented.extend((index, " ".join(aug)) for aug in zip(*filled))
+        return augmented
+
+    def _cache_config(self):
+        return {
+            "model": self.model.model.name_or_path,
+            "n_aug": self.n_aug,
+            "use_tfidf": self.use_tfidf,
+            "samples_per_mask": self.samples_per_mask,
+            "n_masks": self.n_masks,
+            "seed": self.seed,
+            "tfidf": self._tfidf_fingerprint(),
+        }
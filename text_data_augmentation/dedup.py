@@ -0,0 +1,204 @@
+import hashlib
+import zlib
+from collections import OrderedDict
+
+import numpy as np
+
+from .base import Augmenter
+
+_PRIME = (1 << 61) - 1
+
+
+class Deduplicate(Augmenter):
+    """Drops the augmentations of another augmenter that repeat the original text,
+    another augmentation of the same text or, optionally, any augmentation seen
+    before in the corpus, and augments the texts again to replace them.
+
+    Exact duplicates are found by hash. With a threshold, near-duplicates are
+    found by MinHash signatures of character shingles: within a text by their
+    estimated Jaccard similarity, and across the corpus by locality sensitive
+    hashing of the signature bands. Corpus wide, the hashes of at most
+    max_corpus_items augmentations are kept, the oldest being forgotten first;
+    with n_jobs other than 1 every worker process keeps its own.
+
+    Args:
+        augmenter (Augmenter): Augmenter whose augmentations to deduplicate.
+        threshold (float, optional): Estimated Jaccard similarity above which two
+            texts are near-duplicates. Defaults to None, dropping exact
+            duplicates only.
+        scope (str, optional): "record" to compare the augmentations of a text
+            with each other and with the text, "corpus" to also compare them with
+            every augmentation kept before. Defaults to "record".
+        max_retries (int, optional): Number of times the texts missing
+            augmentations are augmented again. Defaults to 3.
+        num_perm (int, optional): Number of MinHash permutations. Defaults to 64.
+        shingle_size (int, optional): Number of characters of the shingles.
+            Defaults to 5.
+        max_corpus_items (int, optional): Number of augmentations remembered
+            across the corpus. Defaults to 1000000.
+        seed (int, optional): Random State for reproducibility. Defaults to None.
+        show_progress (bool, optional): Set True to display progress bar.
+            Defaults to True.
+        n_jobs (int, optional): Number of processes to augment with, -1 to use all
+            the CPUs. Defaults to 1.
+    """
+
+    def __init__(
+        self,
+        augmenter,
+        threshold=None,
+        scope="record",
+        max_retries=3,
+        num_perm=64,
+        shingle_size=5,
+        max_corpus_items=1000000,
+        seed=None,
+        show_progress=True,
+        n_jobs=1,
+    ):
+        if scope not in ("record", "corpus"):
+            raise ValueError(
+                f"Invalid scope {scope}, valid scopes are: record, corpus."
+            )
+        self.augmenter = augmenter
+        self.threshold = threshold
+        self.scope = scope
+        self.max_retries = max_retries
+        self.num_perm = num_perm
+        self.shingle_size = shingle_size
+        self.max_corpus_items = max_corpus_items
+        self.seed = seed
+        self.disable_progress = not show_progress
+        self.n_jobs = n_jobs
+        self.bands, self.rows = _bands(num_perm, threshold or 1.0)
+        rng = np.random.default_rng(0)
+        self.permutations = rng.integers(1, _PRIME, size=(2, num_perm), dtype=np.uint64)
+        self.corpus_hashes = OrderedDict()
+        self.corpus_bands = OrderedDict()
+
+    def _shard_error(self):
+        if self.scope == "corpus":
+            return (
+                "Deduplicate with corpus scope depends on the records of other shards."
+            )
+        return self.augmenter._shard_error() or super()._shard_error()
+
+    def __signature(self, text):
+        """Returns the MinHash signature of the character shingles of a text."""
+        size = self.shingle_size
+        shingles = {text[i : i + size] for i in range(max(1, len(text) - size + 1))}
+        hashes = np.fromiter(
+            (zlib.crc32(s.encode("utf-8")) for s in shingles), np.uint64, len(shingles)
+        )
+        a, b = self.permutations
+        # Products of 32 bit hashes and 61 bit multipliers wrap around modulo 2**64,
+        # which still mixes the bits.
+        return ((hashes[:, None] * a + b) % _PRIME).min(axis=0)
+
+    def __band_keys(self, signature):
+        return [
+            hashlib.blake2b(
+                signature[band * self.rows : (band + 1) * self.rows].tobytes()
+                + bytes([band]),
+                digest_size=8,
+            ).digest()
+            for band in range(self.bands)
+        ]
+
+    @staticmethod
+    def __remember(table, key, size):
+        table[key] = None
+        table.move_to_end(key)
+        if len(table) > size:
+            table.popitem(last=False)
+
+    def __select(self, original, kept, candidates, n_wanted):
+        """Adds to kept, a list of (text, signature) pairs, the candidates that are
+        not duplicates, until it holds n_wanted augmentations."""
+        near = self.threshold is not None
+        references = [s for _, s in kept]
+        if near:
+            references.append(self.__signature(original))
+        for text in candidates:
+            if len(kept) >= n_wanted:
+                return
+            digest = hashlib.blake2b(text.encode("utf-8"), digest_size=8).digest()
+            if text == original or any(text == k for k, _ in kept):
+                self._count("dropped.exact")
+                continue
+            if self.scope == "corpus" and digest in self.corpus_hashes:
+                self._count("dropped.exact")
+                continue
+            signature = band_keys = None
+            if near:
+                signature = self.__signature(text)
+                if any(np.mean(signature == s) >= self.threshold for s in references):
+                    self._count("dropped.near")
+                    continue
+                if self.scope == "corpus":
+                    band_keys = self.__band_keys(signature)
+                    if any(key in self.corpus_bands for key in band_keys):
+                        self._count("dropped.near")
+                        continue
+            kept.append((text, signature))
+            references.append(signature)
+            if self.scope == "corpus":
+                self.__remember(self.corpus_hashes, digest, self.max_corpus_items)
+                for key in band_keys or []:
+                    self.__remember(
+                        self.corpus_bands, key, self.max_corpus_items * self.bands
+                    )
+
+    def _augment_batch(self, batch):
+        outputs = {index: [] for index, _ in batch}
+        for index, text in self.augmenter._augment_cached(batch):
+            outputs[index].append(text)
+        # n_aug unique augmentations are as many as the first attempt created.
+        wanted = {index: len(texts) for index, texts in outputs.items()}
+        kept = {index: [] for index, _ in batch}
+        for index, text in batch:
+            self.__select(text, kept[index], outputs[index], wanted[index])
+
+        for attempt in range(1, self.max_retries + 1):
+            # Retries are keyed apart from the first attempt so that they are
+            # seeded apart, and skip the cache, which would return it again.
+            retried = {
+                (index if isinstance(index, tuple) else (index,))
+                + ("retry", attempt): index
+                for index, _ in batch
+                if len(kept[index]) < wanted[index]
+            }
+            if not retried:
+                break
+            self._count("retries", len(retried))
+            texts = dict(batch)
+            outputs = {key: [] for key in retried}
+            with self.augmenter._timer("augment"):
+                augmented = self.augmenter._augment_batch(
+                    [(key, texts[index]) for key, index in retried.items()]
+                )
+            for key, text in augmented:
+                outputs[key].append(text)
+            for key, index in retried.items():
+                self.__select(texts[index], kept[index], outputs[key], wanted[index])
+
+        augmented = []
+        for index, _ in batch:
+            if len(kept[index]) < wanted[index]:
+                self._count("short", wanted[index] - len(kept[index]))
+            augmented.extend((index, text) for text, _ in kept[index])
+        return augmented
+
+
+def _bands(num_perm, threshold):
+    """Returns the number of bands and of rows per band of the LSH of num_perm
+    permutations whose collision probability is 1/2 closest to the threshold."""
+    candidates = [
+        (bands, num_perm // bands)
+        for bands in range(1, num_perm + 1)
+        if num_perm % bands == 0
+    ]
+    return min(
+        candidates,
+        key=lambda band: abs((1 / band[0]) ** (1 / band[1]) - threshold),
+    )
@@ -1,10 +1,11 @@
-import random
-
 import nltk
-from tqdm.auto import tqdm
+
+from .base import Augmenter
+from .synonym_index import default_index
+from .tokenized import as_document
 
 
-class EasyDataAugmentation:
+class EasyDataAugmentation(Augmenter):
     """Easy Data Augmentation adds word level noise by randomly inserting,
     deleting, swaping some words in the input text or by shuffling the
     sentences in the input text.
@@ -19,80 +20,99 @@ class EasyDataAugmentation:
         seed (int, optional): Random State for reproducibility. Defaults to None.
         show_progress (bool, optional): Set True to display progress bar.
             Defaults to True.
+        n_jobs (int, optional): Number of processes to augment with, -1 to use all
+            the CPUs. Defaults to 1.
+        synonym_index (SynonymIndex, optional): Index to look synonyms up in, e.g.
+            built for the corpus vocabulary and loaded with SynonymIndex.load.
+            Defaults to None, looking words up in WordNet through a cache shared
+            by the augmenters.
     """
 
     def __init__(
-        self, alpha=0.1, n_aug=4, operations=None, seed=None, show_progress=True
+        self,
+        alpha=0.1,
+        n_aug=4,
+        operations=None,
+        seed=None,
+        show_progress=True,
+        n_jobs=1,
+        synonym_index=None,
     ):
         self.alpha = alpha
         self.operations = operations or ["insertion", "deletion", "swap", "shuffle"]
         self.n_aug = n_aug
         self.seed = seed
         self.disable_progress = not show_progress
+        self.n_jobs = n_jobs
+        self.synonym_index = synonym_index
         self.stopwords = nltk.corpus.stopwords.words("english")
 
-    def __get_synonym(self, word):
-        synonyms = set()
-        for syn in nltk.corpus.wordnet.synsets(word):
-            for l in syn.lemmas():
-                synonyms.add(l.name())
-        synonyms = [word] if len(synonyms) == 0 else list(synonyms)
-        return random.choice(synonyms)
+    def __get_synonym(self, word, rng):
+        index = self.synonym_index
+        if index is None:
+            index = default_index()
+        with self._timer("synonym_lookup"):
+            synonyms = index.synonyms(word)
+        if not synonyms:
+            self._count("fallback.no_synonym")
+        return rng.choice(synonyms or (word,))
 
-    def __insert(self, words):
-        r_idx_w = random.randint(0, len(words) - 1)
+    def __insert(self, words, rng):
+        r_idx_w = rng.randint(0, len(words) - 1)
         while words[r_idx_w] in self.stopwords:
-            r_idx_w = random.randint(0, len(words) - 1)
-        r_idx_i = random.randint(0, len(words) - 1)
-        syn = self.__get_synonym(words[r_idx_w])
+            r_idx_w = rng.randint(0, len(words) - 1)
+        r_idx_i = rng.randint(0, len(words) - 1)
+        syn = self.__get_synonym(words[r_idx_w], rng)
         words.insert(r_idx_i, syn)
         return words
 
-    def __insertion(self, sentence):
-        words = nltk.word_tokenize(sentence)
+    def __insertion(self, doc, rng):
+        words = list(doc.words)
         for _ in range(int(self.alpha * len(words))):
-            words = self.__insert(words)
+            words = self.__insert(words, rng)
         return " ".join(words)
 
-    def __deletion(self, sentence):
-        words = nltk.word_tokenize(sentence)
-        new_words = [word for word in words if random.random() > self.alpha]
+    def __deletion(self, doc, rng):
+        new_words = [word for word in doc.words if rng.random() > self.alpha]
         return " ".join(new_words)
 
-    def __swap_words(self, words):
-        r_idx_1 = random.randint(0, len(words) - 1)
-        r_idx_2 = random.randint(0, len(words) - 1)
+    def __swap_words(self, words, rng):
+        r_idx_1 = rng.randint(0, len(words) - 1)
+        r_idx_2 = rng.randint(0, len(words) - 1)
         words[r_idx_1], words[r_idx_2] = words[r_idx_2], words[r_idx_1]
         return words
 
-    def __swap(self, sentence):
-        words = nltk.word_tokenize(sentence)
+    def __swap(self, doc, rng):
+        words = list(doc.words)
         for _ in range(int(self.alpha * len(words))):
-            words = self.__swap_words(words)
+            words = self.__swap_words(words, rng)
         return " ".join(words)
 
-    def __shuffle(self, doc):
-        sentences = nltk.sent_tokenize(doc)
-        random.shuffle(sentences)
+    def __shuffle(self, doc, rng):
+        sentences = list(doc.sentences)
+        rng.shuffle(sentences)
         return " ".join(sentences)
 
-    def __call__(self, x):
-        random.seed(self.seed)
+    def _augment_record(self, index, sentence):
+        # The sentence is tokenized once for all its augmentations.
+        with self._timer("tokenize"):
+            doc = as_document(sentence)
         augmented = []
-        for sentence in tqdm(x, disable=self.disable_progress):
-            for _ in range(self.n_aug):
-                operation = random.choice(self.operations)
-                if operation == "insertion":
-                    augmented.append(self.__insertion(sentence))
-                elif operation == "deletion":
-                    augmented.append(self.__deletion(sentence))
-                elif operation == "swap":
-                    augmented.append(self.__swap(sentence))
-                elif operation == "shuffle":
-                    augmented.append(self.__shuffle(sentence))
-                else:
-                    raise AttributeError(
-                        f"Invalid operation {operation}, valid operations are:"
-                        + "insertion, deletion, swap, shuffle."
-                    )
-        return list(x) + augmented
+        for aug_index in range(self.n_aug):
+            rng = self._random_state(index, aug_index)
+            operation = rng.choice(self.operations)
+            self._count(f"operations.{operation}")
+            if operation == "insertion":
+                augmented.append(self.__insertion(doc, rng))
+            elif operation == "deletion":
+                augmented.append(self.__deletion(doc, rng))
+            elif operation == "swap":
+                augmented.append(self.__swap(doc, rng))
+            elif operation == "shuffle":
+                augmented.append(self.__shuffle(doc, rng))
+            else:
+                raise AttributeError(
+                    f"Invalid operation {operation}, valid operations are:"
+                    + "insertion, deletion, swap, shuffle."
+                )
+        return augmented
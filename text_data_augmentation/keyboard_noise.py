@@ -1,9 +1,8 @@
-import random
+from .base import Augmenter
+from .replacement_table import ReplacementTable
 
-from tqdm.auto import tqdm
 
-
-class KeyBoardNoise:
+class KeyBoardNoise(Augmenter):
     """KeyBoard Noise Augmentation adds character level spelling mistake noise by
     mimicing typographical errors made using a qwerty keyboard in the input text.
 
@@ -15,13 +14,16 @@ class KeyBoardNoise:
         seed (int, optional): Random State for reproducibility. Defaults to None.
         show_progress (bool, optional): Set True to display progress bar.
             Defaults to True.
+        n_jobs (int, optional): Number of processes to augment with, -1 to use all
+            the CPUs. Defaults to 1.
     """
 
-    def __init__(self, alpha=0.01, n_aug=4, seed=None, show_progress=True):
+    def __init__(self, alpha=0.01, n_aug=4, seed=None, show_progress=True, n_jobs=1):
         self.alpha = alpha
         self.n_aug = n_aug
         self.seed = seed
         self.disable_progress = not show_progress
+        self.n_jobs = n_jobs
         self.replacement_chars = {
             "1": ["!", "2", "@", "q", "w"],
             "2": ["@", "1", "!", "3", "#", "q", "w", "e"],
@@ -64,21 +66,13 @@ class KeyBoardNoise:
             "n": ["g", "h", "j", "b", "m"],
             "m": ["h", "j", "k", "n", ",", "<"],
         }
+        self.table = ReplacementTable(self.replacement_chars)
 
-    def __replace(self, sentence):
-        chars = list(sentence)
-        new_chars = [
-            char
-            if random.random() > self.alpha
-            else random.choice(self.replacement_chars.get(char, [char]))
-            for char in chars
-        ]
-        return "".join(new_chars)
-
-    def __call__(self, x):
-        random.seed(self.seed)
-        augmented = []
-        for sentence in tqdm(x, disable=self.disable_progress):
-            for _ in range(self.n_aug):
-                augmented.append(self.__replace(sentence))
-        return list(x) + augmented
+    def _augment_batch(self, batch):
+        sentences = [sentence for _, sentence in batch]
+        bits = self._numpy_random_bits(
+            [index for index, _ in batch], [self.n_aug * len(s) for s in sentences]
+        )
+        augmented = self.table.replace(sentences, self.alpha, self.n_aug, bits)
+        indices = [index for index, _ in batch for _ in range(self.n_aug)]
+        return list(zip(indices, augmented))
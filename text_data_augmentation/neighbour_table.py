@@ -0,0 +1,156 @@
+import numpy as np
+
+
+class NeighbourTable:
+    """Precomputed nearest neighbours of the rows of a vector table by cosine
+    similarity, so that finding the words similar to a word is an array index
+    instead of a scan of the whole table.
+
+    Args:
+        neighbours (numpy.ndarray): int32 array whose row i holds the rows most
+            similar to row i by decreasing similarity, row i itself included, or
+            -1 for the rows whose neighbours were not computed.
+    """
+
+    def __init__(self, neighbours):
+        self.neighbours = neighbours
+        self.path = None
+
+    @classmethod
+    def build(
+        cls,
+        data,
+        n_neighbours=15,
+        rows=None,
+        queries=None,
+        block_size=1024,
+        quantize=False,
+    ):
+        """Finds the nearest neighbours of every row of a vector table.
+
+        Similarities are computed with blocks of block_size queries against blocks
+        of block_size candidates, keeping a running top-k per query, so memory does
+        not grow with the square of the table size. With quantize, candidates are
+        scanned as int8 codes of the unit vectors, a quarter of the memory of a
+        float32 copy, and the best 4 * n_neighbours are reranked exactly.
+
+        Args:
+            data (numpy.ndarray): Vector table, one vector per row.
+            n_neighbours (int, optional): Number of neighbours per row.
+                Defaults to 15.
+            rows (numpy.ndarray, optional): Rows to search, the other rows being
+                neither queries nor neighbours. Defaults to None, all the rows.
+            queries (numpy.ndarray, optional): Rows whose neighbours to find, e.g.
+                the rows of the vocabulary of a corpus. Defaults to None, all the
+                searched rows.
+            block_size (int, optional): Number of rows per block. Defaults to 1024.
+            quantize (bool, optional): Whether to scan int8 quantized vectors.
+                Defaults to False.
+
+        Returns:
+            NeighbourTable: The table.
+        """
+        rows = np.arange(len(data)) if rows is None else np.asarray(rows)
+        queries = rows if queries is None else np.asarray(queries)
+        n_neighbours = min(n_neighbours, len(rows))
+        if quantize:
+            n_candidates = min(4 * n_neighbours, len(rows))
+            candidates = np.empty((len(rows), data.shape[1]), dtype=np.int8)
+            for start in range(0, len(rows), block_size):
+                block = _unit(data, rows[start : start + block_size])
+                candidates[start : start + block_size] = np.round(block * 127)
+        else:
+            n_candidates = n_neighbours
+            candidates = _unit(data, rows)
+
+        neighbours = np.full((len(data), n_neighbours), -1, dtype=np.int32)
+        for start in range(0, len(queries), block_size):
+            block = _unit(data, queries[start : start + block_size])
+            best, best_sims = cls.__search(block, candidates, n_candidates, block_size)
+            if quantize:
+                # Rerank the candidates with the exact vectors.
+                exact = _unit(data, rows[best.ravel()]).reshape(*best.shape, -1)
+                best_sims = np.einsum("qd,qkd->qk", block, exact)
+            order = np.argsort(-best_sims, axis=1, kind="stable")[:, :n_neighbours]
+            best = np.take_along_axis(best, order, axis=1)
+            neighbours[queries[start : start + block_size]] = rows[best]
+        return cls(neighbours)
+
+    @staticmethod
+    def __search(queries, candidates, n_candidates, block_size):
+        """Returns the indices and similarities of the n_candidates candidates most
+        similar to every query, in no particular order."""
+        best = np.zeros((len(queries), 0), dtype=np.int64)
+        best_sims = np.zeros((len(queries), 0), dtype=np.float32)
+        for start in range(0, len(candidates), block_size):
+            block = candidates[start : start + block_size]
+            if block.dtype == np.int8:
+                block = block.astype(np.float32) / 127
+            indices = np.broadcast_to(
+                np.arange(start, start + len(block)), (len(queries), len(block))
+            )
+            sims = np.concatenate([best_sims, queries @ block.T], axis=1)
+            indices = np.concatenate([best, indices], axis=1)
+            if sims.shape[1] > n_candidates:
+                top = np.argpartition(-sims, n_candidates - 1, axis=1)[:, :n_candidates]
+                sims = np.take_along_axis(sims, top, axis=1)
+                indices = np.take_along_axis(indices, top, axis=1)
+            best, best_sims = indices, sims
+        return best, best_sims
+
+    @classmethod
+    def from_vectors(cls, vectors, **kwargs):
+        """Finds the nearest neighbours of the vectors of a spaCy vector table,
+        searching the rows that have a key as Vectors.most_similar does.
+
+        Args:
+            vectors (spacy.vectors.Vectors): Vector table, e.g. nlp.vocab.vectors.
+            **kwargs: Arguments of build.
+
+        Returns:
+            NeighbourTable: The table.
+        """
+        rows = np.array(sorted(set(vectors.key2row.values())), dtype=np.int64)
+        return cls.build(np.asarray(vectors.data), rows=rows, **kwargs)
+
+    def save(self, path):
+        """Saves the table to a .npy file.
+
+        Args:
+            path (str): Path of the file.
+        """
+        np.save(path, self.neighbours)
+
+    @classmethod
+    def load(cls, path):
+        """Memory-maps a table saved with save.
+
+        Args:
+            path (str): Path of the file.
+
+        Returns:
+            NeighbourTable: The table.
+        """
+        table = cls(np.load(path, mmap_mode="r"))
+        table.path = path
+        return table
+
+    def __getstate__(self):
+        # Worker processes map the file again rather than receiving a copy of it.
+        if self.path is None:
+            return self.__dict__
+        return {"path": self.path}
+
+    def __setstate__(self, state):
+        if "neighbours" in state:
+            self.__dict__.update(state)
+        else:
+            self.__dict__.update(self.load(state["path"]).__dict__)
+
+
+def _unit(data, rows):
+    """Returns the rows of data scaled to unit norm, as float32."""
+    vectors = np.asarray(data[rows], dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    norms[norms == 0] = 1
+    return vectors / norms
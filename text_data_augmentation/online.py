@@ -0,0 +1,167 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+
+class MicroBatcher:
+    """Augments texts one at a time from coroutines, gathering the concurrent
+    requests into batches so that model-backed augmenters keep their batched
+    inference without blocking the event loop.
+
+    A batch is run as soon as it holds max_batch_size texts, or max_wait seconds
+    after its first text arrived, on a worker thread, one batch at a time. At
+    most max_pending texts wait for a batch: further requests wait for room
+    before being queued.
+
+    Requests are numbered in arrival order, and the number seeds their
+    augmentations as the index of a text does in iter_augment. When the stats of
+    the augmenter are enabled, it records the queue depth seen by every request
+    as the queue_depth histogram, the batches flushed full or after max_wait as
+    the flush.full and flush.timeout counters, and the batch fill as the
+    batched_requests and batch_slots counters, whose ratio is the mean fill.
+
+    Args:
+        augmenter (Augmenter): Augmenter to run the batches.
+        max_batch_size (int, optional): Maximum number of texts of a batch.
+            Defaults to None, using the batch_size of the augmenter.
+        max_wait (float, optional): Maximum number of seconds a text waits for
+            others before its batch is run. Defaults to 0.005.
+        max_pending (int, optional): Maximum number of texts waiting for a batch.
+            Defaults to 1024.
+        executor (concurrent.futures.Executor, optional): Executor to run the
+            batches on. Defaults to None, using a single worker thread.
+    """
+
+    def __init__(
+        self,
+        augmenter,
+        max_batch_size=None,
+        max_wait=0.005,
+        max_pending=1024,
+        executor=None,
+    ):
+        self.augmenter = augmenter
+        self.max_batch_size = max_batch_size or augmenter.batch_size
+        self.max_wait = max_wait
+        self.max_pending = max_pending
+        self.executor = executor
+        self.requests = 0
+        self.__loop = self.__queue = self.__worker = self.__own_executor = None
+
+    @property
+    def queue_depth(self):
+        """Number of texts waiting for a batch."""
+        return 0 if self.__queue is None else self.__queue.qsize()
+
+    def __start(self):
+        loop = asyncio.get_running_loop()
+        if self.__loop is loop and not self.__worker.done():
+            return
+        # Queues belong to the event loop they were created in.
+        self.__loop = loop
+        self.__queue = asyncio.Queue(self.max_pending)
+        if self.executor is None and self.__own_executor is None:
+            self.__own_executor = ThreadPoolExecutor(1)
+        self.__worker = loop.create_task(self.__run())
+
+    async def augment(self, text):
+        """Augments one text in the next batch.
+
+        Args:
+            text (str): Text to augment.
+
+        Returns:
+            list: The augmentations of the text.
+        """
+        self.__start()
+        augmenter = self.augmenter
+        if augmenter.stats is not None:
+            augmenter.stats.observe("queue_depth", self.__queue.qsize())
+        future = self.__loop.create_future()
+        index = self.requests
+        self.requests += 1
+        await self.__queue.put((index, text, future))
+        return await future
+
+    async def __next_batch(self):
+        batch = [await self.__queue.get()]
+        deadline = self.__loop.time() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            timeout = deadline - self.__loop.time()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self.__queue.get(), timeout))
+            except asyncio.TimeoutError:
+                break
+            except asyncio.CancelledError:
+                for _, _, future in batch:
+                    future.cancel()
+                raise
+        full = len(batch) == self.max_batch_size
+        self.augmenter._count("flush.full" if full else "flush.timeout")
+        self.augmenter._count("batched_requests", len(batch))
+        self.augmenter._count("batch_slots", self.max_batch_size)
+        return batch
+
+    async def __run(self):
+        executor = self.executor or self.__own_executor
+        while True:
+            batch = await self.__next_batch()
+            # Requests cancelled while they waited are not augmented.
+            batch = [request for request in batch if not request[2].done()]
+            if not batch:
+                continue
+            outputs = {index: [] for index, _, _ in batch}
+            try:
+                augmented = await self.__loop.run_in_executor(
+                    executor,
+                    self.augmenter._augment_cached,
+                    [(index, text) for index, text, _ in batch],
+                )
+            except asyncio.CancelledError:
+                for _, _, future in batch:
+                    future.cancel()
+                raise
+            except Exception as e:
+                for _, _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+            for index, text in augmented:
+                outputs[index].append(text)
+            for index, _, future in batch:
+                if not future.done():
+                    future.set_result(outputs[index])
+
+    async def close(self):
+        """Stops the batching, cancelling the requests not augmented yet."""
+        if self.__worker is not None:
+            self.__worker.cancel()
+            try:
+                await self.__worker
+            except asyncio.CancelledError:
+                pass
+            while not self.__queue.empty():
+                _, _, future = self.__queue.get_nowait()
+                future.cancel()
+        if self.__own_executor is not None:
+            self.__own_executor.shutdown(wait=False)
+            self.__own_executor = None
+
+    def __getstate__(self):
+        # The queue, the worker and the executor belong to this process.
+        return {
+            "augmenter": self.augmenter,
+            "max_batch_size": self.max_batch_size,
+            "max_wait": self.max_wait,
+            "max_pending": self.max_pending,
+        }
+
+    def __setstate__(self, state):
+        self.__init__(**state)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
@@ -0,0 +1,134 @@
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+
+_worker_augmenter = None
+
+
+def _init_worker(augmenter):
+    global _worker_augmenter
+    _worker_augmenter = augmenter
+
+
+def _augment_chunk(chunk):
+    return _augment_chunk_with(_worker_augmenter, chunk)
+
+
+def _augment_chunk_with(augmenter, chunk):
+    """Returns the augmentations of a chunk and the stats recorded meanwhile in a
+    worker process, None if stats are disabled or recorded in place.
+
+    The chunk is augmented in batches of batch_size, as on the serial path, so
+    the augmenters whose output depends on the batch give the same output.
+    """
+    in_place = augmenter.stats is None or augmenter.stats.pid == os.getpid()
+    if not in_place:
+        augmenter.stats.reset()
+    augmented = []
+    for start in range(0, len(chunk), augmenter.batch_size):
+        augmented.extend(
+            augmenter._augment_cached(chunk[start : start + augmenter.batch_size])
+        )
+    return augmented, None if in_place else augmenter.stats.as_dict()
+
+
+class AugmenterPool(ProcessPoolExecutor):
+    """Process pool whose workers receive a copy of an augmenter once, when they
+    start, to be reused by many calls of iter_augment.
+
+    Given as the executor of iter_augment for the same augmenter, the chunks
+    are sent to the workers without it. Changes made to the augmenter after the
+    pool is created do not reach the workers.
+
+    Args:
+        augmenter (Augmenter): Augmenter to run in the worker processes.
+        max_workers (int): Number of worker processes.
+    """
+
+    def __init__(self, augmenter, max_workers):
+        # Fix the instance seed before the augmenter is copied to the workers.
+        augmenter._seed_value()
+        super().__init__(
+            max_workers=max_workers, initializer=_init_worker, initargs=(augmenter,)
+        )
+        self.augmenter = augmenter
+
+
+def resolve_n_jobs(n_jobs):
+    """Resolves n_jobs to a number of processes, negative values counting back
+    from the number of CPUs as in joblib (-1 uses all of them)."""
+    if n_jobs is None or n_jobs == 0:
+        return 1
+    if n_jobs < 0:
+        return max(1, (os.cpu_count() or 1) + 1 + n_jobs)
+    return n_jobs
+
+
+def parallel_augment(augmenter, records, n_jobs, chunk_size, executor=None):
+    """Augments (index, text) records in chunks on a process pool.
+
+    The augmenter is sent once to each worker process when the pool is created
+    here or is an AugmenterPool of the augmenter, and with every chunk when
+    another executor is given. At most two chunks per worker are in flight, and
+    results are yielded in input order.
+
+    Args:
+        augmenter (Augmenter): Augmenter to run in the worker processes.
+        records (iterable): (index, text) pairs to augment.
+        n_jobs (int): Number of worker processes.
+        chunk_size (int): Number of records sent to a worker at a time, rounded
+            up to a multiple of the batch size so that the batches are those of
+            the serial path.
+        executor (concurrent.futures.Executor, optional): Executor to submit the
+            chunks to instead of creating a process pool. Defaults to None.
+
+    Yields:
+        tuple: (source_index, augmented_text) pairs in input order.
+    """
+    # Fix the instance seed before the augmenter is copied to the workers.
+    augmenter._seed_value()
+    batch_size = augmenter.batch_size
+    chunk_size = -(-chunk_size // batch_size) * batch_size
+    chunks = iter(lambda: list(islice(records, chunk_size)), [])
+    if isinstance(executor, AugmenterPool) and executor.augmenter is augmenter:
+        yield from _ordered_results(
+            lambda chunk: executor.submit(_augment_chunk, chunk),
+            chunks,
+            2 * executor._max_workers,
+            augmenter.stats,
+        )
+        return
+    if executor is not None:
+        max_pending = 2 * getattr(executor, "_max_workers", n_jobs)
+        yield from _ordered_results(
+            lambda chunk: executor.submit(_augment_chunk_with, augmenter, chunk),
+            chunks,
+            max_pending,
+            augmenter.stats,
+        )
+        return
+    with AugmenterPool(augmenter, n_jobs) as pool:
+        yield from _ordered_results(
+            lambda chunk: pool.submit(_augment_chunk, chunk),
+            chunks,
+            2 * n_jobs,
+            augmenter.stats,
+        )
+
+
+def _ordered_results(submit, chunks, max_pending, stats):
+    pending = deque()
+    for chunk in chunks:
+        pending.append(submit(chunk))
+        if len(pending) >= max_pending:
+            yield from _collect(pending.popleft().result(), stats)
+    while pending:
+        yield from _collect(pending.popleft().result(), stats)
+
+
+def _collect(result, stats):
+    augmented, chunk_stats = result
+    if chunk_stats is not None:
+        stats.merge(chunk_stats)
+    return augmented
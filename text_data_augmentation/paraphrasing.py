@@ -1,61 +1,121 @@
-import random
-
 import torch
-from nltk import sent_tokenize
-from tqdm.auto import tqdm
-from transformers import T5ForConditionalGeneration, T5Tokenizer
+from transformers import AutoTokenizer, T5ForConditionalGeneration
+
+from .base import Augmenter
+from .sampling import sampling_kwargs
+from .tokenized import split_sentences
 
 
-class Paraphrase:
+class Paraphrase(Augmenter):
     """Paraphrase Augmentation rephrases the input sentences using T5 models.
 
     Args:
-        t5model (string): T5 model
+        t5model (string): Name or local path of the T5 model.
         n_aug (int, optional): Number of augmentations to be created for one sentence.
             Defaults to 10.
         show_progress (bool, optional): Set True to display progress bar.
             Defaults to True.
+        model_batch_size (int, optional): Number of sentences paraphrased per
+            forward pass. Defaults to 16.
+        max_new_tokens (int, optional): Maximum number of tokens generated per
+            paraphrase. Defaults to 64.
+        cache (ResultCache, optional): Cache of the augmentations of the texts seen
+            before, which skip inference. Defaults to None.
+        seed (int, optional): Random State for reproducibility. Every paraphrase is
+            sampled with its own generator, seeded by the record and the sentence,
+            so outputs do not depend on the batching. Defaults to None.
     """
 
-    def __init__(self, t5model, n_aug=10, show_progress=True):
-        self.tokenizer = T5Tokenizer.from_pretrained(t5model)
-        self.model = T5ForConditionalGeneration.from_pretrained(t5model)
-        self.n_aug = n_aug
+    def __init__(
+        self,
+        t5model,
+        n_aug=10,
+        show_progress=True,
+        model_batch_size=16,
+        max_new_tokens=64,
+        cache=None,
+        seed=None,
+    ):
+        self.tokenizer = AutoTokenizer.from_pretrained(t5model)
         self.device = torch.device("cuda:0" if torch.cuda.is_available() else "cpu")
+        self.model = T5ForConditionalGeneration.from_pretrained(t5model).to(self.device)
+        self.model.eval()
+        self.n_aug = n_aug
+        self.model_batch_size = model_batch_size
+        self.max_new_tokens = max_new_tokens
+        self.cache = cache
+        self.seed = seed
         self.disable_progress = not show_progress
 
-    def __paraphrase_sent(self, sent):
-        text = "paraphrase: " + sent
-        encoding = self.tokenizer.encode_plus(
-            text, pad_to_max_length=True, return_tensors="pt"
-        )
-        input_ids, attention_masks = encoding["input_ids"].to(self.device), encoding[
-            "attention_mask"
-        ].to(self.device)
-        outputs = self.model.generate(
-            input_ids=input_ids,
-            attention_mask=attention_masks,
-            do_sample=True,
-            top_k=120,
-            top_p=0.95,
-            early_stopping=True,
-            num_return_sequences=self.n_aug,
-        )
-        return [
-            self.tokenizer.decode(
-                output, skip_special_tokens=True, clean_up_tokenization_spaces=True
-            )
-            for output in outputs
-        ]
+    def __paraphrase_sents(self, sents, keys):
+        """Returns n_aug paraphrases of every sentence.
 
-    def __paraphrase(self, sentence):
-        sent_tokens = sent_tokenize(sentence)
-        paraphrases = [self.__paraphrase_sent(sent) for sent in sent_tokens]
-        paraphrases = [" ".join(list(x)) for x in zip(*paraphrases)]
+        The sentences are sorted by length and generated in batches of
+        model_batch_size, padded to the longest sentence of the batch, the
+        paraphrases of a sentence being seeded by its key in keys.
+        """
+        if not sents:
+            return []
+        texts = ["paraphrase: " + sent for sent in sents]
+        lengths = [len(ids) for ids in self.tokenizer(texts)["input_ids"]]
+        order = sorted(range(len(texts)), key=lengths.__getitem__)
+        paraphrases = [None] * len(texts)
+        for start in range(0, len(order), self.model_batch_size):
+            batch = order[start : start + self.model_batch_size]
+            encoding = self.tokenizer(
+                [texts[i] for i in batch],
+                padding=True,
+                truncation=True,
+                return_tensors="pt",
+            ).to(self.device)
+            seeds = [
+                self._record_seed(keys[i], j) % 2**64
+                for i in batch
+                for j in range(self.n_aug)
+            ]
+            with torch.no_grad():
+                outputs = self.model.generate(
+                    input_ids=encoding["input_ids"],
+                    attention_mask=encoding["attention_mask"],
+                    max_new_tokens=self.max_new_tokens,
+                    num_return_sequences=self.n_aug,
+                    **sampling_kwargs(seeds, top_k=120, top_p=0.95),
+                )
+            decoded = self.tokenizer.batch_decode(
+                outputs, skip_special_tokens=True, clean_up_tokenization_spaces=True
+            )
+            for position, i in enumerate(batch):
+                paraphrases[i] = decoded[
+                    position * self.n_aug : (position + 1) * self.n_aug
+                ]
         return paraphrases
 
-    def __call__(self, x):
-        augmented = []
-        for sentence in tqdm(x, disable=self.disable_progress):
-            augmented.extend(self.__paraphrase(sentence))
-        return list(x) + augmented
+    def _augment_batch(self, batch):
+        # The sentences of all the documents of the batch are paraphrased together,
+        # then the i-th paraphrases of the sentences of a document are joined into
+        # its i-th augmentation.
+        with self._timer("tokenize"):
+            sent_tokens = [split_sentences(sentence) for _, sentence in batch]
+        sents = [sent for sents in sent_tokens for sent in sents]
+        keys = [
+            (index, position)
+            for (index, _), sents in zip(batch, sent_tokens)
+            for position in range(len(sents))
+        ]
+        self._count("sentences", len(sents))
+        with self._timer("generate"):
+            paraphrases = self.__paraphrase_sents(sents, keys)
+        augmented, start = [], 0
+        for (index, _), sents in zip(batch, sent_tokens):
+            doc_paraphrases = paraphrases[start : start + len(sents)]
+            start += len(sents)
+            augmented.extend((index, " ".join(x)) for x in zip(*doc_paraphrases))
+        return augmented
+
+    def _cache_config(self):
+        return {
+            "model": self.model.name_or_path,
+            "n_aug": self.n_aug,
+            "max_new_tokens": self.max_new_tokens,
+            "seed": self.seed,
+        }
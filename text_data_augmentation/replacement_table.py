@@ -0,0 +1,105 @@
+import numpy as np
+
+
+class ReplacementTable:
+    """Character replacement table compiled to arrays, used to generate all the
+    augmentations of a sentence in one vectorized pass.
+
+    Every character of a sentence is replaced with probability alpha by one of its
+    replacements chosen uniformly, characters without replacements are kept.
+    Replacements may be longer than one character (e.g. "rn" for "m").
+
+    Args:
+        replacement_chars (dict): Mapping of a character to the sequence of its
+            possible replacements.
+    """
+
+    def __init__(self, replacement_chars):
+        keys = sorted(replacement_chars, key=ord)
+        options = [list(replacement_chars[key]) for key in keys]
+        strings = [string for row in options for string in row]
+        codes = [encode(string) for string in strings]
+        self.strings = strings
+
+        # Dense lookup of the row of a codepoint, the last entry (-1) catching the
+        # codepoints past the largest key.
+        size = max((ord(key) for key in keys), default=-1) + 2
+        self.rows = np.full(size, -1, dtype=np.int64)
+        self.rows[[ord(key) for key in keys]] = np.arange(len(keys))
+        self.option_counts = np.array([len(row) for row in options], dtype=np.int64)
+        self.option_starts = np.cumsum(self.option_counts) - self.option_counts
+        self.string_lengths = np.array([len(code) for code in codes], dtype=np.int64)
+        self.string_starts = np.cumsum(self.string_lengths) - self.string_lengths
+        self.string_codes = np.concatenate(codes + [np.zeros(0, dtype="<u4")])
+        self.first_codes = np.array(
+            [code[0] if len(code) else 0 for code in codes], dtype="<u4"
+        )
+
+    def replace(self, sentences, alpha, n_aug, bits):
+        """Returns n_aug augmentations of every sentence.
+
+        Every sentence takes n_aug * len(sentence) random 32 bit words from bits,
+        which give both the Bernoulli replacement mask (word < alpha * 2**32)
+        and, rescaled, the index of the chosen replacement. All the augmentations
+        of all the sentences are then built in one pass over their concatenated
+        codepoints.
+
+        Args:
+            sentences (list): Sentences to augment.
+            alpha (float): Probability of replacing a character.
+            n_aug (int): Number of augmentations to create per sentence.
+            bits (numpy.ndarray): Random uint32 words, those of the first
+                sentence first, e.g. from Augmenter._numpy_random_bits.
+
+        Returns:
+            list: The augmented sentences, the n_aug augmentations of the first
+                sentence first.
+        """
+        threshold = min(int(alpha * 2**32), 2**32)
+        if len(bits) == 0 or threshold <= 0:
+            return [sentence for sentence in sentences for _ in range(n_aug)]
+
+        augmented = encode("".join(sentence * n_aug for sentence in sentences)).copy()
+        if threshold < 2**32:
+            hits = np.flatnonzero(bits < threshold)
+        else:
+            hits = np.arange(len(bits))
+        rows = self.rows[np.minimum(augmented[hits], len(self.rows) - 1)]
+        hits, rows = hits[rows >= 0], rows[rows >= 0]
+        counts = self.option_counts[rows]
+        choices = self.option_starts[rows] + np.minimum(
+            bits[hits].astype(np.int64) * counts // threshold, counts - 1
+        )
+        augmented[hits] = self.first_codes[choices]
+
+        text = decode(augmented)
+        ends = [end for sentence in sentences for end in [len(sentence)] * n_aug]
+        ends = np.cumsum(ends).tolist()
+        starts = [0] + ends[:-1]
+        augmented = [text[start:end] for start, end in zip(starts, ends)]
+
+        # Replacements that are not exactly one character long are rare, they are
+        # spliced into the strings they belong to.
+        spliced = np.flatnonzero(self.string_lengths[choices] != 1)
+        spliced_hits = hits[spliced]
+        rows = np.searchsorted(ends, spliced_hits, side="right").tolist()
+        for row, hit, choice in reversed(
+            list(zip(rows, spliced_hits.tolist(), choices[spliced].tolist()))
+        ):
+            hit -= starts[row]
+            augmented[row] = (
+                augmented[row][:hit] + self.strings[choice] + augmented[row][hit + 1 :]
+            )
+        return augmented
+
+
+def encode(text):
+    """Returns the codepoints of the text as an array."""
+    return np.frombuffer(text.encode("utf-32-le", "surrogatepass"), dtype="<u4")
+
+
+def decode(codes):
+    """Returns the text of an array of codepoints."""
+    return (
+        codes.astype("<u4", copy=False).tobytes().decode("utf-32-le", "surrogatepass")
+    )
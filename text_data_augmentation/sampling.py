@@ -0,0 +1,55 @@
+import torch
+from transformers import LogitsProcessor, LogitsProcessorList
+
+
+class RecordSampler(LogitsProcessor):
+    """Samples the next token of every sequence of a batch with its own
+    torch.Generator, leaving the global random state of torch untouched.
+
+    Passed as a logits processor to a greedy generate call (do_sample=False,
+    num_beams=1), it turns the scores into log-probabilities restricted to the
+    top_k tokens and the top_p nucleus, and adds Gumbel noise to them: the
+    greedy choice is then a sample of that distribution. Every sequence draws
+    the same amount of noise at every step whatever the others do, so its
+    samples depend only on its seed, not on the batch it is generated in.
+
+    Args:
+        seeds (list): Seed of every sequence of the batch, in the order of the
+            rows generated, i.e. num_return_sequences consecutive rows per input.
+        top_k (int, optional): Number of most likely tokens to sample from, 0 for
+            all of them. Defaults to 50.
+        top_p (float, optional): Probability mass of the most likely tokens to
+            sample from. Defaults to 1.0.
+    """
+
+    def __init__(self, seeds, top_k=50, top_p=1.0):
+        self.generators = [torch.Generator().manual_seed(seed) for seed in seeds]
+        self.top_k = top_k
+        self.top_p = top_p
+
+    def __call__(self, input_ids, scores):
+        scores = scores.float().log_softmax(-1)
+        if self.top_k and self.top_k < scores.shape[-1]:
+            kth = torch.topk(scores, self.top_k)[0][..., -1:]
+            scores = scores.masked_fill(scores < kth, -float("inf"))
+        if self.top_p < 1.0:
+            sorted_scores, sorted_ids = scores.sort(descending=True)
+            probs = sorted_scores.softmax(-1)
+            # Drop the tokens past the nucleus, always keeping the most likely.
+            outside = probs.cumsum(-1) - probs >= self.top_p
+            sorted_scores = sorted_scores.masked_fill(outside, -float("inf"))
+            scores = scores.scatter(-1, sorted_ids, sorted_scores)
+        uniforms = torch.stack(
+            [torch.rand(scores.shape[-1], generator=g) for g in self.generators]
+        ).to(scores.device)
+        return scores - torch.log(-torch.log(uniforms))
+
+
+def sampling_kwargs(seeds, top_k=50, top_p=1.0):
+    """Returns the generate keyword arguments sampling every sequence with its own
+    seed through a RecordSampler."""
+    return {
+        "do_sample": False,
+        "num_beams": 1,
+        "logits_processor": LogitsProcessorList([RecordSampler(seeds, top_k, top_p)]),
+    }
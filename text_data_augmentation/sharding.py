@@ -0,0 +1,197 @@
+import hashlib
+import json
+
+_MASK = (1 << 64) - 1
+
+
+def _hash(key):
+    return int.from_bytes(
+        hashlib.blake2b(key.encode(), digest_size=8).digest(), "little"
+    )
+
+
+def shard_of(index, num_shards):
+    """Returns the shard a record belongs to, from a stable hash of its index.
+
+    Args:
+        index (int): Index of the record in the corpus.
+        num_shards (int): Number of shards.
+
+    Returns:
+        int: Shard of the record, between 0 and num_shards - 1.
+    """
+    return _hash(f"shard:{index}") % num_shards
+
+
+def check_shard(shard_id, num_shards):
+    """Checks that shard_id and num_shards are both None or give a shard.
+
+    Raises:
+        ValueError: If only one of them is given, or if shard_id is not between 0
+            and num_shards - 1.
+    """
+    if (shard_id is None) != (num_shards is None):
+        raise ValueError("shard_id and num_shards go together.")
+    if num_shards is not None and not 0 <= shard_id < num_shards:
+        raise ValueError(
+            f"shard_id must be between 0 and num_shards - 1, got {shard_id} of "
+            f"{num_shards}."
+        )
+
+
+class ShardManifest:
+    """Summary of the records and augmentations of one shard, written by every
+    shard and checked by merge_manifests.
+
+    The records and augmentations are summarized by their counts and by sums of
+    their hashes, which do not depend on their order and add up across shards:
+    the shards cover the corpus exactly when the sums of their record hashes add
+    up to that of all the indices, and the sum of their augmentation hashes is
+    the same however the corpus was split.
+
+    Args:
+        shard_id (int): Shard summarized.
+        num_shards (int): Number of shards.
+        augmenter (str): Name of the augmenter.
+        seed (int): Seed of the augmenter.
+        start (int, optional): Index of the first record of the corpus.
+            Defaults to 0.
+    """
+
+    def __init__(self, shard_id, num_shards, augmenter, seed, start=0):
+        self.shard_id = shard_id
+        self.num_shards = num_shards
+        self.augmenter = augmenter
+        self.seed = seed
+        self.start = start
+        self.n_records = 0
+        self.n_members = 0
+        self.n_augmentations = 0
+        self.index_digest = 0
+        self.output_digest = 0
+
+    def add_record(self, index):
+        """Records that a record of the corpus was read, whether it belongs to the
+        shard or not."""
+        self.n_records += 1
+        if shard_of(index, self.num_shards) == self.shard_id:
+            self.n_members += 1
+            self.index_digest = (self.index_digest + _hash(f"index:{index}")) & _MASK
+
+    def add_augmentation(self, index, text):
+        """Records an augmentation of the record index."""
+        self.n_augmentations += 1
+        digest = _hash(f"output:{index}:{text}")
+        self.output_digest = (self.output_digest + digest) & _MASK
+
+    def as_dict(self):
+        """Returns the manifest as a JSON serializable dict."""
+        return dict(self.__dict__)
+
+    @classmethod
+    def from_dict(cls, manifest):
+        """Returns the manifest of a dict returned by as_dict."""
+        self = cls.__new__(cls)
+        self.__dict__.update(manifest)
+        return self
+
+    def save(self, path):
+        """Saves the manifest as JSON."""
+        with open(path, "w") as f:
+            json.dump(self.as_dict(), f, indent=2)
+
+    @classmethod
+    def load(cls, path):
+        """Loads a manifest saved as JSON."""
+        with open(path) as f:
+            return cls.from_dict(json.load(f))
+
+
+def iter_shard(augmenter, x, shard_id, num_shards, manifest=None, start=0, **kwargs):
+    """Augments the records of a corpus that belong to one shard, recording them
+    in a manifest.
+
+    Args:
+        augmenter (Augmenter): Augmenter to apply, with a seed.
+        x (iterable): Whole corpus, the same for every shard.
+        shard_id (int): Shard to augment.
+        num_shards (int): Number of shards.
+        manifest (str, optional): Path to save the manifest to once the shard is
+            done. Defaults to None.
+        start (int, optional): Index of the first text. Defaults to 0.
+        **kwargs: executor, passed on to iter_augment.
+
+    Yields:
+        tuple: (source_index, augmented_text) pairs of the shard in input order.
+    """
+    summary = ShardManifest(
+        shard_id, num_shards, type(augmenter).__name__, augmenter.seed, start
+    )
+
+    def read():
+        for index, text in enumerate(x, start):
+            summary.add_record(index)
+            yield text
+
+    for index, text in augmenter.iter_augment(
+        read(), start, shard_id=shard_id, num_shards=num_shards, **kwargs
+    ):
+        summary.add_augmentation(index, text)
+        yield index, text
+    if manifest is not None:
+        summary.save(manifest)
+
+
+def _as_manifest(manifest):
+    if isinstance(manifest, ShardManifest):
+        return manifest
+    if isinstance(manifest, dict):
+        return ShardManifest.from_dict(manifest)
+    return ShardManifest.load(manifest)
+
+
+def merge_manifests(manifests):
+    """Checks that the manifests of the shards of a corpus cover it exactly once
+    and combines them.
+
+    Args:
+        manifests (list): ShardManifest objects, dicts, or paths to manifests.
+
+    Returns:
+        ShardManifest: Manifest of the whole corpus as a single shard, whose
+            output_digest is the same however the corpus was split.
+
+    Raises:
+        ValueError: If the manifests are of different corpora or augmenters, if
+            a shard is missing or repeated, or if the records do not add up.
+    """
+    manifests = [_as_manifest(m) for m in manifests]
+    if not manifests:
+        raise ValueError("No manifest to merge.")
+    first = manifests[0]
+    for field in ("num_shards", "augmenter", "seed", "start", "n_records"):
+        values = {getattr(m, field) for m in manifests}
+        if len(values) > 1:
+            raise ValueError(f"The manifests disagree on {field}: {sorted(values)}.")
+    shard_ids = sorted(m.shard_id for m in manifests)
+    if shard_ids != list(range(first.num_shards)):
+        raise ValueError(
+            f"Expected shards 0 to {first.num_shards - 1}, got {shard_ids}."
+        )
+
+    merged = ShardManifest(0, 1, first.augmenter, first.seed, first.start)
+    merged.n_records = first.n_records
+    for m in manifests:
+        merged.n_members += m.n_members
+        merged.n_augmentations += m.n_augmentations
+        merged.index_digest = (merged.index_digest + m.index_digest) & _MASK
+        merged.output_digest = (merged.output_digest + m.output_digest) & _MASK
+    expected = 0
+    for index in range(first.start, first.start + first.n_records):
+        expected = (expected + _hash(f"index:{index}")) & _MASK
+    if merged.n_members != merged.n_records or merged.index_digest != expected:
+        raise ValueError(
+            f"The shards hold {merged.n_members} records of {merged.n_records}, "
+            "or records other than those of the corpus."
+        )
+    return merged
@@ -1,13 +1,13 @@
-import random
 import re
 
 import numpy as np
 import spacy
-from sklearn.feature_extraction.text import TfidfVectorizer
-from tqdm.auto import tqdm
 
+from .base import Augmenter
+from .tfidf import TfidfWeighting
 
-class SimilarWordReplacement:
+
+class SimilarWordReplacement(TfidfWeighting, Augmenter):
     """Similar Word Replacement Augmentation creates Augmented Samples by randomly
     replacing some words with a word having the most similar vector to it.
 
@@ -22,63 +22,96 @@ class SimilarWordReplacement:
         seed (int, optional): Random State for reproducibility. Defaults to None.
         show_progress (bool, optional): Set True to display progress bar.
             Defaults to True.
+        tfidf (TfidfModel, optional): TF-IDF model weighting the words, as fitted by
+            fit or loaded with TfidfModel.load. When None, __call__ fits one on
+            the texts it is given, and the other ways of augmenting require fit
+            to be called first. Defaults to None.
+        neighbour_table (NeighbourTable, optional): Precomputed neighbours of the
+            vectors of the model, see NeighbourTable.from_vectors. Defaults to None,
+            searching the whole vector table for every replaced word.
     """
 
     def __init__(
-        self, model, alpha=0.1, n_aug=4, use_tfidf=True, seed=None, show_progress=True
+        self,
+        model,
+        alpha=0.1,
+        n_aug=4,
+        use_tfidf=True,
+        seed=None,
+        show_progress=True,
+        tfidf=None,
+        neighbour_table=None,
     ):
         self.alpha = alpha
         self.n_aug = n_aug
         self.use_tfidf = use_tfidf
         self.seed = seed
         self.disable_progress = not show_progress
+        self.tfidf = tfidf
         self.nlp = spacy.load(model)
+        self.neighbour_table = neighbour_table
+        self.row2key = None
+        if neighbour_table is not None:
+            # The key of a row, as in Vectors.most_similar.
+            self.row2key = {
+                row: key for key, row in self.nlp.vocab.vectors.key2row.items()
+            }
 
-    def __get_similar_word(self, word):
+    def __get_similar_word(self, word, rng):
         try:
-            ms = self.nlp.vocab.vectors.most_similar(
-                np.asarray([self.nlp.vocab.vectors[self.nlp.vocab.strings[word]]]), n=15
-            )
-            words = [self.nlp.vocab.strings[w] for w in ms[0][0]]
-            words = [w for w in words if w.lower() != word.lower()]
-            return random.choice(words)
+            with self._timer("similar_lookup"):
+                words = self.__similar_words(word)
+            return rng.choice(words)
         except (KeyError, IndexError):
+            self._count("fallback.no_similar_word")
             return word
 
-    def __replace_word(self, words):
+    def __similar_words(self, word):
+        vectors, strings = self.nlp.vocab.vectors, self.nlp.vocab.strings
+        if self.neighbour_table is None:
+            ms = vectors.most_similar(np.asarray([vectors[strings[word]]]), n=15)
+            words = [strings[w] for w in ms[0][0]]
+        else:
+            rows = self.neighbour_table.neighbours[vectors.key2row[strings[word]]]
+            words = [strings[self.row2key[row]] for row in rows.tolist() if row >= 0]
+        return [w for w in words if w.lower() != word.lower()]
+
+    def __replace_word(self, words, sentence, weights, row, rng):
         if self.use_tfidf:
-            sentence = " ".join(words)
-            v = self.tvec.transform([sentence])
-            v = np.ravel(v.todense())
-            c = np.max(v)
-            z = np.sum(c - v) / np.mean(v)
-            weights = np.where(
-                v != 0, np.minimum((0.7 * (c - v) / z), np.ones_like(v)), 0
-            )
-            indices = np.arange(len(v))
-            word_2_replace = self.tvec.get_feature_names()[
-                random.choices(indices, weights=weights)[0]
-            ]
-            syn = self.__get_similar_word(word_2_replace)
-            return re.sub(word_2_replace, syn, sentence, 1, re.IGNORECASE)
+            word_2_replace = weights.sample(row, rng)
+            if word_2_replace is None:
+                self._count("fallback.no_weighted_word")
+                return sentence
+            syn = self.__get_similar_word(word_2_replace, rng)
+            self._count("replacements")
+            with self._timer("re_sub"):
+                return re.sub(word_2_replace, syn, sentence, 1, re.IGNORECASE)
         else:
-            r_idx = random.randint(0, len(words) - 1)
-            syn = self.__get_similar_word(words[r_idx])
+            r_idx = rng.randint(0, len(words) - 1)
+            syn = self.__get_similar_word(words[r_idx], rng)
+            self._count("replacements")
             words[r_idx] = syn
             return " ".join(words)
 
-    def __replace_sent(self, sentence):
+    def __replace_sent(self, sentence, weights, row, rng):
         words = sentence.split()
+        aug_sent = " ".join(words)
         for _ in range(int(self.alpha * len(words))):
-            aug_sent = self.__replace_word(words)
+            aug_sent = self.__replace_word(words, aug_sent, weights, row, rng)
         return aug_sent
 
-    def __call__(self, x):
-        random.seed(self.seed)
+    def _augment_batch(self, batch):
+        weights = None
         if self.use_tfidf:
-            self.tvec = TfidfVectorizer().fit(x)
-        augmented = []
-        for sentence in tqdm(x, disable=self.disable_progress):
-            for _ in range(self.n_aug):
-                augmented.append(self.__replace_sent(sentence))
-        return list(x) + augmented
+            weights = self._tfidf_weights([sentence for _, sentence in batch])
+        with self._timer("replace"):
+            return [
+                (
+                    index,
+                    self.__replace_sent(
+                        sentence, weights, row, self._random_state(index, aug_index)
+                    ),
+                )
+                for row, (index, sentence) in enumerate(batch)
+                for aug_index in range(self.n_aug)
+            ]
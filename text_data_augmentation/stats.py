@@ -0,0 +1,243 @@
+import json
+import os
+import sys
+import time
+from bisect import bisect_left
+from collections import Counter, defaultdict
+
+BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128, 256, 512, 1024)
+
+
+class Stats:
+    """Timers, counters and histograms recorded by an augmenter while it runs.
+
+    Timers accumulate the seconds and calls of the stages of the augmenter,
+    counters the events such as the operations applied, fallbacks taken and cache
+    hits, and histograms the distribution of values such as batch sizes.
+
+    Args:
+        name (str, optional): Name of the augmenter, used as a label when
+            exporting. Defaults to "".
+        buckets (tuple, optional): Upper bounds of the histogram buckets.
+            Defaults to powers of two from 1 to 1024.
+    """
+
+    def __init__(self, name="", buckets=BUCKETS):
+        self.name = name
+        self.buckets = tuple(buckets)
+        # Copies in worker processes record separately and are merged back.
+        self.pid = os.getpid()
+        self.reset()
+
+    def reset(self):
+        """Forgets everything recorded so far."""
+        self.seconds = defaultdict(float)
+        self.calls = Counter()
+        self.counters = Counter()
+        self.histograms = defaultdict(lambda: [0] * (len(self.buckets) + 1))
+        self.sums = defaultdict(float)
+
+    def timer(self, stage):
+        """Returns a context manager adding the time spent in it to a stage.
+
+        Args:
+            stage (str): Name of the stage.
+        """
+        return _Timer(self, stage)
+
+    def count(self, event, n=1):
+        """Adds to the counter of an event.
+
+        Args:
+            event (str): Name of the event.
+            n (int, optional): Number of occurrences. Defaults to 1.
+        """
+        self.counters[event] += n
+
+    def observe(self, name, value):
+        """Adds a value to a histogram.
+
+        Args:
+            name (str): Name of the histogram.
+            value (float): Observed value.
+        """
+        self.histograms[name][bisect_left(self.buckets, value)] += 1
+        self.sums[name] += value
+
+    def as_dict(self):
+        """Returns everything recorded as a JSON serializable dict.
+
+        Returns:
+            dict: The timers, as seconds and calls per stage, the counters, and the
+                histograms, as cumulative counts per bucket upper bound with their
+                sum and count.
+        """
+        histograms = {}
+        for name, counts in self.histograms.items():
+            cumulative, total = {}, 0
+            for bound, count in zip(self.buckets + ("+Inf",), counts):
+                total += count
+                cumulative[str(bound)] = total
+            histograms[name] = {
+                "buckets": cumulative,
+                "sum": self.sums[name],
+                "count": total,
+            }
+        return {
+            "augmenter": self.name,
+            "timers": {
+                stage: {"seconds": self.seconds[stage], "calls": self.calls[stage]}
+                for stage in self.calls
+            },
+            "counters": dict(self.counters),
+            "histograms": histograms,
+        }
+
+    def merge(self, stats):
+        """Adds the records of other stats, e.g. those of a worker process.
+
+        Args:
+            stats (Stats or dict): Stats, or the dict returned by as_dict.
+        """
+        if isinstance(stats, Stats):
+            stats = stats.as_dict()
+        for stage, timer in stats["timers"].items():
+            self.seconds[stage] += timer["seconds"]
+            self.calls[stage] += timer["calls"]
+        self.counters.update(stats["counters"])
+        for name, histogram in stats["histograms"].items():
+            previous = 0
+            counts = self.histograms[name]
+            for i, total in enumerate(histogram["buckets"].values()):
+                counts[i] += total - previous
+                previous = total
+            self.sums[name] += histogram["sum"]
+
+    def to_prometheus(self, prefix="text_data_augmentation"):
+        """Returns everything recorded in the Prometheus text exposition format.
+
+        Args:
+            prefix (str, optional): Prefix of the metric names.
+                Defaults to "text_data_augmentation".
+
+        Returns:
+            str: The metrics.
+        """
+        stats = self.as_dict()
+        label = f'augmenter="{_escape(self.name)}"'
+        lines = [
+            f"# TYPE {prefix}_stage_seconds_total counter",
+            *(
+                f'{prefix}_stage_seconds_total{{{label},stage="{_escape(stage)}"}} '
+                f'{timer["seconds"]!r}'
+                for stage, timer in stats["timers"].items()
+            ),
+            f"# TYPE {prefix}_stage_calls_total counter",
+            *(
+                f'{prefix}_stage_calls_total{{{label},stage="{_escape(stage)}"}} '
+                f'{timer["calls"]}'
+                for stage, timer in stats["timers"].items()
+            ),
+            f"# TYPE {prefix}_events_total counter",
+            *(
+                f'{prefix}_events_total{{{label},event="{_escape(event)}"}} {count}'
+                for event, count in stats["counters"].items()
+            ),
+        ]
+        for name, histogram in stats["histograms"].items():
+            metric = f"{prefix}_{name}"
+            lines.append(f"# TYPE {metric} histogram")
+            lines.extend(
+                f'{metric}_bucket{{{label},le="{bound}"}} {count}'
+                for bound, count in histogram["buckets"].items()
+            )
+            lines.append(f"{metric}_sum{{{label}}} {histogram['sum']!r}")
+            lines.append(f"{metric}_count{{{label}}} {histogram['count']}")
+        return "\n".join(lines) + "\n"
+
+    def to_json(self):
+        """Returns everything recorded as a JSON log line.
+
+        Returns:
+            str: One line of JSON, with the time it was written.
+        """
+        return json.dumps(dict(self.as_dict(), time=time.time()), sort_keys=True)
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state["histograms"] = dict(self.histograms)
+        return state
+
+    def __setstate__(self, state):
+        histograms = state.pop("histograms")
+        self.__dict__.update(state)
+        self.histograms = defaultdict(lambda: [0] * (len(self.buckets) + 1))
+        self.histograms.update(histograms)
+
+
+class _Timer:
+    __slots__ = ("stats", "stage", "started")
+
+    def __init__(self, stats, stage):
+        self.stats = stats
+        self.stage = stage
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.stats.seconds[self.stage] += time.perf_counter() - self.started
+        self.stats.calls[self.stage] += 1
+
+
+class _NullTimer:
+    """Timer of the augmenters whose stats are disabled, doing nothing."""
+
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        pass
+
+
+NULL_TIMER = _NullTimer()
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def reset_peak_rss():
+    """Resets the peak resident memory of the process to its current resident
+    memory, so that peak_rss_mb then returns the peak since the reset.
+
+    Returns:
+        bool: Whether the peak was reset, which only Linux supports.
+    """
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+    except OSError:
+        return False
+    return True
+
+
+def peak_rss_mb():
+    """Returns the peak resident memory of the process in MiB, None if unknown."""
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) / 2**10
+    except OSError:
+        pass
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and in kilobytes elsewhere.
+    return peak / 2**20 if sys.platform == "darwin" else peak / 2**10
@@ -0,0 +1,248 @@
+from bisect import bisect_left
+from collections import OrderedDict
+
+import numpy as np
+
+MAGIC = b"TDASYN01"
+HEADER = np.dtype([("magic", "S8"), ("sizes", "<u8", 4)])
+
+
+class SynonymIndex:
+    """WordNet synonyms of words, looked up once and shared by the augmenters.
+
+    Synonyms of the indexed words are stored compactly: every distinct string is
+    interned once in a utf-8 blob with an offsets array, and the synonyms of a word
+    are a range of string ids. The index can be saved to a single file that is
+    memory-mapped when loaded, so worker processes share its pages. Words missing
+    from the index are looked up in WordNet. Recent lookups are kept in a bounded
+    LRU cache in front of both.
+
+    Args:
+        cache_size (int, optional): Number of words whose synonyms are cached.
+            Defaults to 65536.
+    """
+
+    def __init__(self, cache_size=65536):
+        self.cache_size = cache_size
+        self.path = None
+        self.__set_arrays(*_to_arrays({}))
+        self.cache = OrderedDict()
+
+    @classmethod
+    def build(cls, words=None, cache_size=65536):
+        """Builds the index of a vocabulary, or of all of WordNet.
+
+        Args:
+            words (iterable, optional): Words to index, e.g. the vocabulary of the
+                corpus. None indexes every lemma of WordNet. Defaults to None.
+            cache_size (int, optional): Number of words whose synonyms are cached.
+                Defaults to 65536.
+
+        Returns:
+            SynonymIndex: The index.
+        """
+        from nltk.corpus import wordnet
+
+        if words is None:
+            words = wordnet.all_lemma_names()
+        words = {word.lower() for word in words}
+        synonyms = {word: _wordnet_synonyms(word) for word in words}
+        return cls.from_synonyms(synonyms, cache_size)
+
+    @classmethod
+    def from_synonyms(cls, synonyms, cache_size=65536):
+        """Builds the index of a mapping of words to their synonyms.
+
+        Args:
+            synonyms (dict): Mapping of lowercase words to their synonyms.
+            cache_size (int, optional): Number of words whose synonyms are cached.
+                Defaults to 65536.
+
+        Returns:
+            SynonymIndex: The index.
+        """
+        index = cls(cache_size)
+        index.__set_arrays(
+            *_to_arrays({word: sorted(set(syns)) for word, syns in synonyms.items()})
+        )
+        return index
+
+    def __set_arrays(self, string_offsets, blob, word_ids, synonym_offsets, ids):
+        self.string_offsets = string_offsets
+        self.blob = blob
+        self.word_ids = word_ids
+        self.synonym_offsets = synonym_offsets
+        self.synonym_ids = ids
+        self.__words = _Strings(string_offsets, blob, word_ids)
+
+    def __len__(self):
+        return len(self.word_ids)
+
+    def __contains__(self, word):
+        word = word.lower()
+        position = bisect_left(self.__words, word)
+        return position < len(self) and self.__words[position] == word
+
+    def __lookup(self, word):
+        position = bisect_left(self.__words, word)
+        if position == len(self) or self.__words[position] != word:
+            return _wordnet_synonyms(word)
+        start, end = self.synonym_offsets[position : position + 2]
+        return tuple(
+            _Strings(self.string_offsets, self.blob, self.synonym_ids[start:end])
+        )
+
+    def synonyms(self, word):
+        """Returns the synonyms of a word.
+
+        Args:
+            word (str): Word to look up, case insensitive.
+
+        Returns:
+            tuple: Sorted lemma names of the synsets of the word, which include the
+                word itself, empty if WordNet does not know the word.
+        """
+        word = word.lower()
+        synonyms = self.cache.get(word)
+        if synonyms is not None:
+            self.cache.move_to_end(word)
+            return synonyms
+        synonyms = self.cache[word] = self.__lookup(word)
+        if len(self.cache) > self.cache_size:
+            self.cache.popitem(last=False)
+        return synonyms
+
+    def save(self, path):
+        """Saves the index to a file that load memory-maps.
+
+        Args:
+            path (str): Path of the file.
+        """
+        arrays = [
+            self.string_offsets,
+            self.blob,
+            self.word_ids,
+            self.synonym_offsets,
+            self.synonym_ids,
+        ]
+        sizes = [len(self.string_offsets) - 1, len(self.blob), len(self.word_ids)]
+        sizes.append(len(self.synonym_ids))
+        with open(path, "wb") as f:
+            f.write(np.array((MAGIC, sizes), dtype=HEADER).tobytes())
+            for array in arrays:
+                f.write(np.ascontiguousarray(array).tobytes())
+                f.write(b"\0" * (-array.nbytes % 8))
+
+    @classmethod
+    def load(cls, path, cache_size=65536):
+        """Memory-maps an index saved with save.
+
+        Args:
+            path (str): Path of the file.
+            cache_size (int, optional): Number of words whose synonyms are cached.
+                Defaults to 65536.
+
+        Returns:
+            SynonymIndex: The index.
+        """
+        index = cls(cache_size)
+        index.__set_arrays(*_map(path))
+        index.path = path
+        return index
+
+    def __getstate__(self):
+        # Worker processes map the file again rather than receiving a copy of it.
+        state = {"cache_size": self.cache_size, "path": self.path}
+        if self.path is None:
+            state["arrays"] = [
+                self.string_offsets,
+                self.blob,
+                self.word_ids,
+                self.synonym_offsets,
+                self.synonym_ids,
+            ]
+        return state
+
+    def __setstate__(self, state):
+        self.cache_size = state["cache_size"]
+        self.path = state["path"]
+        self.cache = OrderedDict()
+        self.__set_arrays(*state.get("arrays") or _map(self.path))
+
+
+class _Strings:
+    """Sequence of the interned strings of some ids, e.g. to binary search them."""
+
+    def __init__(self, string_offsets, blob, ids):
+        self.string_offsets = string_offsets
+        self.blob = blob
+        self.ids = ids
+
+    def __len__(self):
+        return len(self.ids)
+
+    def __getitem__(self, position):
+        string_id = int(self.ids[position])
+        start, end = self.string_offsets[string_id : string_id + 2].tolist()
+        return bytes(self.blob[start:end]).decode("utf-8")
+
+
+def _map(path):
+    """Returns the arrays of an index file, mapped in memory."""
+    buffer = np.memmap(path, dtype=np.uint8, mode="r")
+    header = buffer[: HEADER.itemsize].view(HEADER)[0]
+    if header["magic"] != MAGIC:
+        raise ValueError(f"{path} is not a synonym index")
+    n_strings, blob_size, n_words, n_synonyms = header["sizes"].tolist()
+    arrays, offset = [], HEADER.itemsize
+    for dtype, size in [
+        ("<u8", n_strings + 1),
+        ("u1", blob_size),
+        ("<u4", n_words),
+        ("<u8", n_words + 1),
+        ("<u4", n_synonyms),
+    ]:
+        nbytes = np.dtype(dtype).itemsize * size
+        arrays.append(buffer[offset : offset + nbytes].view(dtype))
+        offset += nbytes + (-nbytes % 8)
+    return arrays
+
+
+def _wordnet_synonyms(word):
+    from nltk.corpus import wordnet
+
+    synonyms = set()
+    for syn in wordnet.synsets(word):
+        for l in syn.lemmas():
+            synonyms.add(l.name())
+    return tuple(sorted(synonyms))
+
+
+def _to_arrays(synonyms):
+    """Interns the words and synonyms of a {word: synonyms} mapping into arrays."""
+    strings = sorted(set(synonyms).union(*synonyms.values()))
+    ids = {string: i for i, string in enumerate(strings)}
+    encoded = [string.encode("utf-8") for string in strings]
+    string_offsets = np.zeros(len(strings) + 1, dtype="<u8")
+    np.cumsum([len(string) for string in encoded], out=string_offsets[1:])
+    blob = np.frombuffer(b"".join(encoded), dtype=np.uint8)
+    words = sorted(synonyms)
+    word_ids = np.array([ids[word] for word in words], dtype="<u4")
+    synonym_offsets = np.zeros(len(words) + 1, dtype="<u8")
+    np.cumsum([len(synonyms[word]) for word in words], out=synonym_offsets[1:])
+    synonym_ids = np.array(
+        [ids[synonym] for word in words for synonym in synonyms[word]], dtype="<u4"
+    )
+    return string_offsets, blob, word_ids, synonym_offsets, synonym_ids
+
+
+_default_index = None
+
+
+def default_index():
+    """Returns the index shared by the augmenters of a process that are not given
+    one, which looks every word up in WordNet and caches the result."""
+    global _default_index
+    if _default_index is None:
+        _default_index = SynonymIndex()
+    return _default_index
@@ -1,13 +1,14 @@
-import random
 import re
 
 import nltk
-import numpy as np
-from sklearn.feature_extraction.text import TfidfVectorizer
-from tqdm.auto import tqdm
 
+from .base import Augmenter
+from .synonym_index import default_index
+from .tfidf import TfidfWeighting
+from .tokenized import as_document
 
-class SynonymReplacement:
+
+class SynonymReplacement(TfidfWeighting, Augmenter):
     """Synonym Replacement Augmentation creates Augmented Samples by randomly
     replacing some words with their synonyms based on the word net data base.
 
@@ -21,62 +22,90 @@ class SynonymReplacement:
         seed (int, optional): Random State for reproducibility. Defaults to None.
         show_progress (bool, optional): Set True to display progress bar.
             Defaults to True.
+        n_jobs (int, optional): Number of processes to augment with, -1 to use all
+            the CPUs. Defaults to 1.
+        tfidf (TfidfModel, optional): TF-IDF model weighting the words, as fitted by
+            fit or loaded with TfidfModel.load. When None, __call__ fits one on
+            the texts it is given, and the other ways of augmenting require fit
+            to be called first. Defaults to None.
+        synonym_index (SynonymIndex, optional): Index to look synonyms up in, e.g.
+            built for the corpus vocabulary and loaded with SynonymIndex.load.
+            Defaults to None, looking words up in WordNet through a cache shared
+            by the augmenters.
     """
 
     def __init__(
-        self, alpha=0.1, n_aug=4, use_tfidf=True, seed=None, show_progress=True
+        self,
+        alpha=0.1,
+        n_aug=4,
+        use_tfidf=True,
+        seed=None,
+        show_progress=True,
+        n_jobs=1,
+        tfidf=None,
+        synonym_index=None,
     ):
         self.alpha = alpha
         self.n_aug = n_aug
         self.use_tfidf = use_tfidf
         self.seed = seed
         self.disable_progress = not show_progress
+        self.n_jobs = n_jobs
+        self.tfidf = tfidf
+        self.synonym_index = synonym_index
         self.stopwords = nltk.corpus.stopwords.words("english")
 
-    def __get_synonym(self, word):
-        synonyms = set()
-        for syn in nltk.corpus.wordnet.synsets(word):
-            for l in syn.lemmas():
-                synonyms.add(l.name())
-        synonyms = [word] if len(synonyms) == 0 else list(synonyms)
-        return random.choice(synonyms)
+    def __get_synonym(self, word, rng):
+        index = self.synonym_index
+        if index is None:
+            index = default_index()
+        with self._timer("synonym_lookup"):
+            synonyms = index.synonyms(word)
+        if not synonyms:
+            self._count("fallback.no_synonym")
+        return rng.choice(synonyms or (word,))
 
-    def __replace_word(self, words):
+    def __replace_word(self, words, sentence, weights, row, rng):
         if self.use_tfidf:
-            sentence = " ".join(words)
-            v = self.tvec.transform([sentence])
-            v = np.ravel(v.todense())
-            c = np.max(v)
-            z = np.sum(c - v) / np.mean(v)
-            weights = np.where(
-                v != 0, np.minimum((0.7 * (c - v) / z), np.ones_like(v)), 0
-            )
-            indices = np.arange(len(v))
-            word_2_replace = self.tvec.get_feature_names()[
-                random.choices(indices, weights=weights)[0]
-            ]
-            syn = self.__get_synonym(word_2_replace)
-            return re.sub(word_2_replace, syn, sentence, 1, re.IGNORECASE)
+            word_2_replace = weights.sample(row, rng)
+            if word_2_replace is None:
+                self._count("fallback.no_weighted_word")
+                return sentence
+            syn = self.__get_synonym(word_2_replace, rng)
+            self._count("replacements")
+            with self._timer("re_sub"):
+                return re.sub(word_2_replace, syn, sentence, 1, re.IGNORECASE)
         else:
-            r_idx = random.randint(0, len(words) - 1)
+            r_idx = rng.randint(0, len(words) - 1)
             while words[r_idx] in self.stopwords:
-                r_idx = random.randint(0, len(words) - 1)
-            syn = self.__get_synonym(words[r_idx])
+                r_idx = rng.randint(0, len(words) - 1)
+            syn = self.__get_synonym(words[r_idx], rng)
+            self._count("replacements")
             words[r_idx] = syn
         return " ".join(words)
 
-    def __replace_sent(self, sentence):
-        words = nltk.word_tokenize(sentence)
+    def __replace_sent(self, doc, weights, row, rng):
+        words = list(doc.words)
+        aug_sent = " ".join(words)
         for _ in range(int(self.alpha * len(words))):
-            aug_sent = self.__replace_word(words)
+            aug_sent = self.__replace_word(words, aug_sent, weights, row, rng)
         return aug_sent
 
-    def __call__(self, x):
-        random.seed(self.seed)
+    def _augment_batch(self, batch):
+        weights = None
         if self.use_tfidf:
-            self.tvec = TfidfVectorizer().fit(x)
-        augmented = []
-        for sentence in tqdm(x, disable=self.disable_progress):
-            for _ in range(self.n_aug):
-                augmented.append(self.__replace_sent(sentence))
-        return list(x) + augmented
+            weights = self._tfidf_weights([sentence for _, sentence in batch])
+        # Every sentence is tokenized once for all its augmentations.
+        with self._timer("tokenize"):
+            docs = [as_document(sentence) for _, sentence in batch]
+        with self._timer("replace"):
+            return [
+                (
+                    index,
+                    self.__replace_sent(
+                        doc, weights, row, self._random_state(index, aug_index)
+                    ),
+                )
+                for row, ((index, _), doc) in enumerate(zip(batch, docs))
+                for aug_index in range(self.n_aug)
+            ]
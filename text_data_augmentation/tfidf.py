@@ -0,0 +1,319 @@
+import hashlib
+import re
+import zlib
+from collections import Counter
+
+import numpy as np
+
+TOKEN_PATTERN = re.compile(r"(?u)\b\w\w+\b")
+
+
+class TfidfModel:
+    """Document frequencies of the words of a corpus, used to weight the words of
+    texts by their TF-IDF values when sampling the ones to replace.
+
+    The model is fitted once with fit, or incrementally with partial_fit on a
+    stream of texts, and can be saved to disk and shared by many calls and worker
+    processes. Tokenization and TF-IDF values are those of scikit-learn's default
+    TfidfVectorizer.
+
+    Args:
+        n_features (int, optional): Number of buckets to hash the words into, which
+            bounds the memory of a model fitted on an unbounded stream. None keeps
+            the counts of every word. Defaults to None.
+    """
+
+    def __init__(self, n_features=None):
+        self.n_features = n_features
+        self.__reset()
+
+    def __reset(self):
+        self.n_documents = 0
+        self.__fingerprint = None
+        if self.n_features is None:
+            self.document_frequencies = Counter()
+        else:
+            self.document_frequencies = np.zeros(self.n_features, dtype=np.int64)
+
+    def fit(self, texts):
+        """Fits the document frequencies on a corpus, forgetting previous fits.
+
+        Args:
+            texts (iterable): Texts of the corpus.
+
+        Returns:
+            TfidfModel: The fitted model.
+        """
+        self.__reset()
+        return self.partial_fit(texts)
+
+    def partial_fit(self, texts):
+        """Adds the documents of a batch of texts to the document frequencies.
+
+        Args:
+            texts (iterable): Texts to add.
+
+        Returns:
+            TfidfModel: The updated model.
+        """
+        self.__fingerprint = None
+        if self.n_features is None:
+            for text in texts:
+                self.document_frequencies.update(set(tokenize(text)))
+                self.n_documents += 1
+            return self
+        buckets = []
+        for text in texts:
+            buckets.extend({self.__bucket(word) for word in tokenize(text)})
+            self.n_documents += 1
+        self.document_frequencies += np.bincount(buckets, minlength=self.n_features)
+        return self
+
+    def __bucket(self, word):
+        return zlib.crc32(word.encode("utf-8")) % self.n_features
+
+    def __idf(self, words):
+        """Returns the idf of every word, NaN for the words out of the vocabulary."""
+        if self.n_features is None:
+            df = [self.document_frequencies.get(word, -1) for word in words]
+        else:
+            df = self.document_frequencies[[self.__bucket(word) for word in words]]
+        df = np.asarray(df, dtype=np.float64).reshape(-1)
+        df[df < 0] = np.nan
+        return np.log((1 + self.n_documents) / (1 + df)) + 1
+
+    def weights(self, texts):
+        """Returns the sampling weights of the words of every text.
+
+        A word of TF-IDF value v in a text whose largest value is c is sampled with
+        probability proportional to min(0.7 * (c - v) / z, 1), where
+        z = sum(c - v) / mean(v) over the whole vocabulary, so rarer words are
+        replaced less often. Words absent from the text have zero weight, hence
+        only the words of the texts are weighted and sampled.
+
+        Args:
+            texts (list): Texts to weight.
+
+        Returns:
+            TfidfWeights: Sampling weights, one row per text.
+        """
+        words, tf, indptr = [], [], [0]
+        for text in texts:
+            for word, count in Counter(tokenize(text)).items():
+                words.append(word)
+                tf.append(count)
+            indptr.append(len(words))
+        tfidf = np.asarray(tf, dtype=np.float64) * self.__idf(words)
+        rows = np.repeat(np.arange(len(texts)), np.diff(indptr))
+
+        # Drop the words out of the vocabulary, then l2 normalize every row.
+        known = ~np.isnan(tfidf)
+        words = [word for word, k in zip(words, known.tolist()) if k]
+        tfidf, rows = tfidf[known], rows[known]
+        indptr = np.searchsorted(rows, np.arange(len(texts) + 1))
+        tfidf /= np.sqrt(np.bincount(rows, tfidf**2, minlength=len(texts)))[rows]
+
+        if self.n_features is None:
+            n_features = len(self.document_frequencies)
+        else:
+            n_features = self.n_features
+        c = np.zeros(len(texts))
+        np.maximum.at(c, rows, tfidf)
+        s = np.bincount(rows, tfidf, minlength=len(texts))
+        with np.errstate(divide="ignore", invalid="ignore"):
+            z = (n_features * c - s) * n_features / s
+            weights = np.minimum(0.7 * (c[rows] - tfidf) / z[rows], 1)
+        return TfidfWeights(words, np.nan_to_num(weights, nan=0.0), indptr)
+
+    def fingerprint(self):
+        """Returns a hash of the fitted document frequencies, which identifies the
+        model in the keys of a ResultCache.
+
+        Returns:
+            str: Hex digest of the SHA-256 of the model.
+        """
+        if self.__fingerprint is None:
+            digest = hashlib.sha256(f"{self.n_features}:{self.n_documents}".encode())
+            if self.n_features is None:
+                for word, count in sorted(self.document_frequencies.items()):
+                    digest.update(f"\n{word}:{count}".encode("utf-8"))
+            else:
+                digest.update(self.document_frequencies.astype("<i8").tobytes())
+            self.__fingerprint = digest.hexdigest()
+        return self.__fingerprint
+
+    def save(self, path):
+        """Saves the model to a .npz file.
+
+        Args:
+            path (str): Path of the file.
+        """
+        if self.n_features is None:
+            words = list(self.document_frequencies)
+            counts = np.array(
+                [self.document_frequencies[word] for word in words], dtype=np.int64
+            )
+        else:
+            words, counts = [], self.document_frequencies
+        np.savez_compressed(
+            path,
+            n_features=-1 if self.n_features is None else self.n_features,
+            n_documents=self.n_documents,
+            words=np.array("\n".join(words)),
+            document_frequencies=counts,
+        )
+
+    @classmethod
+    def load(cls, path):
+        """Loads a model saved with save.
+
+        Args:
+            path (str): Path of the file.
+
+        Returns:
+            TfidfModel: The loaded model.
+        """
+        with np.load(path, allow_pickle=False) as data:
+            n_features = int(data["n_features"])
+            model = cls(None if n_features < 0 else n_features)
+            model.n_documents = int(data["n_documents"])
+            counts = data["document_frequencies"]
+            if model.n_features is None:
+                words = str(data["words"])
+                words = words.split("\n") if words else []
+                model.document_frequencies = Counter(dict(zip(words, counts.tolist())))
+            else:
+                model.document_frequencies = counts
+        return model
+
+
+class TfidfWeighting:
+    """Mixin of the augmenters sampling the words to replace by their TF-IDF
+    weights, with use_tfidf and tfidf attributes.
+
+    The weights come from a model fitted on the whole corpus, by fit or by
+    __call__ on the texts it is given. Every other way of augmenting, e.g.
+    iter_augment, n_jobs, compositions or augment_async, requires a fitted
+    model: weights fitted on every batch would depend on the batch boundaries.
+    """
+
+    def fit(self, x):
+        """Fits the TF-IDF model on a corpus, which is then used by every call
+        instead of a model fitted on the texts of the call.
+
+        Args:
+            x (iterable): Texts of the corpus.
+
+        Returns:
+            Augmenter: The augmenter.
+        """
+        self.tfidf = TfidfModel().fit(x)
+        return self
+
+    def __check_fitted(self):
+        if self.tfidf is None:
+            raise ValueError(
+                f"{type(self).__name__} needs a TF-IDF model fitted on the corpus: "
+                "call fit, pass tfidf, or set use_tfidf=False."
+            )
+
+    def _tfidf_weights(self, sentences):
+        """Returns the weights of the words of the sentences.
+
+        Raises:
+            ValueError: If the augmenter has no fitted model.
+        """
+        self.__check_fitted()
+        with self._timer("tfidf"):
+            return self.tfidf.weights(sentences)
+
+    def _tfidf_fingerprint(self):
+        """Returns the fingerprint of the model, None if the augmenter does not
+        use one, for the cache keys.
+
+        Raises:
+            ValueError: If the augmenter uses a model but has no fitted one.
+        """
+        if not self.use_tfidf:
+            return None
+        self.__check_fitted()
+        return self.tfidf.fingerprint()
+
+    def _shard_error(self):
+        if self.use_tfidf and self.tfidf is None:
+            return (
+                f"Sharded {type(self).__name__} needs a TF-IDF model fitted on the "
+                "whole corpus: call fit or pass tfidf."
+            )
+        return super()._shard_error()
+
+    def __call__(self, x):
+        x = list(x)
+        if not self.use_tfidf or self.tfidf is not None:
+            return super().__call__(x)
+        self.tfidf = TfidfModel().fit(x)
+        try:
+            return super().__call__(x)
+        finally:
+            self.tfidf = None
+
+
+class TfidfWeights:
+    """Sampling weights of the words of a batch of texts, stored as the nonzero
+    entries of a CSR matrix with a row per text.
+
+    Args:
+        words (list): Word of every entry.
+        weights (numpy.ndarray): Sampling weight of every entry.
+        indptr (numpy.ndarray): Offset of the first entry of every row, followed by
+            the number of entries.
+    """
+
+    def __init__(self, words, weights, indptr):
+        self.words = words
+        self.weights = weights
+        self.indptr = indptr
+
+    def sample(self, row, rng):
+        """Samples a word of a text in O(words in the text).
+
+        Args:
+            row (int): Row of the text.
+            rng (random.Random): Random generator.
+
+        Returns:
+            str: The sampled word, None if the text has no word of the vocabulary.
+        """
+        sampled = self.sample_distinct(row, rng, 1)
+        return sampled[0] if sampled else None
+
+    def sample_distinct(self, row, rng, k):
+        """Samples up to k distinct words of a text, without replacement.
+
+        Args:
+            row (int): Row of the text.
+            rng (random.Random): Random generator.
+            k (int): Number of words to sample.
+
+        Returns:
+            list: The sampled words, fewer than k if the text has fewer words of
+                the vocabulary.
+        """
+        start, end = self.indptr[row], self.indptr[row + 1]
+        words = self.words[start:end]
+        row_weights = self.weights[start:end].tolist()
+        sampled = []
+        for _ in range(min(k, len(words))):
+            if sum(row_weights) > 0:
+                i = rng.choices(range(len(words)), weights=row_weights)[0]
+            else:
+                # All the words left have the same weight.
+                i = rng.randrange(len(words))
+            sampled.append(words.pop(i))
+            row_weights.pop(i)
+        return sampled
+
+
+def tokenize(text):
+    """Returns the lowercased words of a text, as TfidfVectorizer does."""
+    return TOKEN_PATTERN.findall(text.lower())
@@ -0,0 +1,120 @@
+class TokenizedDocument(str):
+    """Text whose sentences and words are tokenized once, when it is created.
+
+    The augmenters accept it wherever they accept a text, and the word and
+    sentence level ones reuse its tokens for all the augmentations of the text
+    instead of tokenizing it again. Being a str, it can be cached and passed to
+    several augmenters.
+
+    Args:
+        text (str): Text to tokenize.
+
+    Attributes:
+        words (tuple): Tokens of the text, as nltk.word_tokenize returns them.
+        spans (tuple): (start, end) character offsets of every token in the text.
+        sentences (tuple): Sentences of the text, as nltk.sent_tokenize returns
+            them.
+        sentence_starts (tuple): Index of the first token of every sentence,
+            followed by the number of tokens.
+    """
+
+    def __new__(cls, text, words=None, spans=None, sentences=None, starts=None):
+        document = super().__new__(cls, text)
+        if words is None:
+            words, spans, sentences, starts = _tokenize(text)
+        document.words = tuple(words)
+        document.spans = tuple(map(tuple, spans))
+        document.sentences = tuple(sentences)
+        document.sentence_starts = tuple(starts)
+        return document
+
+    def __getnewargs__(self):
+        # Unpickled documents keep their tokens rather than tokenizing again.
+        return (
+            str(self),
+            self.words,
+            self.spans,
+            self.sentences,
+            self.sentence_starts,
+        )
+
+
+def as_document(text):
+    """Returns the text as a TokenizedDocument, tokenizing it if it is not one."""
+    if isinstance(text, TokenizedDocument):
+        return text
+    return TokenizedDocument(text)
+
+
+def split_sentences(text):
+    """Returns the sentences of the text, reusing them if it is a
+    TokenizedDocument."""
+    if isinstance(text, TokenizedDocument):
+        return list(text.sentences)
+    from nltk import sent_tokenize
+
+    return sent_tokenize(text)
+
+
+def chunk_sentences(docs, tokenizer, max_tokens):
+    """Splits every document into chunks of consecutive sentences, for models
+    whose input is too short for the whole document.
+
+    Args:
+        docs (list): Documents to split.
+        tokenizer (callable): Tokenizer of the model, returning the input_ids of
+            a list of texts as transformers tokenizers do.
+        max_tokens (int): Token budget of a chunk. A longer sentence makes a chunk
+            of its own.
+
+    Returns:
+        list: The chunks of every document, as texts, none for a document without
+            any sentence.
+    """
+    sentences = [split_sentences(doc) for doc in docs]
+    flat = [sent for sents in sentences for sent in sents]
+    lengths = iter([len(ids) for ids in tokenizer(flat)["input_ids"]] if flat else [])
+    chunks = []
+    for sents in sentences:
+        doc_chunks, chunk, chunk_length = [], [], 0
+        for sent, length in zip(sents, lengths):
+            if chunk and chunk_length + length > max_tokens:
+                doc_chunks.append(" ".join(chunk))
+                chunk, chunk_length = [], 0
+            chunk.append(sent)
+            chunk_length += length
+        if chunk:
+            doc_chunks.append(" ".join(chunk))
+        chunks.append(doc_chunks)
+    return chunks
+
+
+def _tokenize(text):
+    # nltk pulls in scipy and scikit-learn, so it is imported on first use.
+    from nltk import sent_tokenize, word_tokenize
+
+    sentences = sent_tokenize(text)
+    words, spans, starts = [], [], [0]
+    position = 0
+    for sentence in sentences:
+        for word in word_tokenize(sentence, preserve_line=True):
+            start, end = _find(text, word, position)
+            words.append(word)
+            spans.append((start, end))
+            position = end
+        starts.append(len(words))
+    return words, spans, sentences, starts
+
+
+def _find(text, word, position):
+    """Returns the span of the next occurrence of a token in the text, allowing
+    for the quotes the word tokenizer rewrites."""
+    candidates = [word]
+    if word in ("``", "''"):
+        candidates.append('"')
+    starts = [text.find(candidate, position) for candidate in candidates]
+    found = [(start, len(c)) for start, c in zip(starts, candidates) if start >= 0]
+    if not found:
+        return position, position
+    start, length = min(found)
+    return start, start + length
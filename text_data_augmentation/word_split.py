@@ -1,10 +1,8 @@
-import random
+from .base import Augmenter
+from .tokenized import as_document
 
-import nltk
-from tqdm.auto import tqdm
 
-
-class WordSplit:
+class WordSplit(Augmenter):
     """Word Split Augmentation adds word level spelling mistake noise by spliting
     words randomly in the input text.
 
@@ -16,32 +14,35 @@ class WordSplit:
         seed (int, optional): Random State for reproducibility. Defaults to None.
         show_progress (bool, optional): Set True to display progress bar.
             Defaults to True.
+        n_jobs (int, optional): Number of processes to augment with, -1 to use all
+            the CPUs. Defaults to 1.
     """
 
-    def __init__(self, alpha=0.1, n_aug=4, seed=None, show_progress=True):
+    def __init__(self, alpha=0.1, n_aug=4, seed=None, show_progress=True, n_jobs=1):
         self.alpha = alpha
         self.n_aug = n_aug
         self.seed = seed
         self.disable_progress = not show_progress
+        self.n_jobs = n_jobs
 
-    def __split_word(self, word):
+    def __split_word(self, word, rng):
         chars = list(word)
         if len(chars) > 2:
-            chars.insert(random.randint(1, len(chars) - 1), " ")
+            chars.insert(rng.randint(1, len(chars) - 1), " ")
         return "".join(chars)
 
-    def __word_split_aug(self, sentence):
-        words = nltk.word_tokenize(sentence)
+    def __word_split_aug(self, doc, rng):
         words = [
-            word if random.random() > self.alpha else self.__split_word(word)
-            for word in words
+            word if rng.random() > self.alpha else self.__split_word(word, rng)
+            for word in doc.words
         ]
         return " ".join(words)
 
-    def __call__(self, x):
-        random.seed(self.seed)
-        augmented = []
-        for sentence in tqdm(x, disable=self.disable_progress):
-            for _ in range(self.n_aug):
-                augmented.append(self.__word_split_aug(sentence))
-        return list(x) + augmented
+    def _augment_record(self, index, sentence):
+        # The sentence is tokenized once for all its augmentations.
+        with self._timer("tokenize"):
+            doc = as_document(sentence)
+        return [
+            self.__word_split_aug(doc, self._random_state(index, aug_index))
+            for aug_index in range(self.n_aug)
+        ]